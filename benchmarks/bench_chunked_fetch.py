@@ -0,0 +1,91 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+"""Fetches a large SQL result from a local fake Livy running the real PySpark client code, in one statement and in
+pages. Reports the largest single response Livy has to build, the number of statements, the peak memory of the
+process and how soon the first rows arrive when streaming them with iter_sql. Every measurement runs in its own
+process so peak RSS is not shared.
+
+    python benchmarks/bench_chunked_fetch.py [rows]
+"""
+from __future__ import print_function
+
+import json
+import os
+import resource
+import subprocess
+import sys
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import remotespark.utils.configuration as conf
+from remotespark.livyclientlib.livyclientfactory import LivyClientFactory
+from remotespark.utils.utils import get_connection_string
+from fakelivy import FakeLivy, PythonResponder
+from tests.fakespark import FakeDataFrame
+
+
+class _NullDisplay(object):
+    def writeln(self, msg):
+        pass
+
+
+def make_dataframe(rows):
+    fields = [("id", "long"), ("name", "string"), ("value", "double"), ("category", "string")]
+    return FakeDataFrame(fields, [(i, "name{}".format(i), i * 0.5, "c{}".format(i % 10)) for i in range(rows)])
+
+
+def measure(chunk_rows, rows):
+    conf.override_all({conf.chunk_rows_sql.__name__: chunk_rows,
+                       conf.polling_initial_seconds.__name__: 0.001})
+    server = FakeLivy(responder=PythonResponder(make_dataframe(rows))).start()
+    try:
+        connection_string = get_connection_string(server.url, "", "")
+        session = LivyClientFactory.create_session(_NullDisplay(), connection_string, {"kind": "pyspark"})
+        session.start()
+        # PythonResponder sessions already have a sqlContext.
+        session.get_state().sql_context_created = True
+        client = LivyClientFactory().build_client(session)
+
+        server.reset_counters()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time()
+        df = client.execute_sql("select * from big_table", rows)
+        elapsed = time() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        statements = len(server.sessions[int(session.id)]["statements"])
+
+        # Time until the first rows are available when streaming them
+        start = time()
+        chunks = client.iter_sql("select * from big_table", chunk_rows or rows, rows)
+        next(chunks)
+        first_rows = time() - start
+        chunks.close()
+    finally:
+        server.stop()
+
+    assert len(df) == rows
+    # ru_maxrss is in kilobytes on Linux
+    print(json.dumps({"seconds": elapsed, "first_rows_seconds": first_rows, "peak_mb": (rss_after - rss_before) / 1024.0, "statements": statements,
+                      "max_response_mb": server.max_response_bytes / 1024.0 / 1024.0}))
+
+
+def main():
+    if len(sys.argv) == 3:
+        return measure(int(sys.argv[1]), int(sys.argv[2]))
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    print("{} rows".format(rows))
+    print("{:>12}{:>12}{:>22}{:>20}{:>12}{:>18}".format("chunk rows", "statements", "largest response (MB)",
+                                                        "extra peak RSS (MB)", "seconds", "first rows (s)"))
+    for chunk_rows in [0, 50000, 10000]:
+        out = subprocess.check_output([sys.executable, os.path.abspath(__file__), str(chunk_rows), str(rows)])
+        result = json.loads(out.decode("utf-8").strip().splitlines()[-1])
+        print("{:>12}{:>12}{:>22.1f}{:>20.1f}{:>12.2f}{:>18.2f}".format(chunk_rows or "off", result["statements"],
+                                                                       result["max_response_mb"], result["peak_mb"],
+                                                                       result["seconds"],
+                                                                       result["first_rows_seconds"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+"""Time and peak memory of turning Livy's JSON lines output into a pandas DataFrame, decoding all the rows at once
+versus decoding them one by one. Every measurement runs in its own process so peak RSS is not shared.
+
+    python benchmarks/bench_json_decoding.py
+"""
+from __future__ import print_function
+
+import json
+import os
+import resource
+import subprocess
+import sys
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from remotespark.livyclientlib.pandaslivyclientbase import PandasLivyClientBase
+
+
+def make_records_text(rows):
+    return "\n".join(json.dumps({"id": i, "name": "name{}".format(i % 100), "value": i * 0.5, "flag": i % 2 == 0,
+                                 "date": "2016-01-{:02d}".format(i % 28 + 1)}) for i in range(rows))
+
+
+def measure(method, rows):
+    records_text = make_records_text(rows)
+    client = PandasLivyClientBase(None, rows)
+    decode = client.get_data_dataframe if method == "bulk" else client._get_data_dataframe_by_row
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time()
+    decode(records_text)
+    elapsed = time() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in kilobytes on Linux
+    print(json.dumps({"seconds": elapsed, "peak_mb": (rss_after - rss_before) / 1024.0}))
+
+
+def main():
+    if len(sys.argv) == 3:
+        return measure(sys.argv[1], int(sys.argv[2]))
+
+    print("{:>10}{:>10}{:>14}{:>20}".format("rows", "method", "seconds", "extra peak RSS (MB)"))
+    for rows in [10000, 100000, 1000000]:
+        for method in ["by_row", "bulk"]:
+            out = subprocess.check_output([sys.executable, os.path.abspath(__file__), method, str(rows)])
+            result = json.loads(out.decode("utf-8").strip().splitlines()[-1])
+            print("{:>10}{:>10}{:>14.3f}{:>20.1f}".format(rows, method, result["seconds"], result["peak_mb"]))
+
+
+if __name__ == "__main__":
+    main()
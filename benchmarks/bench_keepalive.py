@@ -0,0 +1,61 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+"""Counts TCP connections opened per statement against a local fake Livy, with and without pooled keep-alive
+connections.
+
+    python benchmarks/bench_keepalive.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import remotespark.utils.configuration as conf
+from remotespark.livyclientlib.livyclientfactory import LivyClientFactory
+from remotespark.utils.utils import get_connection_string
+from fakelivy import FakeLivy
+
+
+class _NullDisplay(object):
+    def writeln(self, msg):
+        pass
+
+
+def run(server, keep_alive, statements):
+    conf.override_all({conf.http_keep_alive.__name__: keep_alive,
+                       conf.statement_sleep_seconds.__name__: 0.05,
+                       conf.status_sleep_seconds.__name__: 0.05})
+    LivyClientFactory._http_sessions.clear()
+
+    connection_string = get_connection_string(server.url, "", "")
+    session = LivyClientFactory.create_session(_NullDisplay(), connection_string, {"kind": "pyspark"})
+    session.start()
+
+    server.reset_counters()
+    for _ in range(statements):
+        session.wait_for_idle(60)
+        session.execute("sleep 0.3")
+
+    return server.connections / float(statements), server.requests / float(statements)
+
+
+def main():
+    statements = 20
+    server = FakeLivy().start()
+    try:
+        before = run(server, False, statements)
+        after = run(server, True, statements)
+    finally:
+        server.stop()
+        conf.load()
+
+    print("{} statements of 0.3 s each".format(statements))
+    print("{:<25}{:>22}{:>22}".format("", "handshakes/statement", "requests/statement"))
+    print("{:<25}{:>22.2f}{:>22.2f}".format("connection per request", before[0], before[1]))
+    print("{:<25}{:>22.2f}{:>22.2f}".format("pooled keep-alive", after[0], after[1]))
+
+
+if __name__ == "__main__":
+    main()
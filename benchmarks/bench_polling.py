@@ -0,0 +1,67 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+"""Compares the constant and the exponential polling schedules against a local fake Livy: latency of short statements
+and number of requests sent while a long statement runs.
+
+    python benchmarks/bench_polling.py [long statement seconds]
+"""
+from __future__ import print_function
+
+import os
+import sys
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import remotespark.utils.configuration as conf
+from remotespark.livyclientlib.livyclientfactory import LivyClientFactory
+from remotespark.utils.utils import get_connection_string
+from fakelivy import FakeLivy
+
+
+class _NullDisplay(object):
+    def writeln(self, msg):
+        pass
+
+
+def run(server, schedule, short_statements, long_seconds):
+    conf.override_all({conf.polling_schedule.__name__: schedule})
+
+    connection_string = get_connection_string(server.url, "", "")
+    session = LivyClientFactory.create_session(_NullDisplay(), connection_string, {"kind": "pyspark"})
+    session.start()
+
+    start = time()
+    for _ in range(short_statements):
+        session.wait_for_idle(60)
+        session.execute("sleep 0.05")
+    latency = (time() - start) / short_statements
+
+    session.wait_for_idle(60)
+    server.reset_counters()
+    session.execute("sleep {}".format(long_seconds))
+    long_requests = server.requests
+
+    return latency, long_requests
+
+
+def main():
+    long_seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    short_statements = 10
+
+    server = FakeLivy().start()
+    try:
+        results = [(schedule, run(server, schedule, short_statements, long_seconds))
+                   for schedule in ["constant", "exponential"]]
+    finally:
+        server.stop()
+        conf.load()
+
+    print("{:<15}{:>32}{:>32}".format("schedule", "latency of 50 ms statement (s)",
+                                      "requests for {:g} s statement".format(long_seconds)))
+    for schedule, (latency, long_requests) in results:
+        print("{:<15}{:>32.3f}{:>32}".format(schedule, latency, long_requests))
+
+
+if __name__ == "__main__":
+    main()
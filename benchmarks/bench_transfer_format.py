@@ -0,0 +1,65 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+"""Bytes on the wire and client decode time of a wide SQL result sent as JSON lines versus as gzip compressed CSV.
+The compressed payload is produced by running the exact code the PySpark client sends to Livy against a fake
+DataFrame.
+
+    python benchmarks/bench_transfer_format.py
+"""
+from __future__ import print_function
+
+import os
+import sys
+from datetime import datetime, timedelta
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from remotespark.livyclientlib.pandaspysparklivyclient import PandasPysparkLivyClient
+from remotespark.livyclientlib.sqlsampling import SqlSampling
+from tests.fakespark import FakeContext, FakeDataFrame, run_python
+
+
+def make_dataframe(rows, groups_of_columns):
+    fields = []
+    for i in range(groups_of_columns):
+        fields += [("customer_identifier_{}".format(i), "long"), ("customer_segment_{}".format(i), "string"),
+                   ("purchase_amount_{}".format(i), "double"), ("purchase_time_{}".format(i), "timestamp"),
+                   ("is_returning_customer_{}".format(i), "boolean")]
+    start = datetime(2016, 1, 1)
+    data = [tuple(v for i in range(groups_of_columns)
+                  for v in (r * 7919 + i, "segment{}".format((r + i) % 7), (r * 31 + i) * 1.37,
+                            start + timedelta(seconds=r * 13 + i), (r + i) % 3 == 0))
+            for r in range(rows)]
+    return FakeDataFrame(fields, data)
+
+
+def measure(decode, payload, repeats=3):
+    start = time()
+    for _ in range(repeats):
+        decode(payload)
+    return (time() - start) / repeats
+
+
+def main():
+    client = PandasPysparkLivyClient(None, 1000000)
+    captured = []
+    client.execute = lambda code: captured.append(code) or (True, "")
+    client.get_compressed_records("sqlContext", "select * from purchases", str(client.max_take_rows), SqlSampling())
+    remote_code = captured[0]
+
+    print("{:>8}{:>10}{:>12}{:>16}{:>14}".format("rows", "columns", "format", "bytes", "decode (s)"))
+    for rows in [10000, 100000]:
+        df = make_dataframe(rows, 10)
+        json_payload = "\n".join(df.toJSON().toLocalIterator())
+        compressed_payload = run_python(remote_code, {"sqlContext": FakeContext(df)})
+        columns = len(df.schema.fields)
+        json_seconds = measure(client.get_data_dataframe, json_payload)
+        compressed_seconds = measure(client.get_compressed_dataframe, compressed_payload)
+        print("{:>8}{:>10}{:>12}{:>16}{:>14.3f}".format(rows, columns, "json", len(json_payload), json_seconds))
+        print("{:>8}{:>10}{:>12}{:>16}{:>14.3f}".format(rows, columns, "csv_gzip", len(compressed_payload),
+                                                      compressed_seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+"""A tiny in-process Livy server used by the benchmarks. It keeps everything in memory, finishes statements after a
+configurable amount of time and counts the TCP connections and requests it receives and the bytes it sends."""
+
+import json
+import re
+import threading
+from time import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from tests.fakespark import FakeContext, run_python
+
+
+def default_responder(code):
+    """Returns (seconds the statement runs, text/plain output). Code of the form `sleep <seconds>` runs for that long
+    and every other piece of code finishes immediately echoing itself."""
+    match = re.match(r"^sleep ([0-9.]+)$", code.strip())
+    if match:
+        return float(match.group(1)), ""
+    return 0.0, code
+
+
+class PythonResponder(object):
+    """Responder that runs the code of every statement against the same namespace, like a PySpark session where
+    sqlContext.sql returns the given DataFrame."""
+    def __init__(self, df):
+        self.namespace = {"sqlContext": FakeContext(df)}
+
+    def __call__(self, code):
+        return 0.0, run_python(code, self.namespace).rstrip("\n")
+
+
+class FakeLivy(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, responder=None, supports_single_statement=True, log_lines=None):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), _FakeLivyHandler)
+        self.responder = responder if responder is not None else default_responder
+        self.supports_single_statement = supports_single_statement
+        self.log_lines = log_lines if log_lines is not None else []
+        self.lock = threading.Lock()
+        self.sessions = dict()
+        self.connections = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self.max_response_bytes = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def reset_counters(self):
+        with self.lock:
+            self.connections = 0
+            self.requests = 0
+            self.bytes_sent = 0
+            self.max_response_bytes = 0
+
+
+class _FakeLivyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length).decode("utf-8")) if length else {}
+        path, _, query = self.path.partition("?")
+        parts = [p for p in path.split("/") if p]
+
+        with server.lock:
+            server.requests += 1
+            status, response = self._route(method, parts, query, body)
+
+        payload = json.dumps(response).encode("utf-8")
+        with server.lock:
+            server.bytes_sent += len(payload)
+            server.max_response_bytes = max(server.max_response_bytes, len(payload))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _route(self, method, parts, query, body):
+        server = self.server
+        if parts == ["sessions"] and method == "POST":
+            session_id = len(server.sessions)
+            server.sessions[session_id] = {"kind": body.get("kind", "spark"), "statements": []}
+            return 201, {"id": session_id, "state": "idle", "kind": body.get("kind", "spark"), "log": []}
+        if parts == ["sessions"]:
+            return 200, {"from": 0, "total": len(server.sessions),
+                         "sessions": [self._session_json(i) for i in server.sessions]}
+
+        session = server.sessions.get(int(parts[1]))
+        if session is None:
+            return 404, "Session not found"
+        session_id = int(parts[1])
+
+        if len(parts) == 2:
+            if method == "DELETE":
+                del server.sessions[session_id]
+                return 200, {"msg": "deleted"}
+            return 200, self._session_json(session_id)
+
+        if parts[2] == "log":
+            params = dict(p.split("=") for p in query.split("&") if "=" in p)
+            start = int(params.get("from", 0))
+            size = int(params.get("size", len(server.log_lines)))
+            return 200, {"id": session_id, "from": start, "total": len(server.log_lines),
+                         "log": server.log_lines[start:start + size]}
+
+        statements = session["statements"]
+        if len(parts) == 3 and method == "POST":
+            seconds, output = server.responder(body["code"])
+            statement = {"id": len(statements), "finishes": time() + seconds, "text": output}
+            statements.append(statement)
+            return 201, self._statement_json(statement)
+        if len(parts) == 3:
+            return 200, {"total_statements": len(statements),
+                         "statements": [self._statement_json(s) for s in statements]}
+
+        if not server.supports_single_statement:
+            return 404, "Not found"
+        statement = statements[int(parts[3])]
+        if len(parts) == 5 and parts[4] == "cancel":
+            statement["finishes"] = time()
+            statement["cancelled"] = True
+            return 200, {"msg": "canceled"}
+        return 200, self._statement_json(statement)
+
+    def _session_json(self, session_id):
+        statements = self.server.sessions[session_id]["statements"]
+        busy = any(s["finishes"] > time() for s in statements)
+        return {"id": session_id, "state": "busy" if busy else "idle",
+                "kind": self.server.sessions[session_id]["kind"], "log": []}
+
+    @staticmethod
+    def _statement_json(statement):
+        if statement["finishes"] > time():
+            return {"id": statement["id"], "state": "running", "output": None}
+        if statement.get("cancelled"):
+            return {"id": statement["id"], "state": "cancelled", "output": None}
+        return {"id": statement["id"], "state": "available",
+                "output": {"status": "ok", "execution_count": statement["id"],
+                           "data": {"text/plain": statement["text"]}}}
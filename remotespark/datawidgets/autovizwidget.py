@@ -8,12 +8,13 @@ from remotespark.utils.ipythondisplay import IpythonDisplay
 from .encoding import Encoding
 from .encodingwidget import EncodingWidget
 from .ipywidgetfactory import IpyWidgetFactory
+from .pandasaggregator import PandasAggregator
 from .plotlygraphs.graphrenderer import GraphRenderer
 
 
 class AutoVizWidget(FlexBox):
     def __init__(self, df, encoding, renderer=None, ipywidget_factory=None, encoding_widget=None, ipython_display=None,
-                 nested_widget_mode=False, testing=False, **kwargs):
+                 nested_widget_mode=False, testing=False, aggregator=None, **kwargs):
         assert encoding is not None
         assert df is not None
         assert type(df) is pd.DataFrame
@@ -44,6 +45,12 @@ class AutoVizWidget(FlexBox):
 
         self.encoding = encoding
 
+        # Computes the aggregated series of the charts, in Spark if the df is the result of a query. Otherwise they
+        # are computed from the df once and kept for as long as the widget lives.
+        if aggregator is None:
+            aggregator = PandasAggregator(df)
+        self.aggregator = aggregator
+
         # Widget that will become the only child of AutoVizWidget
         self.widget = self.ipywidget_factory.get_vbox()
 
@@ -74,7 +81,7 @@ class AutoVizWidget(FlexBox):
         self.encoding_widget.show_logarithmic_x_axis(self.renderer.display_logarithmic_x_axis(self.encoding.chart_type))
         self.encoding_widget.show_logarithmic_y_axis(self.renderer.display_logarithmic_y_axis(self.encoding.chart_type))
 
-        self.renderer.render(self.df, self.encoding, self.to_display)
+        self.renderer.render(self.df, self.encoding, self.to_display, self.aggregator)
 
     def _create_controls_widget(self):
         # Create types of viz hbox
@@ -0,0 +1,110 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+import numpy as np
+import pandas as pd
+
+
+class DataFramePager(object):
+    """Splits a DataFrame in pages of rows_per_page rows, optionally filtered on the value of a column and sorted by
+    a column. The order of the rows is computed once per sort and every column that is filtered on is indexed once,
+    so that getting a page only costs the rows of that page."""
+
+    def __init__(self, df, rows_per_page):
+        if rows_per_page < 1:
+            raise ValueError("Pages must have at least 1 row, not {}.".format(rows_per_page))
+
+        self.df = df
+        self.rows_per_page = rows_per_page
+
+        self.sort_column = None
+        self.ascending = True
+        self.filter_column = None
+        self.filter_value = None
+
+        # Positions of the rows to display, in display order. None means all the rows, in the order of df.
+        self._positions = None
+        # Rank of every row of df in the current sort order. None when df is not sorted.
+        self._ranks = None
+        self._order = None
+        self._indexes = dict()
+
+    @property
+    def row_count(self):
+        if self._positions is None:
+            return len(self.df)
+        return len(self._positions)
+
+    @property
+    def page_count(self):
+        return max(1, (self.row_count + self.rows_per_page - 1) // self.rows_per_page)
+
+    def get_page(self, page):
+        """Returns the DataFrame with the rows of page, counting from 0."""
+        if page < 0 or page >= self.page_count:
+            raise ValueError("Page {} does not exist. There are {} pages.".format(page, self.page_count))
+
+        start = page * self.rows_per_page
+        end = start + self.rows_per_page
+        if self._positions is None:
+            return self.df.iloc[start:end]
+        return self.df.iloc[self._positions[start:end]]
+
+    def sort(self, column, ascending=True):
+        """Sorts the rows by column, or restores the order of the DataFrame if column is None."""
+        if column is not None and column not in self.df.columns:
+            raise ValueError("Cannot sort by column '{}' that does not exist.".format(column))
+
+        self.sort_column = column
+        self.ascending = ascending
+        if column is None:
+            self._order = None
+            self._ranks = None
+        else:
+            # Rows with missing values go last, whatever the direction.
+            order = np.asarray(self.df[column].reset_index(drop=True)
+                               .sort_values(ascending=ascending, kind="mergesort", na_position="last").index)
+            ranks = np.empty(len(order), dtype=np.int64)
+            ranks[order] = np.arange(len(order))
+            self._order = order
+            self._ranks = ranks
+        self._update_positions()
+
+    def filter(self, column, value):
+        """Keeps the rows whose value in column reads as value, or all the rows if column is None."""
+        if column is not None and column not in self.df.columns:
+            raise ValueError("Cannot filter on column '{}' that does not exist.".format(column))
+
+        self.filter_column = column
+        self.filter_value = value
+        self._update_positions()
+
+    def _update_positions(self):
+        if self.filter_column is None:
+            self._positions = self._order
+            return
+
+        positions = self._find(self._get_index(self.filter_column), self.filter_value)
+        if self._ranks is not None:
+            positions = positions[np.argsort(self._ranks[positions], kind="mergesort")]
+        self._positions = positions
+
+    @staticmethod
+    def _find(index, value):
+        text = str(value)
+        if text not in index:
+            # Floats read as 1.0 even when 1 is typed.
+            try:
+                text = str(float(text))
+            except ValueError:
+                pass
+        return index.get(text, np.empty(0, dtype=np.int64))
+
+    def _get_index(self, column):
+        """Maps every value of column, as text, to the positions of the rows that hold it."""
+        index = self._indexes.get(column)
+        if index is None:
+            values = self.df[column].astype(str).values
+            index = pd.Series(values).groupby(values, sort=False).indices
+            self._indexes[column] = index
+        return index
@@ -0,0 +1,75 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+"""Downsampling of the series of line and area charts with Largest-Triangle-Three-Buckets (Sveinn Steinarsson, 2013),
+which keeps the visual shape of a series with far fewer points than picking every n-th one."""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def downsample(x_values, y_values, max_points):
+    """Returns at most max_points of the points, or all of them if max_points is 0, there are fewer points or the Y
+    values are not numbers."""
+    if max_points <= 0 or len(x_values) <= max_points:
+        return x_values, y_values
+
+    try:
+        y = np.asarray(y_values, dtype=float)
+    except (TypeError, ValueError):
+        return x_values, y_values
+
+    indices = lttb_indices(_x_as_numbers(x_values), y, max_points)
+    return [x_values[i] for i in indices], [y_values[i] for i in indices]
+
+
+def lttb_indices(x, y, threshold):
+    """Positions of the threshold points of the arrays x and y picked by Largest-Triangle-Three-Buckets. The first and
+    last points are always kept. Every other bucket keeps the point that forms the largest triangle with the point
+    kept in the previous bucket and the average of the next bucket."""
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+
+    # Bucket i spans [edges[i], edges[i + 1]); the last point is a bucket of its own.
+    edges = np.floor(np.linspace(1, length - 1, threshold - 1)).astype(int)
+    edges = np.append(edges, length)
+
+    # The averages of all the buckets are computed at once, leaving out null Y values.
+    starts = edges[:-1]
+    known = ~np.isnan(y)
+    known_counts = np.add.reduceat(known.astype(float), starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        average_x = np.add.reduceat(x, starts) / np.diff(edges)
+        average_y = np.add.reduceat(np.where(known, y, 0), starts) / known_counts
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = length - 1
+    previous = 0
+    for i in range(threshold - 2):
+        (start, end) = (edges[i], edges[i + 1])
+        next_x = average_x[i + 1]
+        next_y = average_y[i + 1] if known_counts[i + 1] > 0 else y[previous]
+
+        # Twice the area of the triangles, which does not change which one is the largest
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) -
+                       (x[previous] - x[start:end]) * (next_y - y[previous]))
+        areas[np.isnan(areas)] = -1
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+
+    return selected
+
+
+def _x_as_numbers(x_values):
+    x = np.asarray(x_values)
+    if x.dtype.kind in "biuf":
+        return x.astype(float)
+    if x.dtype.kind == "M" or all(isinstance(value, datetime) for value in x_values):
+        return pd.DatetimeIndex(x_values).asi8.astype(float)
+
+    # Categories are evenly spaced along the axis.
+    return np.arange(len(x_values), dtype=float)
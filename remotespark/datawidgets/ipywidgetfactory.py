@@ -1,7 +1,7 @@
 # Copyright (c) 2015  aggftw@gmail.com
 # Distributed under the terms of the Modified BSD License.
 
-from ipywidgets import VBox, Output, Button, HTML, HBox, Dropdown, Checkbox
+from ipywidgets import VBox, Output, Button, HTML, HBox, Dropdown, Checkbox, Text
 
 
 class IpyWidgetFactory(object):
@@ -34,3 +34,7 @@ class IpyWidgetFactory(object):
     @staticmethod
     def get_checkbox(**kwargs):
         return Checkbox(**kwargs)
+
+    @staticmethod
+    def get_text(**kwargs):
+        return Text(**kwargs)
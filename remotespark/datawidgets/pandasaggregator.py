@@ -0,0 +1,79 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+try:
+    from pandas.core.groupby import DataError
+except ImportError:
+    from pandas.errors import DataError
+
+from .encoding import Encoding
+from .invalidencodingerror import InvalidEncodingError
+
+
+class PandasAggregator(object):
+    """Computes the series of the charts of a DataFrame. The first time a Y column is aggregated by an X column, all
+    the supported aggregations are computed with a single groupby, and every series is kept, so switching the chart
+    type or the aggregation function does not group the rows again."""
+
+    _functions = {Encoding.y_agg_avg: "mean", Encoding.y_agg_min: "min", Encoding.y_agg_max: "max",
+                  Encoding.y_agg_sum: "sum", Encoding.y_agg_count: "count"}
+
+    def __init__(self, df):
+        self.df = df
+        self._groups = dict()
+        self._series = dict()
+        self._counts = dict()
+
+    def aggregate(self, x_column, y_column, y_aggregation):
+        """Returns the values of x_column and the y_aggregation of y_column for each of them, sorted by x_column."""
+        if y_aggregation == Encoding.y_agg_none:
+            raise ValueError("No Y aggregation function specified.")
+        if y_aggregation not in self._functions:
+            raise ValueError("Y aggregation '{}' not supported.".format(y_aggregation))
+
+        key = (x_column, y_column)
+        if key not in self._series:
+            self._series[key] = self._aggregate_all(x_column, y_column)
+
+        series = self._series[key]
+        if y_aggregation not in series:
+            raise InvalidEncodingError("Y column '{}' is not valid with aggregation function '{}'. Please select "
+                                       "a different\naggregation function.".format(y_column, y_aggregation))
+        return series[y_aggregation]
+
+    def count(self, x_column):
+        """Returns the values of x_column and the number of rows for each of them, sorted by x_column."""
+        if x_column not in self._counts:
+            sizes = self._get_group(x_column).size()
+            self._counts[x_column] = (sizes.index.tolist(), sizes.values.tolist())
+        return self._counts[x_column]
+
+    def _get_group(self, x_column):
+        if x_column not in self._groups:
+            self._groups[x_column] = self.df.groupby(x_column)
+        return self._groups[x_column]
+
+    def _aggregate_all(self, x_column, y_column):
+        grouped = self._get_group(x_column)[y_column]
+        try:
+            aggregated = grouped.agg([self._functions[y_aggregation] for y_aggregation in Encoding.supported_y_agg
+                                      if y_aggregation in self._functions])
+        except (DataError, TypeError, ValueError):
+            # Some aggregations do not apply to the column, like the average of strings, so each one is tried on
+            # its own.
+            aggregated = None
+
+        series = dict()
+        x_values = None
+        for (y_aggregation, function) in self._functions.items():
+            if aggregated is not None:
+                values = aggregated[function]
+            else:
+                try:
+                    values = grouped.agg(function)
+                except (DataError, TypeError, ValueError):
+                    continue
+            if x_values is None:
+                x_values = values.index.tolist()
+            series[y_aggregation] = (x_values, values.tolist())
+        return series
@@ -1,26 +1,21 @@
 # Copyright (c) 2015  aggftw@gmail.com
 # Distributed under the terms of the Modified BSD License.
 
-import pandas as pd
-
+from remotespark.datawidgets.tablewidget import TableWidget
 from remotespark.utils.ipythondisplay import IpythonDisplay
 
 
 class DataGraph(object):
     """This does not use the table version of plotly because it freezes up the browser for >60 rows. Instead, we use
-    pandas df HTML representation."""
+    pandas df HTML representation, one page of rows at a time."""
     def __init__(self, display=None):
         if display is None:
             self.display = IpythonDisplay()
         else:
             self.display = display
 
-    def render(self, df, encoding, output):
+    def render(self, df, encoding, output, aggregator=None):
         with output:
-            max_rows = pd.get_option("display.max_rows")
-            max_cols = pd.get_option("display.max_columns")
-            show_dimensions = pd.get_option("display.show_dimensions")
-
             # This will hide the index column for pandas df.
             self.display.html("""
 <style>
@@ -32,8 +27,7 @@ class DataGraph(object):
     }
 </style>
 """)
-            self.display.html(df.to_html(max_rows=max_rows, max_cols=max_cols,
-                                         show_dimensions=show_dimensions, notebook=True, classes="hideme"))
+            self.display.display(TableWidget(df))
 
     @staticmethod
     def display_logarithmic_x_axis():
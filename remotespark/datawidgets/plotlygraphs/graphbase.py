@@ -3,21 +3,27 @@
 
 from plotly.graph_objs import Figure, Data, Layout
 from plotly.offline import iplot
-from pandas.core.groupby import DataError
 
-from remotespark.datawidgets.encoding import Encoding
+import remotespark.utils.configuration as conf
+from remotespark.datawidgets.downsampling import downsample
 from remotespark.datawidgets.invalidencodingerror import InvalidEncodingError
+from remotespark.datawidgets.pandasaggregator import PandasAggregator
 
 
 class GraphBase(object):
-    def render(self, df, encoding, output):
+    # Number of points of the series before _get_data downsampled it, if it did
+    points_before_downsampling = None
+
+    def render(self, df, encoding, output, aggregator=None):
+        """Plots the series of the encoding. If an aggregator is given, aggregated series are computed by it rather
+        than from df."""
         if encoding.x is None or encoding.y is None:
             with output:
                 print("\n\n\nPlease select an X and Y axis.")
                 return
 
         try:
-            data = self._get_data(df, encoding)
+            data = self._get_data(df, encoding, aggregator)
         except InvalidEncodingError as err:
             with output:
                 print("\n\n\n{}".format(err))
@@ -28,6 +34,11 @@ class GraphBase(object):
 
         layout = Layout(xaxis=dict(type=type_x_axis, rangemode="tozero", title=encoding.x),
                         yaxis=dict(type=type_y_axis, rangemode="tozero", title=encoding.y))
+        if self.points_before_downsampling is not None:
+            layout["annotations"] = [dict(text="Downsampled from {} to {} points"
+                                          .format(self.points_before_downsampling, conf.max_points_line_graph()),
+                                          xref="paper", yref="paper", x=1, y=1.05, xanchor="right",
+                                          showarrow=False)]
 
         with output:
             fig = Figure(data=Data(data), layout=layout)
@@ -55,22 +66,31 @@ class GraphBase(object):
             return "log"
         return "-"
 
-    def _get_data(self, df, encoding):
+    def _get_data(self, df, encoding, aggregator=None):
         raise NotImplementedError()
 
     @staticmethod
-    def _get_x_y_values(df, encoding):
+    def _get_x_y_values(df, encoding, aggregator=None):
+        if aggregator is None:
+            aggregator = PandasAggregator(df)
+
         try:
-            x_values, y_values = GraphBase._get_x_y_values_aggregated(df,
-                                                                      encoding.x,
-                                                                      encoding.y,
-                                                                      encoding.y_aggregation)
+            x_values, y_values = aggregator.aggregate(encoding.x, encoding.y, encoding.y_aggregation)
         except ValueError:
             x_values = GraphBase._get_x_values(df, encoding)
             y_values = GraphBase._get_y_values(df, encoding)
 
         return x_values, y_values
 
+    def _downsample(self, x_values, y_values):
+        """Keeps at most max_points_line_graph points of the series, so that plotly does not freeze the browser with
+        huge figures."""
+        points = len(x_values)
+        x_values, y_values = downsample(x_values, y_values, conf.max_points_line_graph())
+        if len(x_values) < points:
+            self.points_before_downsampling = points
+        return x_values, y_values
+
     @staticmethod
     def _get_x_values(df, encoding):
         return df[encoding.x].tolist()
@@ -78,38 +98,3 @@ class GraphBase(object):
     @staticmethod
     def _get_y_values(df, encoding):
         return df[encoding.y].tolist()
-
-    @staticmethod
-    def _get_x_y_values_aggregated(df, x_column, y_column, y_aggregation):
-        if y_aggregation == Encoding.y_agg_none:
-            raise ValueError("No Y aggregation function specified.")
-
-        df_grouped = df.groupby(x_column)
-
-        try:
-            if y_aggregation == Encoding.y_agg_avg:
-                df_transformed = df_grouped.mean()
-            elif y_aggregation == Encoding.y_agg_min:
-                df_transformed = df_grouped.min()
-            elif y_aggregation == Encoding.y_agg_max:
-                df_transformed = df_grouped.max()
-            elif y_aggregation == Encoding.y_agg_sum:
-                df_transformed = df_grouped.sum()
-            elif y_aggregation == Encoding.y_agg_count:
-                df_transformed = df_grouped.count()
-            else:
-                raise ValueError("Y aggregation '{}' not supported.".format(y_aggregation))
-        except DataError as d_err:
-            raise InvalidEncodingError("Cannot aggregate column '{}' with aggregation function '{}' because:\n\t'{}'."
-                                       .format(y_column, y_aggregation, d_err))
-        else:
-            df_transformed = df_transformed.reset_index()
-
-            if y_column not in df_transformed.columns:
-                raise InvalidEncodingError("Y column '{}' is not valid with aggregation function '{}'. Please select "
-                                           "a different\naggregation function.".format(y_column, y_aggregation))
-
-            x_values = df_transformed[x_column].tolist()
-            y_values = df_transformed[y_column].tolist()
-
-            return x_values, y_values
@@ -8,18 +8,24 @@ from .piegraph import PieGraph
 from .linegraph import LineGraph
 from .areagraph import AreaGraph
 from .bargraph import BarGraph
+import remotespark.utils.configuration as conf
 from remotespark.datawidgets.encoding import Encoding
 
 
 class GraphRenderer(object):
 
-    def __init__(self, testing=False):
+    def __init__(self, testing=False, webgl_min_points=None):
+        """Line graphs of at least webgl_min_points points are drawn with WebGL. It defaults to the
+        webgl_min_points_line_graph configuration, and 0 turns WebGL off."""
         if not testing:
             init_notebook_mode()
 
-    @staticmethod
-    def render(df, encoding, output):
-        GraphRenderer._get_graph(encoding.chart_type).render(df, encoding, output)
+        if webgl_min_points is None:
+            webgl_min_points = conf.webgl_min_points_line_graph()
+        self.webgl_min_points = webgl_min_points
+
+    def render(self, df, encoding, output, aggregator=None):
+        GraphRenderer._get_graph(encoding.chart_type, self.webgl_min_points).render(df, encoding, output, aggregator)
 
     @staticmethod
     def display_x(chart_type):
@@ -44,9 +50,9 @@ class GraphRenderer(object):
         return display_x or display_y
 
     @staticmethod
-    def _get_graph(chart_type):
+    def _get_graph(chart_type, webgl_min_points=0):
         if chart_type == Encoding.chart_type_line:
-            graph = LineGraph()
+            graph = LineGraph(webgl_min_points)
         elif chart_type == Encoding.chart_type_area:
             graph = AreaGraph()
         elif chart_type == Encoding.chart_type_bar:
@@ -1,13 +1,25 @@
 # Copyright (c) 2015  aggftw@gmail.com
 # Distributed under the terms of the Modified BSD License.
 
-from plotly.graph_objs import Scatter
+from plotly.graph_objs import Scatter, Scattergl
 
 from .graphbase import GraphBase
 
 
 class LineGraph(GraphBase):
 
-    def _get_data(self, df, encoding):
-        x_values, y_values = GraphBase._get_x_y_values(df, encoding)
+    def __init__(self, webgl_min_points=0):
+        """Series with at least webgl_min_points points are drawn with WebGL rather than SVG, and are not downsampled.
+        0 always draws with SVG."""
+        self.webgl_min_points = webgl_min_points
+
+    def _get_data(self, df, encoding, aggregator=None):
+        x_values, y_values = GraphBase._get_x_y_values(df, encoding, aggregator)
+        if self._use_webgl(len(x_values)):
+            return [Scattergl(x=x_values, y=y_values, mode="lines")]
+
+        x_values, y_values = self._downsample(x_values, y_values)
         return [Scatter(x=x_values, y=y_values)]
+
+    def _use_webgl(self, points):
+        return 0 < self.webgl_min_points <= points
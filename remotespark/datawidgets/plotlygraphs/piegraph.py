@@ -5,17 +5,24 @@ from plotly.graph_objs import Pie, Figure, Data
 from plotly.offline import iplot
 
 import remotespark.utils.configuration as conf
+from remotespark.datawidgets.invalidencodingerror import InvalidEncodingError
+from remotespark.datawidgets.pandasaggregator import PandasAggregator
 
 
 class PieGraph(object):
     @staticmethod
-    def render(df, encoding, output):
+    def render(df, encoding, output, aggregator=None):
         if encoding.x is None:
             with output:
                 print("\n\n\nPlease select an X axis.")
                 return
 
-        values, labels = PieGraph._get_x_values_labels(df, encoding)
+        try:
+            values, labels = PieGraph._get_x_values_labels(df, encoding, aggregator)
+        except InvalidEncodingError as err:
+            with output:
+                print("\n\n\n{}".format(err))
+                return
         max_slices_pie_graph = conf.max_slices_pie_graph()
 
         with output:
@@ -50,6 +57,9 @@ class PieGraph(object):
         return False
 
     @staticmethod
-    def _get_x_values_labels(df, encoding):
-        series = df.groupby([encoding.x]).size()
-        return series.values.tolist(), series.index.tolist()
+    def _get_x_values_labels(df, encoding, aggregator=None):
+        if aggregator is None:
+            aggregator = PandasAggregator(df)
+
+        labels, values = aggregator.count(encoding.x)
+        return values, labels
@@ -0,0 +1,75 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+import remotespark.utils.configuration as conf
+from remotespark.livyclientlib.dataframeparseexception import DataFrameParseException
+from remotespark.utils.ipythondisplay import IpythonDisplay
+from .encoding import Encoding
+from .invalidencodingerror import InvalidEncodingError
+
+
+class SqlAggregator(object):
+    """Computes the series of the charts of a SQL or Hive query result with GROUP BY queries that run in Spark over
+    the whole result of the query, instead of over the rows that were fetched. The series of every encoding are
+    cached, so going back to an encoding does not run its query again.
+
+    run_query is called with the text of a query and the maximum number of rows to fetch, and returns its result as a
+    DataFrame. Only the first max_groups values of the x column are kept, and the user is warned when there are
+    more."""
+
+    _functions = {Encoding.y_agg_avg: "AVG", Encoding.y_agg_min: "MIN", Encoding.y_agg_max: "MAX",
+                  Encoding.y_agg_sum: "SUM", Encoding.y_agg_count: "COUNT"}
+
+    def __init__(self, command, run_query, max_groups=None, ipython_display=None):
+        if max_groups is None:
+            max_groups = conf.max_groups_aggregation()
+        if ipython_display is None:
+            ipython_display = IpythonDisplay()
+
+        self.command = command.strip().rstrip(";")
+        self.run_query = run_query
+        self.max_groups = max_groups
+        self.ipython_display = ipython_display
+        self._series = dict()
+
+    def aggregate(self, x_column, y_column, y_aggregation):
+        """Returns the values of x_column and the y_aggregation of y_column for each of them, sorted by x_column."""
+        if y_aggregation == Encoding.y_agg_none:
+            raise ValueError("No Y aggregation function specified.")
+        if y_aggregation not in self._functions:
+            raise ValueError("Y aggregation '{}' not supported.".format(y_aggregation))
+
+        aggregation = "{}({})".format(self._functions[y_aggregation], self._quote(y_column))
+        return self._get_series(x_column, aggregation,
+                                "Cannot aggregate column '{}' with aggregation function '{}'"
+                                .format(y_column, y_aggregation))
+
+    def count(self, x_column):
+        """Returns the values of x_column and the number of rows for each of them, sorted by x_column."""
+        return self._get_series(x_column, "COUNT(1)", "Cannot count the rows of column '{}'".format(x_column))
+
+    def make_query(self, x_column, aggregation):
+        # Rows with a null x are left out, like pandas does when grouping.
+        x = self._quote(x_column)
+        return "SELECT {0}, {1} FROM (\n{2}\n) AS aggregated_query WHERE {0} IS NOT NULL GROUP BY {0} ORDER BY {0}"\
+            .format(x, aggregation, self.command)
+
+    def _get_series(self, x_column, aggregation, error):
+        key = (x_column, aggregation)
+        if key not in self._series:
+            try:
+                # One more row than is kept tells whether there were more groups.
+                df = self.run_query(self.make_query(x_column, aggregation), self.max_groups + 1)
+            except DataFrameParseException as e:
+                raise InvalidEncodingError("{} because:\n\t'{}'.".format(error, e.out))
+            if len(df) > self.max_groups:
+                self.ipython_display.send_error("Column '{}' has more than {} values. Only the first {} are shown."
+                                                .format(x_column, self.max_groups, self.max_groups))
+                df = df.iloc[:self.max_groups]
+            self._series[key] = (df.iloc[:, 0].tolist(), df.iloc[:, 1].tolist())
+
+        return self._series[key]
+
+    @staticmethod
+    def _quote(column):
+        return "`{}`".format(column.replace("`", "``"))
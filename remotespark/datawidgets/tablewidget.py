@@ -0,0 +1,96 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+import pandas as pd
+from ipywidgets import FlexBox
+
+import remotespark.utils.configuration as conf
+from .dataframepager import DataFramePager
+from .ipywidgetfactory import IpyWidgetFactory
+
+
+class TableWidget(FlexBox):
+    """Table that shows one page of the rows of a DataFrame at a time. Rows are sorted and filtered in the kernel, so
+    only the HTML of the current page is sent to the browser."""
+
+    def __init__(self, df, rows_per_page=None, ipywidget_factory=None, testing=False, **kwargs):
+        assert df is not None
+        assert type(df) is pd.DataFrame
+
+        kwargs['orientation'] = 'vertical'
+        if not testing:
+            super(TableWidget, self).__init__((), **kwargs)
+
+        if rows_per_page is None:
+            rows_per_page = conf.rows_per_table_page()
+
+        if ipywidget_factory is None:
+            ipywidget_factory = IpyWidgetFactory()
+        self.ipywidget_factory = ipywidget_factory
+
+        self.pager = DataFramePager(df, rows_per_page)
+        self.page = 0
+
+        columns = {str(i): i for i in df.columns}
+        columns["-"] = None
+
+        # Sort
+        self.sort_view = self.ipywidget_factory.get_dropdown(options=columns, description="Sort by", value=None)
+        self.sort_view.on_trait_change(self._sort_changed_callback, "value")
+        self.descending_view = self.ipywidget_factory.get_checkbox(description="Descending", value=False)
+        self.descending_view.on_trait_change(self._sort_changed_callback, "value")
+
+        # Filter
+        self.filter_column_view = self.ipywidget_factory.get_dropdown(options=columns, description="Filter",
+                                                                      value=None)
+        self.filter_column_view.on_trait_change(self._filter_changed_callback, "value")
+        self.filter_value_view = self.ipywidget_factory.get_text(description="equal to", value="")
+        self.filter_value_view.on_trait_change(self._filter_changed_callback, "value")
+
+        controls = self.ipywidget_factory.get_hbox()
+        controls.children = [self.sort_view, self.descending_view, self.filter_column_view, self.filter_value_view]
+
+        # Pages
+        self.previous_button = self.ipywidget_factory.get_button(description="Previous")
+        self.previous_button.on_click(self._previous_callback)
+        self.next_button = self.ipywidget_factory.get_button(description="Next")
+        self.next_button.on_click(self._next_callback)
+        self.page_label = self.ipywidget_factory.get_html("")
+
+        navigation = self.ipywidget_factory.get_hbox()
+        navigation.children = [self.previous_button, self.page_label, self.next_button]
+
+        self.table = self.ipywidget_factory.get_html("")
+
+        self.children = [controls, self.table, navigation]
+
+        self.show_page(0)
+
+    def show_page(self, page):
+        self.page = min(max(page, 0), self.pager.page_count - 1)
+        page_df = self.pager.get_page(self.page)
+
+        self.table.value = page_df.to_html(notebook=True, classes="hideme")
+        self.page_label.value = "Page {} of {} ({} rows)".format(self.page + 1, self.pager.page_count,
+                                                                 self.pager.row_count)
+        self.previous_button.disabled = self.page == 0
+        self.next_button.disabled = self.page == self.pager.page_count - 1
+
+    def _previous_callback(self, *args):
+        self.show_page(self.page - 1)
+
+    def _next_callback(self, *args):
+        self.show_page(self.page + 1)
+
+    def _sort_changed_callback(self, *args):
+        self.pager.sort(self.sort_view.value, not self.descending_view.value)
+        self.show_page(0)
+
+    def _filter_changed_callback(self, *args):
+        column = self.filter_column_view.value
+        value = self.filter_value_view.value
+        if column is None or value == "":
+            self.pager.filter(None, None)
+        else:
+            self.pager.filter(column, value)
+        self.show_page(0)
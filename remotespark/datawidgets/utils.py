@@ -1,6 +1,10 @@
 import pandas as pd
 import numpy as np
 
+import remotespark.utils.configuration as conf
+from remotespark.utils.dataframemetadata import is_schema_typed, get_aggregator, get_column_profile, \
+    set_column_profile
+
 from .encoding import Encoding
 from .autovizwidget import AutoVizWidget
 
@@ -30,6 +34,41 @@ def infer_vegalite_type(data):
     return typecode
 
 
+def _sample(column, sample_rows):
+    """Returns at most sample_rows values of column, evenly spread over it."""
+    if not isinstance(column, pd.Series):
+        column = pd.Series(column)
+    if len(column) <= sample_rows:
+        return column
+    positions = np.linspace(0, len(column) - 1, sample_rows).astype(np.int64)
+    return column.iloc[positions]
+
+
+def profile_columns(data):
+    """
+    Returns the vegalite type of every column in data, inferred from a bounded sample of its values. The profile of
+    a DataFrame is computed once and kept with it for as long as its columns and their dtypes do not change.
+    Parameters
+    ----------
+    data: Pandas DataFrame or dict of array-like columns
+    """
+    signature = None
+    if isinstance(data, pd.DataFrame):
+        signature = [(column_name, str(dtype)) for (column_name, dtype) in zip(data.columns, data.dtypes)]
+        cached = get_column_profile(data)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+    sample_rows = conf.type_inference_sample_rows()
+    profile = dict()
+    for column_name in data:
+        profile[column_name] = infer_vegalite_type(_sample(data[column_name], sample_rows))
+
+    if signature is not None:
+        set_column_profile(data, (signature, profile))
+    return profile
+
+
 def _validate_custom_order(order):
     assert len(order) == 4
     list_to_check = list(order)
@@ -46,10 +85,10 @@ def _classify_data_by_type(data, order, skip=None):
     for typ in order:
         d[typ] = []
 
+    profile = profile_columns(data)
     for column_name in data:
         if column_name not in skip:
-            typ = infer_vegalite_type(data[column_name])
-            d[typ].append(column_name)
+            d[profile[column_name]].append(column_name)
 
     return d
 
@@ -114,24 +153,30 @@ def select_y(data, x_name, order=None, aggregator=None):
 
 
 def coerce_pandas_df_to_numeric_datetime(df):
+    sample_rows = conf.type_inference_sample_rows()
     for column_name in df.columns:
         if df[column_name].dtype == np.dtype("object"):
-            try:
-                df[column_name] = pd.to_datetime(df[column_name], errors="raise")
-            except:
-                pass
+            _try_to_convert(df, column_name, pd.to_datetime, sample_rows)
 
         if df[column_name].dtype == np.dtype("object"):
-            try:
-                df[column_name] = pd.to_numeric(df[column_name], errors="raise")
-            except:
-                pass
+            _try_to_convert(df, column_name, pd.to_numeric, sample_rows)
+
+
+def _try_to_convert(df, column_name, convert, sample_rows):
+    # Most columns that cannot be converted fail on a sample of their values, without scanning the whole column.
+    try:
+        convert(_sample(df[column_name], sample_rows), errors="raise")
+        df[column_name] = convert(df[column_name], errors="raise")
+    except:
+        pass
 
 
 def display_dataframe(df):
-    coerce_pandas_df_to_numeric_datetime(df)
+    # SQL results already have the dtypes of their Spark schema.
+    if not is_schema_typed(df):
+        coerce_pandas_df_to_numeric_datetime(df)
     selected_x = select_x(df)
     selected_y = select_y(df, selected_x)
     encoding = Encoding(chart_type=Encoding.chart_type_table, x=selected_x, y=selected_y,
                         y_aggregation=Encoding.y_agg_max)
-    return AutoVizWidget(df, encoding)
+    return AutoVizWidget(df, encoding, aggregator=get_aggregator(df))
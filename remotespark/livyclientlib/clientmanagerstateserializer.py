@@ -38,11 +38,13 @@ class ClientManagerStateSerializer(object):
                 name = client["name"]
                 session_id = client["id"]
                 sql_context_created = client["sqlcontext"]
+                hive_context_created = client.get("hivecontext", sql_context_created)
                 kind = client["kind"].lower()
                 connection_string = client["connectionstring"]
 
                 session = self._client_factory.create_session(
-                    connection_string, session_id, sql_context_created, {"kind": kind})
+                    connection_string, session_id, sql_context_created, {"kind": kind},
+                    hive_created=hive_context_created)
 
                 # Do not start session automatically. Just create it but skip is not existent.
                 try:
@@ -0,0 +1,16 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+
+class ConstantPollingSchedule(object):
+    """Polling schedule that always returns the same number of seconds to sleep between polls."""
+
+    def __init__(self, seconds_to_sleep):
+        assert seconds_to_sleep > 0
+        self._seconds_to_sleep = seconds_to_sleep
+
+    def seconds_to_sleep(self):
+        return self._seconds_to_sleep
+
+    def reset(self):
+        pass
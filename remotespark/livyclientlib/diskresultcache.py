@@ -0,0 +1,200 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import uuid
+from threading import Lock
+from time import time
+
+import numpy as np
+import pandas as pd
+
+from remotespark.utils.dataframemetadata import mark_schema_typed, is_schema_typed
+from remotespark.utils.filesystemreaderwriter import FileSystemReaderWriter
+from remotespark.utils.log import Log
+from .sqlresultcache import SqlResultCache
+
+
+class DiskResultCache(object):
+    """Cache of SQL and Hive query results on disk, so that they survive kernel restarts. Every result is stored in
+    its own directory, with one npy file per column and a meta.json file, and its columns are memory mapped when it
+    is loaded. Once all the results together take more than max_bytes the least recently used ones are deleted.
+
+    Entries do not expire by themselves: the caller states for every lookup how old a result it will accept."""
+
+    _meta_file_name = "meta.json"
+    _version = 1
+
+    def __init__(self, path, max_bytes):
+        self.logger = Log("DiskResultCache")
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(endpoint, context_name, command, max_rows, sampling=None):
+        return endpoint, context_name, SqlResultCache.normalize_sql(command), max_rows, sampling
+
+    def get(self, key, max_age_seconds):
+        """Returns the DataFrame stored for key less than max_age_seconds ago, or None."""
+        entry_path = self._entry_path(key)
+        meta_path = os.path.join(entry_path, self._meta_file_name)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if meta["version"] != self._version or meta["key"] != self._key_to_json(key):
+                return None
+            if time() - meta["created"] > max_age_seconds:
+                return None
+
+            df = self._load_dataframe(entry_path, meta)
+            # The modification time of the meta file is the last time the entry was used.
+            os.utime(meta_path, None)
+        except (IOError, OSError, ValueError, KeyError) as e:
+            self.logger.debug("Could not read cached result from {}: {}".format(entry_path, e))
+            return None
+
+        return df
+
+    def put(self, key, df):
+        if not self.enabled or not self._is_default_index(df.index):
+            return
+
+        entry_path = self._entry_path(key)
+        # Unique, so that other threads and kernels storing the same result do not write into the same directory.
+        temp_path = "{}.{}.tmp".format(entry_path, uuid.uuid4().hex)
+        try:
+            FileSystemReaderWriter(temp_path).ensure_path_exists()
+            meta = self._save_dataframe(temp_path, df)
+            meta["version"] = self._version
+            meta["key"] = self._key_to_json(key)
+            meta["created"] = time()
+            with open(os.path.join(temp_path, self._meta_file_name), "w") as f:
+                json.dump(meta, f)
+
+            with self._lock:
+                shutil.rmtree(entry_path, ignore_errors=True)
+                os.rename(temp_path, entry_path)
+                self._evict()
+        except (IOError, OSError, pickle.PicklingError) as e:
+            self.logger.error("Could not write cached result to {}: {}".format(entry_path, e))
+        finally:
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+    def clear(self):
+        """Deletes all the results, and the temporary directories left behind by kernels that died while storing
+        one."""
+        with self._lock:
+            for entry_path in self._entry_paths(include_temporary=True):
+                shutil.rmtree(entry_path, ignore_errors=True)
+
+    def size_bytes(self):
+        return sum(self._entry_size(entry_path) for entry_path in self._entry_paths())
+
+    def _evict(self):
+        entries = []
+        for entry_path in self._entry_paths():
+            try:
+                last_used = os.path.getmtime(os.path.join(entry_path, self._meta_file_name))
+            except OSError:
+                last_used = 0
+            entries.append((last_used, entry_path, self._entry_size(entry_path)))
+
+        total_bytes = sum(size for (_, _, size) in entries)
+        for (_, entry_path, size) in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            self.logger.debug("Evicting the least recently used result {}.".format(entry_path))
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_bytes -= size
+
+    def _entry_path(self, key):
+        digest = hashlib.sha256(json.dumps(self._key_to_json(key)).encode("utf-8")).hexdigest()
+        return os.path.join(self.path, digest)
+
+    def _entry_paths(self, include_temporary=False):
+        if not os.path.isdir(self.path):
+            return []
+        return [os.path.join(self.path, name) for name in os.listdir(self.path)
+                if (include_temporary or not name.endswith(".tmp")) and os.path.isdir(os.path.join(self.path, name))]
+
+    @staticmethod
+    def _entry_size(entry_path):
+        size = 0
+        for name in os.listdir(entry_path):
+            try:
+                size += os.path.getsize(os.path.join(entry_path, name))
+            except OSError:
+                pass
+        return size
+
+    @staticmethod
+    def _key_to_json(key):
+        return [str(part) if part is not None else None for part in key]
+
+    @staticmethod
+    def _is_default_index(index):
+        return isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1
+
+    @staticmethod
+    def _save_dataframe(path, df):
+        columns = []
+        for position in range(len(df.columns)):
+            column = df.iloc[:, position]
+            file_name = "{}.npy".format(position)
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                kind = "category"
+                np.save(os.path.join(path, file_name), column.cat.codes.values)
+                with open(os.path.join(path, "{}.categories".format(position)), "wb") as f:
+                    pickle.dump((list(column.cat.categories), column.cat.ordered), f, protocol=2)
+            elif isinstance(column.dtype, np.dtype):
+                kind = "object" if column.dtype == np.object_ else "array"
+                np.save(os.path.join(path, file_name), column.values, allow_pickle=kind == "object")
+            else:
+                # Extension types, like timezone aware timestamps, are stored as they are.
+                kind = "pickle"
+                file_name = "{}.pickle".format(position)
+                with open(os.path.join(path, file_name), "wb") as f:
+                    pickle.dump(column, f, protocol=2)
+            columns.append({"name": column.name, "kind": kind, "file": file_name})
+
+        return {"rows": len(df), "columns": columns, "schema_typed": is_schema_typed(df)}
+
+    @staticmethod
+    def _load_dataframe(path, meta):
+        data = dict()
+        for (position, column) in enumerate(meta["columns"]):
+            file_path = os.path.join(path, column["file"])
+            kind = column["kind"]
+            if kind == "array":
+                # Copy on write, so the DataFrame can be changed without touching the file.
+                data[position] = np.load(file_path, mmap_mode="c")
+            elif kind == "object":
+                data[position] = np.load(file_path, allow_pickle=True)
+            elif kind == "category":
+                with open(os.path.join(path, "{}.categories".format(position)), "rb") as f:
+                    (categories, ordered) = pickle.load(f)
+                codes = np.load(file_path, mmap_mode="c")
+                data[position] = pd.Categorical.from_codes(codes, categories, ordered=ordered)
+            elif kind == "pickle":
+                with open(file_path, "rb") as f:
+                    data[position] = pickle.load(f)
+            else:
+                raise ValueError("Unknown column kind '{}'.".format(kind))
+
+        # Without a copy every column keeps its own block, so the memory mapped columns are not copied into a
+        # consolidated block and stay backed by their files.
+        df = pd.DataFrame(data, index=pd.RangeIndex(meta["rows"]), columns=list(range(len(meta["columns"]))),
+                          copy=False)
+        df.columns = [column["name"] for column in meta["columns"]]
+        if meta["schema_typed"]:
+            mark_schema_typed(df)
+        return df
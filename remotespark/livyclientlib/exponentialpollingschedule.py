@@ -0,0 +1,25 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+
+class ExponentialPollingSchedule(object):
+    """Polling schedule that starts with a short sleep and multiplies it after every poll until it reaches a maximum.
+    Resetting the schedule, e.g. when the polled state changes, starts again from the short sleep."""
+
+    def __init__(self, initial_seconds, multiplier, max_seconds):
+        assert initial_seconds > 0
+        assert multiplier >= 1
+        assert max_seconds >= initial_seconds
+
+        self._initial_seconds = initial_seconds
+        self._multiplier = multiplier
+        self._max_seconds = max_seconds
+        self._next_seconds = initial_seconds
+
+    def seconds_to_sleep(self):
+        seconds = self._next_seconds
+        self._next_seconds = min(self._next_seconds * self._multiplier, self._max_seconds)
+        return seconds
+
+    def reset(self):
+        self._next_seconds = self._initial_seconds
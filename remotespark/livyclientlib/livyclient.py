@@ -1,17 +1,25 @@
 # Copyright (c) 2015  aggftw@gmail.com
 # Distributed under the terms of the Modified BSD License.
 
+import re
+
 import remotespark.utils.configuration as conf
 from remotespark.utils.log import Log
+from remotespark.utils.utils import get_connection_string_elements
 
 
 class LivyClient(object):
-    """Spark client for Livy session"""
+    """Spark client for Livy session. The SQL context of the session is created when the client starts. The Hive
+    context is only created the first time code that uses it runs."""
+
+    _hive_context_variable = re.compile(r"\bhiveContext\b")
 
     def __init__(self, session):
         self.logger = Log("LivyClient")
         self._session = session
         self._execute_timeout_seconds = conf.execute_timeout_seconds()
+        self._follow_logs_timeout_seconds = conf.follow_logs_timeout_seconds()
+        self._last_wait_status = None
 
     def __str__(self):
         return str(self._session)
@@ -28,19 +36,53 @@ class LivyClient(object):
         except ValueError as err:
             return False, "{}".format(err)
 
-    def execute(self, commands):
-        self._session.wait_for_idle(self._execute_timeout_seconds)
+    def follow_logs(self, line_callback):
+        """Passes the new lines of the log of the session to line_callback until the session is idle, or for at most
+        follow_logs_timeout_seconds."""
+        if not self._session.follow_logs(line_callback, self._follow_logs_timeout_seconds):
+            self._session.ipython_display.writeln("Stopped following the logs of session {} after {} seconds. It is "
+                                                  "still running.".format(self.session_id,
+                                                                          self._follow_logs_timeout_seconds))
+
+    def execute(self, commands, show_progress=True):
+        self._create_hive_context_if_used_by(commands)
+        self._last_wait_status = None
+        status_callback = self._show_wait_progress if show_progress else None
+        self._session.wait_for_idle(self._execute_timeout_seconds, status_callback)
         return self._session.execute(commands)
 
-    def execute_sql(self, command):
+    def submit(self, commands):
+        """Submit the commands without waiting for them to finish. Returns a StatementFuture."""
+        self._create_hive_context_if_used_by(commands)
+        return self._session.submit(commands)
+
+    def execute_sql(self, command, max_rows=None, sampling=None, chunk_rows=None):
         return self.execute('sqlContext.sql("{}").collect()'.format(command))
 
-    def execute_hive(self, command):
+    def execute_hive(self, command, max_rows=None, sampling=None, chunk_rows=None):
         return self.execute('hiveContext.sql("{}").collect()'.format(command))
 
     def close_session(self):
         self._session.delete()
 
+    def refresh_status(self):
+        return self._session._refresh_status()
+
+    def set_ipython_display(self, ipython_display):
+        """Sets where the session shows its messages to the user."""
+        self._session.ipython_display = ipython_display
+
+    def _create_hive_context_if_used_by(self, commands):
+        if self._hive_context_variable.search(commands):
+            self._session.create_hive_context()
+
+    def _show_wait_progress(self, status, seconds_waited):
+        if status != self._last_wait_status:
+            self._last_wait_status = status
+            self._session.ipython_display.writeln("Waiting for session {} to become idle. Current status is '{}' "
+                                                  "after {:.0f} seconds.".format(self.session_id, status,
+                                                                                 seconds_waited))
+
     @property
     def kind(self):
         return self._session.kind
@@ -48,3 +90,7 @@ class LivyClient(object):
     @property
     def session_id(self):
         return self._session.id
+
+    @property
+    def endpoint(self):
+        return get_connection_string_elements(self._session.get_state().connection_string).url
@@ -1,11 +1,14 @@
 # Copyright (c) 2015  aggftw@gmail.com
 # Distributed under the terms of the Modified BSD License.
+from threading import Lock
+
 from remotespark.utils.constants import Constants
 import remotespark.utils.configuration as conf
 from remotespark.utils.log import Log
 from remotespark.utils.utils import get_connection_string_elements
 from .linearretrypolicy import LinearRetryPolicy
 from .livyreliablehttpclient import LivyReliableHttpClient
+from .reliablehttpclient import ReliableHttpClient
 from .livysession import LivySession
 from .pandaspysparklivyclient import PandasPysparkLivyClient
 from .pandasscalalivyclient import PandasScalaLivyClient
@@ -15,6 +18,10 @@ from .pandasrlivyclient import PandasRLivyClient
 class LivyClientFactory(object):
     """Spark client factory"""
 
+    # Pooled http sessions are shared by all the clients created for the same connection string.
+    _http_sessions = dict()
+    _http_sessions_lock = Lock()
+
     def __init__(self):
         self.logger = Log("LivyClientFactory")
         self.max_results = conf.max_results_sql()
@@ -33,10 +40,11 @@ class LivyClientFactory(object):
             raise ValueError("Kind '{}' is not supported.".format(kind))
 
     @staticmethod
-    def create_session(ipython_display, connection_string, properties, session_id="-1", sql_created=False):
+    def create_session(ipython_display, connection_string, properties, session_id="-1", sql_created=False,
+                       hive_created=None):
         http_client = LivyClientFactory.create_http_client(connection_string)
 
-        session = LivySession(ipython_display, http_client, session_id, sql_created, properties)
+        session = LivySession(ipython_display, http_client, session_id, sql_created, properties, hive_created)
 
         return session
 
@@ -45,4 +53,14 @@ class LivyClientFactory(object):
         cso = get_connection_string_elements(connection_string)
 
         retry_policy = LinearRetryPolicy(seconds_to_sleep=5, max_retries=5)
-        return LivyReliableHttpClient(cso.url, cso.username, cso.password, retry_policy)
+        http_session = LivyClientFactory._get_http_session(connection_string)
+        return LivyReliableHttpClient(cso.url, cso.username, cso.password, retry_policy, http_session)
+
+    @staticmethod
+    def _get_http_session(connection_string):
+        with LivyClientFactory._http_sessions_lock:
+            http_session = LivyClientFactory._http_sessions.get(connection_string)
+            if http_session is None:
+                http_session = ReliableHttpClient.create_http_session()
+                LivyClientFactory._http_sessions[connection_string] = http_session
+            return http_session
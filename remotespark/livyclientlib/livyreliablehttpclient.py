@@ -7,6 +7,6 @@ from .reliablehttpclient import ReliableHttpClient
 class LivyReliableHttpClient(ReliableHttpClient):
     """Default headers."""
 
-    def __init__(self, url, username, password, retry_policy):
+    def __init__(self, url, username, password, retry_policy, http_session=None):
         super(LivyReliableHttpClient, self).__init__(url, {"Content-Type": "application/json"},
-                                                     username, password, retry_policy)
+                                                     username, password, retry_policy, http_session)
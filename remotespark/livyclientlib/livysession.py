@@ -1,20 +1,31 @@
 ﻿# Copyright (c) 2015  aggftw@gmail.com
 # Distributed under the terms of the Modified BSD License.
 
+from collections import deque
 import textwrap
-from time import sleep, time
+from time import sleep
+try:
+    from time import monotonic
+except ImportError:
+    from time import time as monotonic
+
 import remotespark.utils.configuration as conf
 from remotespark.utils.constants import Constants
 from remotespark.utils.log import Log
+from .constantpollingschedule import ConstantPollingSchedule
+from .exponentialpollingschedule import ExponentialPollingSchedule
 from .livyclienttimeouterror import LivyClientTimeoutError
+from .livystatementcancellederror import LivyStatementCancelledError
 from .livyunexpectedstatuserror import LivyUnexpectedStatusError
 from .livysessionstate import LivySessionState
+from .statementfuture import StatementFuture
+from .statementpoller import StatementPoller
 
 
 class LivySession(object):
     """Session that is livy specific."""
 
-    def __init__(self, ipython_display, http_client, session_id, sql_created, properties):
+    def __init__(self, ipython_display, http_client, session_id, sql_created, properties, hive_created=None):
         assert "kind" in properties.keys()
         kind = properties["kind"]
         self.properties = properties
@@ -23,14 +34,25 @@ class LivySession(object):
         status_sleep_seconds = conf.status_sleep_seconds()
         statement_sleep_seconds = conf.statement_sleep_seconds()
         create_sql_context_timeout_seconds = conf.create_sql_context_timeout_seconds()
+        polling_schedule = conf.polling_schedule()
 
         assert status_sleep_seconds > 0
         assert statement_sleep_seconds > 0
         assert create_sql_context_timeout_seconds > 0
-        if session_id == "-1" and sql_created is True:
+        assert conf.log_lines_per_request() > 0
+        if session_id == "-1" and (sql_created is True or hive_created is True):
             raise ValueError("Cannot indicate sql state without session id.")
+        if polling_schedule not in Constants.polling_schedules_supported:
+            raise ValueError("Polling schedule '{}' not supported. Polling schedule must be one of {}."
+                             .format(polling_schedule, ", ".join(Constants.polling_schedules_supported)))
 
         self.logger = Log("LivySession")
+        if polling_schedule == Constants.polling_schedule_exponential:
+            for config in [conf.status_sleep_seconds.__name__, conf.statement_sleep_seconds.__name__]:
+                if conf.is_overridden(config):
+                    self.logger.warning("{} is deprecated and only used by the '{}' polling schedule. Set "
+                                        "polling_initial_seconds, polling_multiplier and polling_max_seconds instead."
+                                        .format(config, Constants.polling_schedule_constant))
 
         kind = kind.lower()
         if kind not in Constants.session_kinds_supported:
@@ -40,17 +62,24 @@ class LivySession(object):
         if session_id == "-1":
             self._status = Constants.not_started_session_status
             sql_created = False
+            hive_created = False
         else:
             self._status = Constants.busy_session_status
 
-        self._logs = ""
+        # Last lines of the log of the session and position in the log of the next line to fetch.
+        self._log_lines = deque(maxlen=conf.max_log_lines())
+        self._log_offset = 0
         self._http_client = http_client
         self._status_sleep_seconds = status_sleep_seconds
         self._statement_sleep_seconds = statement_sleep_seconds
         self._create_sql_context_timeout_seconds = create_sql_context_timeout_seconds
+        self._polling_schedule = polling_schedule
+        self._log_lines_per_request = conf.log_lines_per_request()
+        self._single_statement_endpoint_supported = True
+        self._statement_poller = None
 
         self._state = LivySessionState(session_id, http_client.connection_string,
-                                       kind, sql_created)
+                                       kind, sql_created, hive_context_created=hive_created)
 
     def __str__(self):
         return "Session id: {}\tKind: {}\tState: {}".format(self.id, self.kind, self._status)
@@ -70,19 +99,30 @@ class LivySession(object):
         self.logger.debug("Session '{}' started.".format(self.kind))
 
     def create_sql_context(self):
-        """Create a sqlContext object on the session. Object will be accessible via variable 'sqlContext'."""
+        """Create a sqlContext object on the session, if there is none yet. Object will be accessible via variable
+        'sqlContext'."""
         if self.started_sql_context:
             return
 
-        self.logger.debug("Starting '{}' sql and hive session.".format(self.kind))
+        self.logger.debug("Starting '{}' sql session.".format(self.kind))
 
         self.ipython_display.writeln("Creating SqlContext as 'sqlContext'")
         self._create_context(Constants.context_name_sql)
 
+        self._state.sql_context_created = True
+
+    def create_hive_context(self):
+        """Create a hiveContext object on the session, if there is none yet. Object will be accessible via variable
+        'hiveContext'."""
+        if self.started_hive_context:
+            return
+
+        self.logger.debug("Starting '{}' hive session.".format(self.kind))
+
         self.ipython_display.writeln("Creating HiveContext as 'hiveContext'")
         self._create_context(Constants.context_name_hive)
 
-        self._state.sql_context_created = True
+        self._state.hive_context_created = True
 
     def _create_context(self, context_type):
         if context_type == Constants.context_name_sql:
@@ -108,14 +148,20 @@ class LivySession(object):
     def started_sql_context(self):
         return self._state.sql_context_created
 
+    @property
+    def started_hive_context(self):
+        return self._state.hive_context_created
+
     @property
     def kind(self):
         return self._state.kind
 
     @property
     def logs(self):
+        """The last max_log_lines lines of the log of the session. Only the lines added since the last call are
+        downloaded."""
         self._refresh_logs()
-        return self._logs
+        return "\n".join(self._log_lines)
 
     @property
     def http_client(self):
@@ -124,16 +170,50 @@ class LivySession(object):
     @staticmethod
     def is_final_status(status):
         return status in Constants.final_status
+
+    @staticmethod
+    def is_statement_running(status):
+        return status in Constants.running_statement_states
     
     def execute(self, commands):
-        code = textwrap.dedent(commands)
-
-        data = {"code": code}
-        r = self._http_client.post(self._statements_url(), [201], data)
-        statement_id = r.json()['id']
+        statement_id = self._post_statement(commands)
         
         return self._get_statement_output(statement_id)
 
+    def submit(self, commands):
+        """Submit code to the session without waiting for it to finish. Returns a StatementFuture that completes
+        when the statement finishes. All the in-flight statements of the session are polled by a single background
+        poller."""
+        statement_id = self._post_statement(commands)
+
+        future = StatementFuture(self, statement_id)
+        if self._statement_poller is None:
+            polling_schedule = self._create_polling_schedule(self._statement_sleep_seconds)
+            self._statement_poller = StatementPoller(self, polling_schedule)
+        self._statement_poller.add(future)
+
+        return future
+
+    def cancel_statement(self, statement_id):
+        """Asks Livy to cancel the statement. Returns whether Livy accepted to cancel it."""
+        self.logger.debug("Cancelling statement {} in session {}.".format(statement_id, self.id))
+        r = self._http_client.post("{}/cancel".format(self._statement_url(statement_id)), [200, 404], {})
+        if r.status_code == 404:
+            self.logger.error("Livy could not cancel statement {} in session {}. It will keep running."
+                              .format(statement_id, self.id))
+            return False
+        return True
+
+    def get_statement_result(self, statement_id):
+        """Returns the (state, result) tuple of the statement, where result is the (success, output) tuple that
+        execute returns, or None while the statement is running. Raises LivyStatementCancelledError if the
+        statement was cancelled."""
+        statement = self._get_statement(statement_id)
+        state = statement["state"]
+        if self.is_statement_running(state):
+            return state, None
+        return state, self._get_statement_result(statement)
+
     def delete(self):
         self.logger.debug("Deleting session '{}'".format(self.id))
 
@@ -145,40 +225,87 @@ class LivySession(object):
             raise ValueError("Cannot delete session {} that is in state '{}'."
                              .format(self.id, self._status))
 
-    def wait_for_idle(self, seconds_to_wait):
-        """Wait for session to go to idle status. Sleep meanwhile. Calls done every status_sleep_seconds as
-        indicated by the constructor.
+    def wait_for_idle(self, seconds_to_wait, status_callback=None):
+        """Wait for session to go to idle status. Sleep meanwhile. Calls are spaced by the configured polling
+        schedule, which starts over every time the status of the session changes.
 
         Parameters:
             seconds_to_wait : number of seconds to wait before giving up.
+            status_callback : optional function called with the current status and the seconds waited so far
+                              every time the session is found not to be idle yet.
         """
-        self._refresh_status()
-        current_status = self._status
-        if current_status == Constants.idle_session_status:
-            return
-
-        if current_status in Constants.final_status:
-            error = "Session {} unexpectedly reached final status {}. See logs:\n{}"\
-                .format(self.id, current_status, self.logs)
-            self.logger.error(error)
-            raise LivyUnexpectedStatusError(error)
-
-        if seconds_to_wait <= 0.0:
-            error = "Session {} did not reach idle status in time. Current status is {}."\
-                .format(self.id, current_status)
-            self.logger.error(error)
-            raise LivyClientTimeoutError(error)
-
-        start_time = time()
-        self.logger.debug("Session {} in state {}. Sleeping {} seconds."
-                          .format(self.id, current_status, seconds_to_wait))
-        sleep(self._status_sleep_seconds)
-        elapsed = (time() - start_time)
-        return self.wait_for_idle(seconds_to_wait - elapsed)
+        start_time = monotonic()
+        deadline = start_time + seconds_to_wait
+        polling_schedule = self._create_polling_schedule(self._status_sleep_seconds)
+        previous_status = None
+
+        while True:
+            current_status = self._refresh_status()
+            if current_status == Constants.idle_session_status:
+                return
+
+            if current_status in Constants.final_status:
+                error = "Session {} unexpectedly reached final status {}. See logs:\n{}"\
+                    .format(self.id, current_status, self.logs)
+                self.logger.error(error)
+                raise LivyUnexpectedStatusError(error)
+
+            now = monotonic()
+            if now >= deadline:
+                error = "Session {} did not reach idle status in time. Current status is {}."\
+                    .format(self.id, current_status)
+                self.logger.error(error)
+                raise LivyClientTimeoutError(error)
+
+            if current_status != previous_status:
+                self.logger.debug("Session {} in state {}.".format(self.id, current_status))
+                polling_schedule.reset()
+                previous_status = current_status
+
+            if status_callback is not None:
+                status_callback(current_status, now - start_time)
+
+            sleep(min(polling_schedule.seconds_to_sleep(), deadline - now))
+
+    def follow_logs(self, line_callback, seconds_to_follow):
+        """Passes every new line of the log of the session to line_callback, until the session is no longer
+        starting or busy. The log is polled with the configured polling schedule, which starts over every time new
+        lines arrive. Returns False if the session was still starting or busy after seconds_to_follow seconds, and
+        True otherwise."""
+        deadline = monotonic() + seconds_to_follow
+        polling_schedule = self._create_polling_schedule(self._status_sleep_seconds)
+
+        while True:
+            status = self._refresh_status()
+            lines = self._refresh_logs()
+            for line in lines:
+                line_callback(line)
+
+            if status not in [Constants.starting_session_status, Constants.busy_session_status]:
+                return True
+
+            now = monotonic()
+            if now >= deadline:
+                self.logger.debug("Stopped following the logs of session {} in state {}.".format(self.id, status))
+                return False
+
+            if lines:
+                polling_schedule.reset()
+            sleep(min(polling_schedule.seconds_to_sleep(), deadline - now))
 
     def _statements_url(self):
         return "/sessions/{}/statements".format(self.id)
 
+    def _statement_url(self, statement_id):
+        return "/sessions/{}/statements/{}".format(self.id, statement_id)
+
+    def _create_polling_schedule(self, constant_seconds):
+        if self._polling_schedule == Constants.polling_schedule_exponential:
+            return ExponentialPollingSchedule(conf.polling_initial_seconds(), conf.polling_multiplier(),
+                                              conf.polling_max_seconds())
+        else:
+            return ConstantPollingSchedule(constant_seconds)
+
     def _refresh_status(self):
         status = self._get_latest_status()
 
@@ -190,7 +317,15 @@ class LivySession(object):
         return self._status
 
     def _refresh_logs(self):
-        self._logs = self._get_latest_logs()
+        """Fetches the lines added to the log since the last call and returns them."""
+        new_lines = []
+        while True:
+            lines = self._get_log_lines(self._log_offset, self._log_lines_per_request)
+            new_lines.extend(lines)
+            self._log_lines.extend(lines)
+            self._log_offset += len(lines)
+            if len(lines) < self._log_lines_per_request:
+                return new_lines
 
     def _get_latest_status(self):
         r = self._http_client.get("/sessions/{}".format(self.id), [200])
@@ -198,39 +333,86 @@ class LivySession(object):
                     
         return session['state']
 
-    def _get_latest_logs(self):
-        r = self._http_client.get("/sessions/{}/log?from=0".format(self.id), [200])
-        log_array = r.json()['log']
-        logs = "\n".join(log_array)
-
-        return logs
+    def _get_log_lines(self, offset, size):
+        r = self._http_client.get("/sessions/{}/log?from={}&size={}".format(self.id, offset, size), [200])
+        log = r.json()
+        if log.get("total", offset) < offset:
+            # The log was truncated by the server, start over.
+            self.logger.debug("Log of session {} is shorter than {} lines. Reading it from the start."
+                              .format(self.id, offset))
+            self._log_lines.clear()
+            self._log_offset = 0
+            return self._get_log_lines(0, size)
+        return log["log"]
     
     def _get_statement_output(self, statement_id):
         statement_running = True
         out = ""
+        polling_schedule = self._create_polling_schedule(self._statement_sleep_seconds)
+        previous_status = None
         while statement_running:
-            r = self._http_client.get(self._statements_url(), [200])
-            statement = [i for i in r.json()["statements"] if i["id"] == statement_id][0]
+            statement = self._get_statement(statement_id)
             status = statement["state"]
 
             self.logger.debug("Status of statement {} is {}.".format(statement_id, status))
 
-            if status == "running":
-                sleep(self._statement_sleep_seconds)
+            if status != previous_status:
+                polling_schedule.reset()
+                previous_status = status
+
+            if self.is_statement_running(status):
+                sleep(polling_schedule.seconds_to_sleep())
             else:
                 statement_running = False
-                
-                statement_output = statement["output"]
-                if statement_output["status"] == "ok":
-                    out = (True, statement_output["data"]["text/plain"])
-                elif statement_output["status"] == "error":
-                    out = (False, statement_output["evalue"] + "\n" +
-                           "".join(statement_output["traceback"]))
-                else:
-                    raise ValueError("Unknown output status: '{}'".format(statement_output["status"]))
+                out = self._get_statement_result(statement)
 
         return out
 
+    def _post_statement(self, commands):
+        code = textwrap.dedent(commands)
+
+        data = {"code": code}
+        r = self._http_client.post(self._statements_url(), [201], data)
+        return r.json()['id']
+
+    @staticmethod
+    def _get_statement_result(statement):
+        if statement["state"] == Constants.cancelled_statement_state:
+            raise LivyStatementCancelledError("Statement {} was cancelled.".format(statement["id"]))
+
+        statement_output = statement.get("output")
+        if statement_output is None:
+            raise ValueError("Statement {} finished in state '{}' without output."
+                             .format(statement["id"], statement["state"]))
+        if statement_output["status"] == "ok":
+            return True, statement_output["data"]["text/plain"]
+        elif statement_output["status"] == "error":
+            return False, statement_output["evalue"] + "\n" + "".join(statement_output["traceback"])
+        else:
+            raise ValueError("Unknown output status: '{}'".format(statement_output["status"]))
+
+    def _get_statement(self, statement_id):
+        if self._single_statement_endpoint_supported:
+            r = self._http_client.get(self._statement_url(statement_id), [200, 404])
+            if r.status_code == 200:
+                return r.json()
+
+        statement = self._find_statement(statement_id)
+        if self._single_statement_endpoint_supported:
+            # Older Livy servers can only list all statements in the session. The statement exists, so it is the
+            # endpoint that is missing rather than the statement.
+            self.logger.debug("Could not get statement {} by id. Falling back to listing all statements."
+                              .format(statement_id))
+            self._single_statement_endpoint_supported = False
+        return statement
+
+    def _find_statement(self, statement_id):
+        r = self._http_client.get(self._statements_url(), [200])
+        statements = [i for i in r.json()["statements"] if i["id"] == statement_id]
+        if len(statements) == 0:
+            raise ValueError("Statement {} not found in session {}.".format(statement_id, self.id))
+        return statements[0]
+
     def _get_sql_context_creation_command(self):
         if self.kind == Constants.session_kind_spark:
             sql_context_command = "val sqlContext = new org.apache.spark.sql.SQLContext(sc)\n" \
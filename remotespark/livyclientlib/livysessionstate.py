@@ -3,10 +3,16 @@
 
 
 class LivySessionState(object):
-    def __init__(self, session_id, connection_string, kind, sql_context_created, version="0.0.0"):
+    def __init__(self, session_id, connection_string, kind, sql_context_created, version="0.0.0",
+                 hive_context_created=None):
         self._session_id = session_id
         self._kind = kind
         self._sql_context_created = sql_context_created
+        # Both contexts used to be created together, so states without hive context information have it if they
+        # have the sql context.
+        if hive_context_created is None:
+            hive_context_created = sql_context_created
+        self._hive_context_created = hive_context_created
         self._version = version
         self._connection_string = connection_string
 
@@ -30,6 +36,14 @@ class LivySessionState(object):
     def sql_context_created(self, value):
         self._sql_context_created = value
 
+    @property
+    def hive_context_created(self):
+        return self._hive_context_created
+
+    @hive_context_created.setter
+    def hive_context_created(self, value):
+        self._hive_context_created = value
+
     @property
     def version(self):
         return self._version
@@ -40,4 +54,5 @@ class LivySessionState(object):
 
     def to_dict(self):
         return {"id": self.session_id, "kind": self.kind, "sqlcontext": self.sql_context_created,
-                "version": self.version, "connectionstring": self.connection_string}
+                "hivecontext": self.hive_context_created, "version": self.version,
+                "connectionstring": self.connection_string}
@@ -0,0 +1,6 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+
+class LivyStatementCancelledError(Exception):
+    """An exception for asking for the result of a statement that was cancelled."""
@@ -1,10 +1,18 @@
 # Copyright (c) 2015  aggftw@gmail.com
 # Distributed under the terms of the Modified BSD License.
 
+import base64
 import pandas as pd
 import json
+import zlib
+from io import StringIO
+
+import remotespark.utils.configuration as conf
+from remotespark.utils.constants import Constants
+from remotespark.utils.dataframemetadata import mark_schema_typed
 from .livyclient import LivyClient
 from .dataframeparseexception import DataFrameParseException
+from .sqlsampling import SqlSampling
 
 class PandasLivyClientBase(LivyClient):
     """Spark client for Livy session that produces pandas df for sql and hive commands."""
@@ -12,39 +20,244 @@ class PandasLivyClientBase(LivyClient):
         super(PandasLivyClientBase, self).__init__(session)
         self.max_take_rows = max_take_rows
 
-    def execute_sql(self, command):
-        return self._execute_dataframe_helper("sqlContext", command)
+        transfer_format = conf.sql_transfer_format()
+        if transfer_format not in Constants.sql_transfer_formats_supported:
+            raise ValueError("SQL transfer format '{}' not supported. Transfer format must be one of {}."
+                             .format(transfer_format, ", ".join(Constants.sql_transfer_formats_supported)))
+        self.transfer_format = transfer_format
+        self.max_category_ratio = conf.max_category_ratio_sql()
+        self.chunk_rows = conf.chunk_rows_sql()
+        self._chunked_results_opened = 0
+
+    def execute_sql(self, command, max_rows=None, sampling=None, chunk_rows=None):
+        """Returns the result of the query as one DataFrame. Results of more than chunk_rows rows are fetched in
+        chunks of chunk_rows rows, which defaults to chunk_rows_sql. A chunk_rows of 0 fetches the result at once."""
+        return self._execute_dataframe_helper("sqlContext", command, max_rows, sampling, chunk_rows)
+
+    def execute_hive(self, command, max_rows=None, sampling=None, chunk_rows=None):
+        return self._execute_dataframe_helper("hiveContext", command, max_rows, sampling, chunk_rows)
+
+    def iter_sql(self, command, chunk_rows=None, max_rows=None, sampling=None):
+        """Yields the result of the query as DataFrames of at most chunk_rows rows, each one as soon as it has been
+        fetched. The whole result is fetched if max_rows is None."""
+        return self.iter_dataframe_chunks("sqlContext", command, max_rows, self._get_chunk_rows(chunk_rows),
+                                          sampling)
+
+    def iter_hive(self, command, chunk_rows=None, max_rows=None, sampling=None):
+        return self.iter_dataframe_chunks("hiveContext", command, max_rows, self._get_chunk_rows(chunk_rows),
+                                          sampling)
+
+    def _get_chunk_rows(self, chunk_rows):
+        if chunk_rows is None:
+            chunk_rows = self.chunk_rows if self.chunk_rows > 0 else self.max_take_rows
+        if chunk_rows < 1:
+            raise ValueError("Chunks must have at least one row.")
+        return chunk_rows
+
+    def _execute_dataframe_helper(self, context_name, command, max_rows=None, sampling=None, chunk_rows=None):
+        if max_rows is None:
+            max_rows = self.max_take_rows
+        if sampling is None:
+            sampling = SqlSampling()
+        if chunk_rows is None:
+            chunk_rows = self.chunk_rows
+        if 0 < chunk_rows < max_rows:
+            # Chunks take precedence over the transfer format: they are always fetched as JSON.
+            if self.transfer_format != Constants.sql_transfer_format_json:
+                self.logger.debug("Fetching up to {} rows in chunks of {} rows as JSON instead of as '{}'. Set "
+                                  "chunk_rows_sql to 0 to use '{}'.".format(max_rows, chunk_rows,
+                                                                            self.transfer_format, self.transfer_format))
+            # Pages are typed once they are all together, so that categories are built from the whole result.
+            chunks = list(self._iter_raw_chunks(context_name, command, max_rows, chunk_rows, sampling))
+            if len(chunks) == 1:
+                df = chunks[0][1]
+            else:
+                df = pd.concat([df for (_, df) in chunks], ignore_index=True)
+            return self.apply_schema(df, chunks[0][0])
 
-    def execute_hive(self, command):
-        return self._execute_dataframe_helper("hiveContext", command)
+        if self.transfer_format == Constants.sql_transfer_format_csv_gzip:
+            (success, payload) = self.get_compressed_records(context_name, command, str(max_rows), sampling)
+            if not success:
+                raise DataFrameParseException(payload)
+            return self.get_compressed_dataframe(payload)
 
-    def _execute_dataframe_helper(self, context_name, command):
-        (success, records_text) = self.get_records(context_name, command,
-                                                   str(self.max_take_rows))
+        (success, records_text) = self.get_records(context_name, command, str(max_rows), sampling)
         if not success:
             raise DataFrameParseException(records_text)
+
+        # The first line is the schema of the result and the rest are the rows.
+        (schema_text, _, records_text) = records_text.partition("\n")
+        fields = self.get_schema_fields(schema_text)
         if self.no_records(records_text):
-            # If there are no records, show some columns at least.
-            records_text = self.get_columns(context_name, command)
-            return self.get_columns_dataframe(records_text)
+            df = pd.DataFrame.from_records([], columns=[field["name"] for field in fields])
         else:
-            return self.get_data_dataframe(records_text)
+            df = self.get_data_dataframe(records_text)
+        return self.apply_schema(df, fields)
 
 
-    def get_columns(self, context_name, command):
-        (success, out) = self.execute(self.make_context_columns(context_name,
-                                                                command))
-        if success:
-            return out
-        else:
+    def get_data_dataframe(self, records_text):
+        # Decoding all the rows with one call to the JSON parser is much faster, and needs less memory, than
+        # splitting the text and decoding the rows one by one.
+        try:
+            records = json.loads("[" + records_text.replace("\n", ",") + "]")
+        except ValueError:
+            records = None
+
+        if records is None or len(records) != records_text.count("\n") + 1:
+            return self._get_data_dataframe_by_row(records_text)
+
+        return pd.DataFrame(records)
+
+
+    def iter_dataframe_chunks(self, context_name, command, max_rows, chunk_rows, sampling=None):
+        """Runs the query once, keeps its rows cached in the session and yields them as DataFrames of at most
+        chunk_rows rows, each fetched with its own statement, so that neither Livy nor the kernel ever holds more
+        than a page of text. At most max_rows rows are fetched, or all of them if max_rows is None, and at least one,
+        maybe empty, DataFrame is yielded.
+        The cached rows are released when the generator finishes or is closed."""
+        if sampling is None:
+            sampling = SqlSampling()
+        for (fields, df) in self._iter_raw_chunks(context_name, command, max_rows, chunk_rows, sampling):
+            yield self.apply_schema(df, fields)
+
+
+    def _iter_raw_chunks(self, context_name, command, max_rows, chunk_rows, sampling):
+        self._chunked_results_opened += 1
+        name = "{}_{}".format(Constants.long_random_variable_name, self._chunked_results_opened)
+
+        (success, out) = self.execute(self.make_open_chunked_result(name, context_name, command, sampling))
+        if not success:
             raise DataFrameParseException(out)
+        # The interpreter may echo the variables it defines around the schema.
+        schema_lines = [line[len(Constants.chunked_schema_prefix):] for line in out.split("\n")
+                        if line.startswith(Constants.chunked_schema_prefix)]
+        if len(schema_lines) == 0:
+            raise DataFrameParseException("Cannot find the schema of the result in: '{}'".format(out))
+        fields = self.get_schema_fields(schema_lines[0])
 
+        try:
+            fetched = 0
+            while True:
+                rows = chunk_rows if max_rows is None else min(chunk_rows, max_rows - fetched)
+                (success, records_text) = self.execute(self.make_fetch_chunk(name, rows))
+                if not success:
+                    raise DataFrameParseException(records_text)
 
-    def get_columns_dataframe(self, columns_text):
-        return pd.DataFrame.from_records([], columns=columns_text.split('\n'))
+                if self.no_records(records_text):
+                    if fetched == 0:
+                        yield fields, pd.DataFrame.from_records([], columns=[field["name"] for field in fields])
+                    return
 
+                df = self.get_data_dataframe(records_text)
+                fetched += len(df)
+                yield fields, df
 
-    def get_data_dataframe(self, records_text):
+                if len(df) < rows or (max_rows is not None and fetched >= max_rows):
+                    return
+        finally:
+            (success, out) = self.execute(self.make_close_chunked_result(name))
+            if not success:
+                self.logger.error("Could not release the cached rows of query '{}': {}".format(command, out))
+
+
+    def get_schema_fields(self, schema_text):
+        try:
+            return json.loads(schema_text)["fields"]
+        except (ValueError, TypeError, KeyError):
+            raise DataFrameParseException("Cannot parse schema as JSON: '{}'".format(schema_text))
+
+
+    def apply_schema(self, df, fields):
+        """Gives every column of df the dtype that matches its Spark type and marks df as typed, so that the
+        dtypes do not need to be guessed again when it is displayed."""
+        columns = [field["name"] for field in fields]
+        if len(columns) == 0:
+            df = pd.DataFrame()
+            mark_schema_typed(df)
+            return df
+
+        # Rows encoded as JSON leave out null values, so columns that are null in every row are missing.
+        if list(df.columns) != columns:
+            df = df.reindex(columns=columns)
+
+        df = pd.concat([self._apply_spark_type(df.iloc[:, position], field["type"])
+                        for (position, field) in enumerate(fields)], axis=1)
+        df.columns = columns
+        mark_schema_typed(df)
+        return df
+
+
+    def _apply_spark_type(self, column, spark_type):
+        if spark_type in ["byte", "short", "integer", "long"]:
+            return column.astype("int64") if column.notnull().all() else column.astype("float64")
+        elif spark_type in ["float", "double"] or str(spark_type).startswith("decimal"):
+            return column.astype("float64")
+        elif spark_type == "boolean":
+            return column.astype("bool") if column.notnull().all() else column
+        elif spark_type in ["date", "timestamp"]:
+            try:
+                return pd.to_datetime(column)
+            except (ValueError, TypeError):
+                return column
+        elif spark_type == "string":
+            if 0 < column.nunique() <= self.max_category_ratio * len(column):
+                return column.astype("category")
+            return column.astype(object)
+        else:
+            return column
+
+
+    def get_compressed_dataframe(self, payload):
+        """Decodes the output of get_compressed_records: base64 of the gzip of a first line with the Spark schema as
+        JSON followed by the rows as CSV, where every value is quoted, every string starts with
+        Constants.csv_string_prefix and nulls are left empty. The prefix tells empty strings from nulls, and no
+        other value, like "NA" or "null", is read as null."""
+        try:
+            text = zlib.decompress(base64.b64decode(payload.strip()), 16 + zlib.MAX_WBITS).decode("utf-8")
+        except (ValueError, TypeError, zlib.error):
+            raise DataFrameParseException("Cannot decode compressed records: '{}'".format(payload[:100]))
+
+        (schema_text, separator, rows_text) = text.partition("\n")
+        fields = self.get_schema_fields(schema_text)
+        columns = [field["name"] for field in fields]
+        # A single row with a single null column is an empty line, so only a missing line means no rows.
+        if separator == "":
+            return self.apply_schema(pd.DataFrame.from_records([], columns=columns), fields)
+        if rows_text.strip("\n") == "":
+            # The CSV parser finds no data in blank lines only.
+            return self.apply_schema(pd.DataFrame([[None] * len(columns)] * (rows_text.count("\n") + 1),
+                                                  columns=columns), fields)
+
+        # Columns are read by position because Spark allows several columns to have the same name. Blank lines are
+        # rows with a single null column, and the last one is only read if it ends with a line break.
+        dtypes = dict()
+        date_columns = []
+        string_columns = []
+        na_values = dict()
+        for (position, field) in enumerate(fields):
+            spark_type = field["type"]
+            na_values[position] = [""]
+            if spark_type in ["date", "timestamp"]:
+                date_columns.append(position)
+            elif spark_type in ["float", "double"] or str(spark_type).startswith("decimal"):
+                dtypes[position] = "float64"
+                # NaN is written as nan by Python and as NaN by Scala.
+                na_values[position] = ["", "nan", "NaN"]
+            elif spark_type not in ["byte", "short", "integer", "long", "boolean"]:
+                dtypes[position] = object
+                if spark_type == "string":
+                    string_columns.append(position)
+
+        df = pd.read_csv(StringIO(rows_text + "\n"), header=None, names=list(range(len(columns))), dtype=dtypes,
+                         parse_dates=date_columns, keep_default_na=False, na_values=na_values,
+                         skip_blank_lines=False)
+        for position in string_columns:
+            df[position] = df[position].str[len(Constants.csv_string_prefix):]
+        df.columns = columns
+        return self.apply_schema(df, fields)
+
+
+    def _get_data_dataframe_by_row(self, records_text):
         strings = records_text.split('\n')
         try:
             return pd.DataFrame([json.loads(s) for s in strings])
@@ -53,11 +266,38 @@ class PandasLivyClientBase(LivyClient):
 
 
     # Please override here down
-    def make_context_columns(self, context_name, command):
+    def make_dataframe(self, name, context_name, command, sampling):
+        """Code that assigns the result of the query, with its rows picked as described by sampling, to the variable
+        name_df. Sampling happens in the session, before any row is sent back."""
+        raise NotImplementedError()
+
+
+    # Each of these runs exactly one statement, so that a query is planned and run only once, even when it returns
+    # no rows.
+    def get_records(self, context_name, command, max_take_rows, sampling):
+        """Returns the schema of the result as JSON on the first line followed by one JSON document per row."""
+        raise NotImplementedError()
+
+
+    def get_compressed_records(self, context_name, command, max_take_rows, sampling):
+        """Returns the output described in get_compressed_dataframe."""
+        raise NotImplementedError()
+
+
+    # Chunked results are the exception: they take one statement to cache the rows, one per page and one to release
+    # them. The rows are kept in variables whose names start with name.
+    def make_open_chunked_result(self, name, context_name, command, sampling):
+        """Code that caches the rows of the query as JSON and prints the schema of the result on a line that starts
+        with Constants.chunked_schema_prefix."""
+        raise NotImplementedError()
+
+
+    def make_fetch_chunk(self, name, rows):
+        """Code that prints the next rows, at most rows of them, as one JSON document per line."""
         raise NotImplementedError()
 
 
-    def get_records(self, context_name, command, max_take_rows):
+    def make_close_chunked_result(self, name):
         raise NotImplementedError()
 
 
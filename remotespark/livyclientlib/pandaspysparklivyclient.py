@@ -1,6 +1,8 @@
 # Copyright (c) 2015  aggftw@gmail.com
 # Distributed under the terms of the Modified BSD License.
 
+import json
+
 from remotespark.utils.constants import Constants
 from .pandaslivyclientbase import PandasLivyClientBase
 
@@ -8,13 +10,62 @@ from .pandaslivyclientbase import PandasLivyClientBase
 class PandasPysparkLivyClient(PandasLivyClientBase):
     """Spark client for Livy session in PySpark"""
 
-    def make_context_columns(self, context_name, command):
-        return 'for {} in {}.sql("""{}""").columns: print({})'.format(Constants.long_random_variable_name,
-                                                                      context_name, command,
-                                                                      Constants.long_random_variable_name)
+    def make_dataframe(self, name, context_name, command, sampling):
+        code = '{0}_df = {1}.sql("""{2}""")'.format(name, context_name, command)
+        if sampling.method == Constants.sample_method_sample:
+            code += '.sample(False, {0!r}, {1!r})'.format(float(sampling.fraction), sampling.seed)
+        elif sampling.method == Constants.sample_method_stratified:
+            # sampleBy needs the fraction of every value of the column, and leaves out the values it is not given.
+            # It only takes numbers and strings, and not null, so the rows are sampled by the value of the column
+            # as a string and the rows where it is null are left out.
+            code += '''
+{0}_strata = {0}_df.withColumn("{0}_stratum", {0}_df[{1}].cast("string"))
+{0}_df = {0}_strata.sampleBy("{0}_stratum", dict(({0}_row[0], {2!r}) for {0}_row in \
+{0}_strata.select("{0}_stratum").distinct().collect() if {0}_row[0] is not None), {3!r}).drop("{0}_stratum")'''\
+                .format(name, json.dumps(sampling.column), float(sampling.fraction), sampling.seed)
+        return code
+
+    def get_records(self, context_name, command, max_take_rows, sampling):
+        command = '''{1}
+print({0}_df.schema.json())
+for {0} in {0}_df.toJSON().take({2}): print({0})'''.format(Constants.long_random_variable_name,
+                                                         self.make_dataframe(Constants.long_random_variable_name,
+                                                                             context_name, command, sampling),
+                                                         max_take_rows)
+        return self.execute(command)
 
-    def get_records(self, context_name, command, max_take_rows):
-        command = 'for {} in {}.sql("""{}""").toJSON().take({}): print({})'.format(Constants.long_random_variable_name,
-                                                                                   context_name, command, max_take_rows,
-                                                                                   Constants.long_random_variable_name)
+    def get_compressed_records(self, context_name, command, max_take_rows, sampling):
+        # Floats go through repr because str only keeps 12 significant digits on Python 2.
+        command = """import base64, zlib
+{1}
+def {0}_cell(c):
+    if c is None:
+        return u""
+    if isinstance(c, float):
+        c = repr(c)
+    elif isinstance(c, type(u"")):
+        c = u"{3}" + c
+    return u'"' + u"{{}}".format(c).replace(u'"', u'""') + u'"'
+{0}_text = u"\\n".join([{0}_df.schema.json()] + [u",".join({0}_cell(c) for c in r) for r in {0}_df.take({2})])
+{0}_zip = zlib.compressobj(6, zlib.DEFLATED, 31)
+print(base64.b64encode({0}_zip.compress({0}_text.encode("utf-8")) + {0}_zip.flush()).decode("ascii"))"""\
+            .format(Constants.long_random_variable_name,
+                    self.make_dataframe(Constants.long_random_variable_name, context_name, command, sampling),
+                    max_take_rows, Constants.csv_string_prefix)
         return self.execute(command)
+
+    def make_open_chunked_result(self, name, context_name, command, sampling):
+        return '''import itertools
+{1}
+{0}_rows = {0}_df.toJSON().cache()
+{0}_iterator = {0}_rows.toLocalIterator()
+print("{2}" + {0}_df.schema.json())'''.format(name, self.make_dataframe(name, context_name, command, sampling),
+                                             Constants.chunked_schema_prefix)
+
+    def make_fetch_chunk(self, name, rows):
+        return 'for {1} in itertools.islice({0}_iterator, {2}): print({1})'.format(name,
+                                                                                  Constants.long_random_variable_name,
+                                                                                  rows)
+
+    def make_close_chunked_result(self, name):
+        return '{0}_rows.unpersist()\ndel {0}_df, {0}_rows, {0}_iterator'.format(name)
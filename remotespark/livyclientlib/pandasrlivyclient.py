@@ -7,8 +7,20 @@ from .pandaslivyclientbase import PandasLivyClientBase
 class PandasRLivyClient(PandasLivyClientBase):
     """Spark client for Livy session in R"""
 
-    def make_context_columns(self, context_name, command):
+    def make_dataframe(self, name, context_name, command, sampling):
         raise NotImplementedError()
 
-    def get_records(self, context_name, command, max_take_rows):
+    def get_records(self, context_name, command, max_take_rows, sampling):
+        raise NotImplementedError()
+
+    def get_compressed_records(self, context_name, command, max_take_rows, sampling):
+        raise NotImplementedError()
+
+    def make_open_chunked_result(self, name, context_name, command, sampling):
+        raise NotImplementedError()
+
+    def make_fetch_chunk(self, name, rows):
+        raise NotImplementedError()
+
+    def make_close_chunked_result(self, name):
         raise NotImplementedError()
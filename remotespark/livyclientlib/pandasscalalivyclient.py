@@ -1,15 +1,75 @@
 # Copyright (c) 2015  aggftw@gmail.com
 # Distributed under the terms of the Modified BSD License.
 
+import json
+
+from remotespark.utils.constants import Constants
 from .pandaslivyclientbase import PandasLivyClientBase
 
 
 class PandasScalaLivyClient(PandasLivyClientBase):
     """Spark client for Livy session in Scala"""
 
-    def make_context_columns(self, context_name, command):
-        return '{}.sql("""{}""").columns.foreach(println)'.format(context_name, command)
+    def make_dataframe(self, name, context_name, command, sampling):
+        if sampling.method == Constants.sample_method_take:
+            return 'val {0}_df = {1}.sql("""{2}""")'.format(name, context_name, command)
+
+        seed = "scala.util.Random.nextLong" if sampling.seed is None else "{}L".format(int(sampling.seed))
+        if sampling.method == Constants.sample_method_sample:
+            return 'val {0}_df = {1}.sql("""{2}""").sample(false, {3!r}, {4})'.format(name, context_name, command,
+                                                                                    float(sampling.fraction), seed)
+
+        # sampleBy needs the fraction of every value of the column, and leaves out the values it is not given.
+        # It cannot take null, so the rows where the column is null are left out.
+        return '''val {0}_query = {1}.sql("""{2}""")
+val {0}_df = {0}_query.stat.sampleBy({3},
+  {0}_query.select({3}).where({0}_query({3}).isNotNull).distinct.collect.map(r => r.get(0) -> {4!r}).toMap, {5})'''\
+            .format(name, context_name, command, json.dumps(sampling.column), float(sampling.fraction), seed)
+
+    def get_records(self, context_name, command, max_take_rows, sampling):
+        # Wrapped in a block so that the REPL does not echo the intermediate values.
+        command = '''{{
+{1}
+println({0}_df.schema.json)
+{0}_df.toJSON.take({2}).foreach(println)
+}}'''.format(Constants.long_random_variable_name,
+               self.make_dataframe(Constants.long_random_variable_name, context_name, command, sampling),
+               max_take_rows)
+        return self.execute(command)
 
-    def get_records(self, context_name, command, max_take_rows):
-        command = '{}.sql("""{}""").toJSON.take({}).foreach(println)'.format(context_name, command, max_take_rows)
+    def get_compressed_records(self, context_name, command, max_take_rows, sampling):
+        # Wrapped in a block so that the REPL does not echo the intermediate values.
+        command = """{{
+{1}
+val {0}_rows = {0}_df.take({2}).map(_.toSeq.map(c =>
+  if (c == null) ""
+  else "\\"" + (if (c.isInstanceOf[String]) "{3}" + c else c.toString).replace("\\"", "\\"\\"") + "\\"")
+  .mkString(","))
+val {0}_bytes = new java.io.ByteArrayOutputStream()
+val {0}_zip = new java.util.zip.GZIPOutputStream({0}_bytes)
+{0}_zip.write(({0}_df.schema.json +: {0}_rows).mkString("\\n").getBytes("UTF-8"))
+{0}_zip.close()
+println(java.util.Base64.getEncoder.encodeToString({0}_bytes.toByteArray))
+}}""".format(Constants.long_random_variable_name,
+             self.make_dataframe(Constants.long_random_variable_name, context_name, command, sampling),
+             max_take_rows, Constants.csv_string_prefix)
         return self.execute(command)
+
+    def make_open_chunked_result(self, name, context_name, command, sampling):
+        return '''{1}
+val {0}_rows = {0}_df.toJSON.cache()
+val {0}_iterator = {0}_rows.toLocalIterator
+println("{2}" + {0}_df.schema.json)'''.format(name, self.make_dataframe(name, context_name, command, sampling),
+                                            Constants.chunked_schema_prefix)
+
+    def make_fetch_chunk(self, name, rows):
+        return '''{{
+var {0}_fetched = 0
+while ({0}_fetched < {1} && {0}_iterator.hasNext) {{
+  println({0}_iterator.next)
+  {0}_fetched += 1
+}}
+}}'''.format(name, rows)
+
+    def make_close_chunked_result(self, name):
+        return '{{ {0}_rows.unpersist(); () }}'.format(name)
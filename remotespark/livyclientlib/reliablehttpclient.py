@@ -2,9 +2,12 @@
 # Distributed under the terms of the Modified BSD License.
 
 import json
+import threading
+import weakref
 from time import sleep
 
 import requests
+from requests.adapters import HTTPAdapter
 
 import remotespark.utils.configuration as conf
 from remotespark.utils.log import Log
@@ -12,9 +15,14 @@ from remotespark.utils.utils import get_connection_string
 
 
 class ReliableHttpClient(object):
-    """Http client that is reliable in its requests. Uses requests library."""
+    """Http client that is reliable in its requests. Uses requests library.
+    A requests session is not thread safe, and the statement poller and parallel sessions send requests from other
+    threads, so the clients that share a requests session send their requests one at a time."""
 
-    def __init__(self, url, headers, username, password, retry_policy):
+    _http_session_locks = weakref.WeakKeyDictionary()
+    _http_session_locks_lock = threading.Lock()
+
+    def __init__(self, url, headers, username, password, retry_policy, http_session=None):
         self._url = url.rstrip("/")
         self._headers = headers
         self._username = username
@@ -22,12 +30,47 @@ class ReliableHttpClient(object):
         self._retry_policy = retry_policy
         self.logger = Log("ReliableHttpClient")
 
+        if http_session is None:
+            http_session = ReliableHttpClient.create_http_session()
+        self._http_session = http_session
+        self._http_session_lock = ReliableHttpClient._get_http_session_lock(http_session)
+
         self._do_not_authenticate = self._username == "" and self._password == ""
 
         self.verify_ssl = not conf.ignore_ssl_errors()
         if self.verify_ssl:
             self.logger.debug("ATTENTION: Will ignore SSL errors. This might render you vulnerable to attacks.")
 
+    @staticmethod
+    def create_http_session():
+        """Creates a requests session that keeps connections to the endpoint alive in a pool, so consecutive
+        requests reuse the same TCP (and TLS) connection instead of doing a new handshake every time."""
+        pool_maxsize = conf.http_pool_maxsize()
+        assert pool_maxsize > 0
+
+        http_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        http_session.mount("http://", adapter)
+        http_session.mount("https://", adapter)
+
+        if not conf.http_keep_alive():
+            http_session.headers["Connection"] = "close"
+
+        return http_session
+
+    @staticmethod
+    def _get_http_session_lock(http_session):
+        with ReliableHttpClient._http_session_locks_lock:
+            lock = ReliableHttpClient._http_session_locks.get(http_session)
+            if lock is None:
+                lock = threading.Lock()
+                ReliableHttpClient._http_session_locks[http_session] = lock
+            return lock
+
+    @property
+    def http_session(self):
+        return self._http_session
+
     @property
     def connection_string(self):
         return get_connection_string(self._url, self._username, self._password)
@@ -38,15 +81,15 @@ class ReliableHttpClient(object):
 
     def get(self, relative_url, accepted_status_codes):
         """Sends a get request. Returns a response."""
-        return self._send_request(relative_url, accepted_status_codes, requests.get)
+        return self._send_request(relative_url, accepted_status_codes, self._http_session.get)
 
     def post(self, relative_url, accepted_status_codes, data):
         """Sends a post request. Returns a response."""
-        return self._send_request(relative_url, accepted_status_codes, requests.post, data)
+        return self._send_request(relative_url, accepted_status_codes, self._http_session.post, data)
 
     def delete(self, relative_url, accepted_status_codes):
         """Sends a delete request. Returns a response."""
-        return self._send_request(relative_url, accepted_status_codes, requests.delete)
+        return self._send_request(relative_url, accepted_status_codes, self._http_session.delete)
 
     def _send_request(self, relative_url, accepted_status_codes, function, data=None):
         return self._send_request_helper(self.compose_url(relative_url), accepted_status_codes, function, data, 0)
@@ -54,18 +97,19 @@ class ReliableHttpClient(object):
     def _send_request_helper(self, url, accepted_status_codes, function, data, retry_count):
 
         try:
-            if self._do_not_authenticate:
-                if data is None:
-                    r = function(url, headers=self._headers, verify=self.verify_ssl)
-                else:
-                    r = function(url, headers=self._headers, data=json.dumps(data), verify=self.verify_ssl)
-            else:
-                if data is None:
-                    r = function(url, headers=self._headers, auth=(self._username, self._password),
-                                 verify=self.verify_ssl)
+            with self._http_session_lock:
+                if self._do_not_authenticate:
+                    if data is None:
+                        r = function(url, headers=self._headers, verify=self.verify_ssl)
+                    else:
+                        r = function(url, headers=self._headers, data=json.dumps(data), verify=self.verify_ssl)
                 else:
-                    r = function(url, headers=self._headers, auth=(self._username, self._password), data=json.dumps(data),
-                                 verify=self.verify_ssl)
+                    if data is None:
+                        r = function(url, headers=self._headers, auth=(self._username, self._password),
+                                     verify=self.verify_ssl)
+                    else:
+                        r = function(url, headers=self._headers, auth=(self._username, self._password),
+                                     data=json.dumps(data), verify=self.verify_ssl)
         except requests.exceptions.RequestException as e:
             error = True
             r = None
@@ -0,0 +1,187 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+import atexit
+import copy
+import json
+from threading import Lock, Thread, Timer
+try:
+    from time import monotonic
+except ImportError:
+    from time import time as monotonic
+
+from remotespark.utils.constants import Constants
+from remotespark.utils.log import Log
+from remotespark.utils.loggingdisplay import LoggingDisplay
+
+
+class SessionPool(object):
+    """Keeps up to pool_size started Livy clients in reserve for every endpoint and set of session properties a
+    session was asked for, so that the next session asked for the same ones is ready right away. The pool of an
+    endpoint is refilled in the background every time a client is taken from it. Clients that stay in the pool for
+    more than idle_ttl_seconds are deleted, and pools that no client was taken from in that time are not refilled.
+    Sessions are started in the background, so they show their messages in the log until they are taken, and the
+    ones left in the pool are deleted when the process exits."""
+
+    def __init__(self, client_factory, ipython_display, pool_size, idle_ttl_seconds):
+        self.logger = Log("SessionPool")
+        self.client_factory = client_factory
+        self.ipython_display = ipython_display
+        self.pool_size = pool_size
+        self.idle_ttl_seconds = idle_ttl_seconds
+
+        # key -> list of (client, time it was added)
+        self._idle_clients = dict()
+        # key -> number of clients being started for the pool
+        self._starting = dict()
+        # key -> (connection_string, properties, time a client was last taken)
+        self._requests = dict()
+        self._reap_timer = None
+        self._lock = Lock()
+
+        if self.enabled:
+            atexit.register(self.close)
+
+    @property
+    def enabled(self):
+        return self.pool_size > 0
+
+    def idle_count(self, connection_string, properties):
+        with self._lock:
+            return len(self._idle_clients.get(self._make_key(connection_string, properties), []))
+
+    def take(self, connection_string, properties):
+        """Returns a started client for a session with properties against connection_string, or None if the pool
+        has no idle one ready. Pooled clients whose session is no longer idle are deleted. Either way the pool is
+        refilled in the background."""
+        if not self.enabled:
+            return None
+
+        key = self._make_key(connection_string, properties)
+        with self._lock:
+            self._requests[key] = (connection_string, copy.deepcopy(properties), monotonic())
+
+        while True:
+            with self._lock:
+                clients = self._idle_clients.get(key, [])
+                client = clients.pop(0)[0] if clients else None
+
+            if client is None or self._is_idle(client):
+                break
+            self._close_clients([client])
+
+        self._refill(key)
+        self._schedule_reap()
+
+        if client is not None:
+            self.logger.debug("Took session {} from the pool.".format(client.session_id))
+            client.set_ipython_display(self.ipython_display)
+        return client
+
+    def close(self):
+        """Deletes all the sessions in the pool and stops refilling it."""
+        with self._lock:
+            clients = [client for clients in self._idle_clients.values() for (client, _) in clients]
+            self._idle_clients.clear()
+            self._requests.clear()
+            if self._reap_timer is not None:
+                self._reap_timer.cancel()
+                self._reap_timer = None
+
+        self._close_clients(clients)
+
+    def _refill(self, key):
+        with self._lock:
+            if key not in self._requests:
+                return
+            (connection_string, properties, _) = self._requests[key]
+            missing = self.pool_size - len(self._idle_clients.get(key, [])) - self._starting.get(key, 0)
+            if missing <= 0:
+                return
+            self._starting[key] = self._starting.get(key, 0) + missing
+
+        self.logger.debug("Starting {} sessions for the pool of {}.".format(missing, connection_string))
+        for _ in range(missing):
+            thread = Thread(target=self._start_client, args=(key, connection_string, properties))
+            thread.daemon = True
+            thread.start()
+
+    def _start_client(self, key, connection_string, properties):
+        client = None
+        try:
+            session = self.client_factory.create_session(LoggingDisplay(), connection_string,
+                                                         copy.deepcopy(properties), "-1", False)
+            session.start()
+            client = self.client_factory.build_client(session)
+            client.start()
+        except Exception as e:
+            self.logger.error("Could not start a session for the pool of {}: {}".format(connection_string, e))
+            if client is not None:
+                self._close_clients([client])
+            client = None
+
+        with self._lock:
+            self._starting[key] -= 1
+            if client is not None and key in self._requests:
+                self._idle_clients.setdefault(key, []).append((client, monotonic()))
+                client = None
+
+        # The pool was closed while the session started.
+        if client is not None:
+            self._close_clients([client])
+
+    def _schedule_reap(self):
+        with self._lock:
+            if self._reap_timer is not None:
+                return
+            self._reap_timer = Timer(max(self.idle_ttl_seconds / 2.0, 1), self._reap_and_reschedule)
+            self._reap_timer.daemon = True
+            self._reap_timer.start()
+
+    def _reap_and_reschedule(self):
+        self._reap()
+
+        with self._lock:
+            self._reap_timer = None
+            reschedule = len(self._requests) > 0 or any(len(clients) > 0 for clients in self._idle_clients.values())
+        if reschedule:
+            self._schedule_reap()
+
+    def _reap(self):
+        now = monotonic()
+        expired = []
+        with self._lock:
+            for key in list(self._requests.keys()):
+                if now - self._requests[key][2] > self.idle_ttl_seconds:
+                    del self._requests[key]
+
+            for (key, clients) in self._idle_clients.items():
+                expired.extend(client for (client, added) in clients if now - added > self.idle_ttl_seconds)
+                clients[:] = [(client, added) for (client, added) in clients if now - added <= self.idle_ttl_seconds]
+
+        if expired:
+            self.logger.debug("Deleting {} sessions that were idle in the pool for too long.".format(len(expired)))
+        self._close_clients(expired)
+
+    def _is_idle(self, client):
+        try:
+            status = client.refresh_status()
+        except Exception as e:
+            self.logger.error("Could not get the status of pooled session {}: {}".format(client.session_id, e))
+            return False
+
+        if status != Constants.idle_session_status:
+            self.logger.debug("Dropping pooled session {} with status '{}'.".format(client.session_id, status))
+            return False
+        return True
+
+    def _close_clients(self, clients):
+        for client in clients:
+            try:
+                client.close_session()
+            except Exception as e:
+                self.logger.error("Could not delete pooled session {}: {}".format(client.session_id, e))
+
+    @staticmethod
+    def _make_key(connection_string, properties):
+        return connection_string, json.dumps(properties, sort_keys=True)
@@ -1,11 +1,19 @@
 # Copyright (c) 2015  aggftw@gmail.com
 # Distributed under the terms of the Modified BSD License.
 
+from multiprocessing.pool import ThreadPool
+
+import remotespark.utils.configuration as conf
+from remotespark.utils.constants import Constants
 from remotespark.utils.filesystemreaderwriter import FileSystemReaderWriter
 from remotespark.utils.log import Log
+from remotespark.utils.utils import join_paths, get_magics_home_path
 from .clientmanager import ClientManager
 from .clientmanagerstateserializer import ClientManagerStateSerializer
+from .diskresultcache import DiskResultCache
 from .livyclientfactory import LivyClientFactory
+from .sessionpool import SessionPool
+from .sqlresultcache import SqlResultCache
 
 
 class SparkController(object):
@@ -21,21 +29,107 @@ class SparkController(object):
         else:
             self.client_manager = ClientManager()
 
+        self.sql_result_cache = SqlResultCache(conf.cache_max_bytes_sql(), conf.cache_ttl_seconds_sql())
+        self.disk_result_cache = DiskResultCache(join_paths(get_magics_home_path(), "cache"),
+                                                 conf.disk_cache_max_bytes_sql())
+        self.session_pool = SessionPool(self.client_factory, self.ipython_display, conf.session_pool_size(),
+                                        conf.session_pool_idle_ttl_seconds())
+
     def get_logs(self, client_name=None):
         client_to_use = self.get_client_by_name_or_default(client_name)
         return client_to_use.get_logs()
 
+    def follow_logs(self, line_callback, client_name=None):
+        client_to_use = self.get_client_by_name_or_default(client_name)
+        client_to_use.follow_logs(line_callback)
+
     def run_cell(self, cell, client_name=None):
         client_to_use = self.get_client_by_name_or_default(client_name)
         return client_to_use.execute(cell)
 
-    def run_cell_sql(self, cell, client_name=None):
+    def run_cell_all(self, cell, client_names):
+        """Runs the cell against all the given sessions at the same time, using at most max_parallel_sessions
+        threads. Returns a list of (client_name, (success, output)) in the order of client_names. The sessions do not
+        show their wait progress, since the messages of several threads would be mixed up."""
+        clients = [self.get_client_by_name_or_default(name) for name in client_names]
+        if len(clients) == 0:
+            return []
+
+        def execute(client):
+            try:
+                return client.execute(cell, show_progress=False)
+            except Exception as e:
+                self.logger.error("Failed to run cell against session {}: {}".format(client.session_id, e))
+                return False, "{}".format(e)
+
+        pool = ThreadPool(max(1, min(len(clients), conf.max_parallel_sessions())))
+        try:
+            results = pool.map(execute, clients)
+        finally:
+            pool.close()
+
+        return list(zip(client_names, results))
+
+    def submit_cell(self, cell, client_name=None):
+        client_to_use = self.get_client_by_name_or_default(client_name)
+        return client_to_use.submit(cell)
+
+    def run_cell_sql(self, cell, client_name=None, max_rows=None, use_cache=True, fresh_for=None, sampling=None,
+                     chunk_rows=None):
         client_to_use = self.get_client_by_name_or_default(client_name)
-        return client_to_use.execute_sql(cell)
+        return self._run_cached(client_to_use, Constants.context_name_sql, cell, max_rows, use_cache, fresh_for,
+                                sampling, chunk_rows, client_to_use.execute_sql)
 
-    def run_cell_hive(self, cell, client_name=None):
+    def run_cell_hive(self, cell, client_name=None, max_rows=None, use_cache=True, fresh_for=None, sampling=None,
+                      chunk_rows=None):
         client_to_use = self.get_client_by_name_or_default(client_name)
-        return client_to_use.execute_hive(cell)
+        return self._run_cached(client_to_use, Constants.context_name_hive, cell, max_rows, use_cache, fresh_for,
+                                sampling, chunk_rows, client_to_use.execute_hive)
+
+    def _run_cached(self, client, context_name, cell, max_rows, use_cache, fresh_for, sampling, chunk_rows,
+                    execute):
+        """Returns the result of the query from the in memory cache, if it is enabled, or from the disk cache, if
+        fresh_for is given and a result of the same query against the same endpoint was stored less than fresh_for
+        seconds ago. Runs the query otherwise, and stores its result in the caches."""
+        use_memory = self.sql_result_cache.enabled
+        use_disk = fresh_for is not None and self.disk_result_cache.enabled
+        if not use_memory and not use_disk:
+            return execute(cell, max_rows, sampling, chunk_rows)
+
+        key = SqlResultCache.make_key(client.endpoint, client.session_id, context_name, cell, max_rows, sampling)
+        disk_key = DiskResultCache.make_key(client.endpoint, context_name, cell, max_rows, sampling)
+        if use_cache:
+            df = self.sql_result_cache.get(key, fresh_for) if use_memory else None
+            if df is not None:
+                self.logger.debug("Returning cached result for '{}'.".format(key[3]))
+                return df
+
+            df = self.disk_result_cache.get(disk_key, fresh_for) if use_disk else None
+            if df is not None:
+                self.logger.debug("Returning result for '{}' cached on disk.".format(key[3]))
+                self.sql_result_cache.put(key, df)
+                return df
+
+        df = execute(cell, max_rows, sampling, chunk_rows)
+        self.sql_result_cache.put(key, df)
+        if use_disk:
+            self.disk_result_cache.put(disk_key, df)
+        return df
+
+    def clear_cache(self):
+        self.sql_result_cache.clear()
+        self.disk_result_cache.clear()
+
+    def iter_sql(self, cell, client_name=None, chunk_rows=None, max_rows=None, sampling=None):
+        """Returns a generator of the result of the SQL query as DataFrames of at most chunk_rows rows, yielded as
+        they arrive from Livy. Nothing runs until the generator is first advanced. The whole result is fetched if
+        max_rows is None."""
+        client_to_use = self.get_client_by_name_or_default(client_name)
+        return client_to_use.iter_sql(cell, chunk_rows, max_rows, sampling)
+
+    def iter_hive(self, cell, client_name=None, chunk_rows=None, max_rows=None, sampling=None):
+        client_to_use = self.get_client_by_name_or_default(client_name)
+        return client_to_use.iter_hive(cell, chunk_rows, max_rows, sampling)
 
     def get_all_sessions_endpoint(self, connection_string):
         http_client = self.client_factory.create_http_client(connection_string)
@@ -53,12 +147,17 @@ class SparkController(object):
 
     def cleanup(self):
         self.client_manager.clean_up_all()
+        self.session_pool.close()
+        self.sql_result_cache.clear()
 
     def cleanup_endpoint(self, connection_string):
         for session in self.get_all_sessions_endpoint(connection_string):
             session.delete()
 
     def delete_session_by_name(self, name):
+        if name in self.client_manager.get_sessions_list():
+            client = self.client_manager.get_client(name)
+            self.sql_result_cache.discard_session(client.endpoint, client.session_id)
         self.client_manager.delete_client(name)
 
     def delete_session_by_id(self, connection_string, session_id):
@@ -68,17 +167,30 @@ class SparkController(object):
             session = self.client_factory.create_session(self.ipython_display, connection_string, {"kind": r.json()["kind"]}, session_id, False)
             session.delete()
 
-    def add_session(self, name, connection_string, skip_if_exists, properties):
+    def add_session(self, name, connection_string, skip_if_exists, properties, ipython_display=None):
+        """Creates a session and adds it as name. The messages shown while the session starts go to
+        ipython_display if given, and the ones shown afterwards to the display of the controller."""
         if skip_if_exists and (name in self.client_manager.get_sessions_list()):
             self.logger.debug("Skipping {} because it already exists in list of sessions.".format(name))
             return
 
-        session = self.client_factory.create_session(self.ipython_display, connection_string, properties, "-1", False)
+        if ipython_display is None:
+            ipython_display = self.ipython_display
+
+        livy_client = self.session_pool.take(connection_string, properties)
+        if livy_client is not None:
+            ipython_display.writeln("Using session {} from the session pool.".format(livy_client.session_id))
+            self.client_manager.add_client(name, livy_client)
+            return
+
+        session = self.client_factory.create_session(ipython_display, connection_string, properties, "-1", False)
         session.start()
 
         livy_client = self.client_factory.build_client(session)
         self.client_manager.add_client(name, livy_client)
         livy_client.start()
+        if ipython_display is not self.ipython_display:
+            livy_client.set_ipython_display(self.ipython_display)
 
     def get_client_keys(self):
         return self.client_manager.get_sessions_list()
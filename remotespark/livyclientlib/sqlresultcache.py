@@ -0,0 +1,112 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+from collections import OrderedDict
+import re
+from threading import Lock
+try:
+    from time import monotonic
+except ImportError:
+    from time import time as monotonic
+
+from remotespark.utils.dataframemetadata import copy_metadata
+from remotespark.utils.log import Log
+
+
+class SqlResultCache(object):
+    """In memory cache of SQL and Hive query results. Entries expire ttl_seconds after they are added and the least
+    recently used ones are evicted once all the cached DataFrames together take more than max_bytes."""
+
+    _quoted = re.compile(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`)""")
+    _whitespace = re.compile(r"\s+")
+
+    def __init__(self, max_bytes, ttl_seconds):
+        self.logger = Log("SqlResultCache")
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(endpoint, session_id, context_name, command, max_rows, sampling=None):
+        return endpoint, str(session_id), context_name, SqlResultCache.normalize_sql(command), max_rows, sampling
+
+    @staticmethod
+    def normalize_sql(command):
+        """Collapses whitespace outside of quoted strings and drops trailing semicolons, so that queries that only
+        differ in their formatting share an entry."""
+        parts = SqlResultCache._quoted.split(command)
+        for i in range(0, len(parts), 2):
+            parts[i] = SqlResultCache._whitespace.sub(" ", parts[i])
+        return "".join(parts).strip().rstrip(";").strip()
+
+    def get(self, key, max_age_seconds=None):
+        """Returns a copy of the cached DataFrame or None. Entries added more than max_age_seconds ago are not
+        returned, but are kept for callers that do not ask for a maximum age."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            (df, size, added) = entry
+            now = monotonic()
+            if now >= added + self.ttl_seconds:
+                self._remove(key)
+                return None
+            if max_age_seconds is not None and now - added > max_age_seconds:
+                return None
+
+            # Move to the end, as the most recently used.
+            del self._entries[key]
+            self._entries[key] = entry
+
+        return self._copy(df)
+
+    def put(self, key, df):
+        if not self.enabled:
+            return
+        # Measuring the strings of a big result is slow, so it is only done when the result may be cached.
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+
+        df = self._copy(df)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (df, size, monotonic())
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self.logger.debug("Evicting the least recently used result.")
+                self._remove(oldest_key)
+
+    def discard_session(self, endpoint, session_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == endpoint and k[1] == str(session_id)]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _remove(self, key):
+        (_, size, _) = self._entries.pop(key)
+        self.current_bytes -= size
+
+    @staticmethod
+    def _copy(df):
+        copy = df.copy()
+        copy_metadata(df, copy)
+        return copy
@@ -0,0 +1,64 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+from remotespark.utils.constants import Constants
+
+
+class SqlSampling(object):
+    """How the rows of a SQL or Hive query result are picked in the session before at most max_rows of them are
+    sent back.
+
+        take: the first rows, in partition order.
+        sample: every row is kept with probability fraction.
+        stratified: the rows of every distinct value of column are kept with probability fraction, so that the
+                    proportions of the values are kept.
+
+    A seed makes the sample the same every time the query runs against the same data."""
+
+    def __init__(self, method=None, fraction=None, seed=None, column=None):
+        if method is None:
+            if column is not None:
+                method = Constants.sample_method_stratified
+            elif fraction is not None:
+                method = Constants.sample_method_sample
+            else:
+                method = Constants.sample_method_take
+
+        if method not in Constants.sample_methods_supported:
+            raise ValueError("Sample method '{}' not supported. Sample method must be one of {}."
+                             .format(method, ", ".join(Constants.sample_methods_supported)))
+        if method == Constants.sample_method_take:
+            if fraction is not None or seed is not None or column is not None:
+                raise ValueError("Sample method '{}' takes no fraction, seed or column.".format(method))
+        else:
+            if fraction is None or not 0 < fraction <= 1:
+                raise ValueError("Sample method '{}' requires a fraction greater than 0 and at most 1."
+                                 .format(method))
+        if method == Constants.sample_method_stratified and column is None:
+            raise ValueError("Sample method '{}' requires a column to stratify by.".format(method))
+        if method == Constants.sample_method_sample and column is not None:
+            raise ValueError("Sample method '{}' takes no column.".format(method))
+
+        self.method = method
+        self.fraction = fraction
+        self.seed = seed
+        self.column = column
+
+    @property
+    def is_take(self):
+        return self.method == Constants.sample_method_take
+
+    def _key(self):
+        return self.method, self.fraction, self.seed, self.column
+
+    def __eq__(self, other):
+        return isinstance(other, SqlSampling) and self._key() == other._key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return "SqlSampling(method={!r}, fraction={!r}, seed={!r}, column={!r})".format(*self._key())
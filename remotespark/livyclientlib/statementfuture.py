@@ -0,0 +1,86 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+from threading import Event, Lock
+
+from .livyclienttimeouterror import LivyClientTimeoutError
+from .livystatementcancellederror import LivyStatementCancelledError
+
+
+class StatementFuture(object):
+    """Result of a statement submitted to a Livy session, which becomes available once the statement finishes.
+    The result is the same (success, output) tuple that LivySession.execute returns."""
+
+    def __init__(self, session, statement_id):
+        self._session = session
+        self._statement_id = statement_id
+        self._finished = Event()
+        self._lock = Lock()
+        self._result = None
+        self._exception = None
+        self._cancelled = False
+
+    def __repr__(self):
+        if self.cancelled():
+            state = "cancelled"
+        elif self.done():
+            state = "finished"
+        else:
+            state = "running"
+        return "<StatementFuture statement {} of session {}: {}>".format(self.statement_id, self._session.id, state)
+
+    @property
+    def statement_id(self):
+        return self._statement_id
+
+    def done(self):
+        return self._finished.is_set()
+
+    def cancelled(self):
+        return self._cancelled
+
+    def result(self, timeout=None):
+        """Wait for the statement to finish and return its (success, output) tuple.
+
+        Parameters:
+            timeout : number of seconds to wait before giving up. Waits forever if None.
+        """
+        if not self._finished.wait(timeout):
+            raise LivyClientTimeoutError("Statement {} did not finish in {} seconds."
+                                         .format(self.statement_id, timeout))
+
+        if self._cancelled:
+            raise LivyStatementCancelledError("Statement {} was cancelled.".format(self.statement_id))
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def cancel(self):
+        """Cancel the statement if it has not finished yet. Returns whether the statement was cancelled. If Livy
+        does not accept to cancel it, the statement keeps running and its result still becomes available."""
+        if self.done():
+            return False
+
+        if not self._session.cancel_statement(self.statement_id):
+            return False
+        return self._finish(cancelled=True)
+
+    def set_result(self, result):
+        return self._finish(result=result)
+
+    def set_exception(self, exception):
+        return self._finish(exception=exception)
+
+    def set_cancelled(self):
+        return self._finish(cancelled=True)
+
+    def _finish(self, result=None, exception=None, cancelled=False):
+        with self._lock:
+            if self.done():
+                return False
+
+            self._result = result
+            self._exception = exception
+            self._cancelled = cancelled
+            self._finished.set()
+            return True
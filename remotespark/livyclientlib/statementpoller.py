@@ -0,0 +1,70 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+from threading import Event, Lock, Thread
+
+from remotespark.utils.log import Log
+from .livystatementcancellederror import LivyStatementCancelledError
+
+
+class StatementPoller(object):
+    """Polls all the in-flight statements of a session from a single background thread and completes their
+    futures as the statements finish. The thread only runs while there are statements in flight."""
+
+    def __init__(self, session, polling_schedule):
+        self.logger = Log("StatementPoller")
+
+        self._session = session
+        self._polling_schedule = polling_schedule
+        self._futures = []
+        self._lock = Lock()
+        self._new_futures = Event()
+        self._thread = None
+
+    def add(self, future):
+        with self._lock:
+            self._futures.append(future)
+            self._new_futures.set()
+
+            if self._thread is None:
+                self._thread = Thread(target=self._poll)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _poll(self):
+        previous_states = dict()
+
+        while True:
+            with self._lock:
+                self._futures = [f for f in self._futures if not f.done()]
+                if len(self._futures) == 0:
+                    self._thread = None
+                    return
+
+                futures = list(self._futures)
+                state_changed = self._new_futures.is_set()
+                self._new_futures.clear()
+
+            for future in futures:
+                try:
+                    (state, result) = self._session.get_statement_result(future.statement_id)
+                    if state != previous_states.get(future.statement_id):
+                        previous_states[future.statement_id] = state
+                        state_changed = True
+
+                    if result is not None:
+                        future.set_result(result)
+                except LivyStatementCancelledError:
+                    future.set_cancelled()
+                except Exception as e:
+                    self.logger.error("Failed to poll statement {}: {}".format(future.statement_id, e))
+                    future.set_exception(e)
+
+                if future.done():
+                    previous_states.pop(future.statement_id, None)
+
+            if state_changed:
+                self._polling_schedule.reset()
+
+            # Newly submitted statements wake the poller up so their first poll is not delayed.
+            self._new_futures.wait(self._polling_schedule.seconds_to_sleep())
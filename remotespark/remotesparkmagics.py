@@ -12,11 +12,14 @@ import copy
 
 import remotespark.utils.configuration as conf
 from remotespark.utils.constants import Constants
+from remotespark.utils.dataframemetadata import set_aggregator
 from remotespark.utils.ipythondisplay import IpythonDisplay
 from remotespark.utils.log import Log
 from remotespark.utils.utils import get_magics_home_path, join_paths
+from .datawidgets.sqlaggregator import SqlAggregator
 from .livyclientlib.dataframeparseexception import DataFrameParseException
 from .livyclientlib.sparkcontroller import SparkController
+from .livyclientlib.sqlsampling import SqlSampling
 
 
 @magics_class
@@ -55,9 +58,48 @@ class RemoteSparkMagics(Magics):
                                              Constants.context_name_hive,
                                              Constants.context_name_spark))
     @argument("-s", "--session", help="The name of the Livy session to use. "
-                                      "If only one session has been created, there's no need to specify one.")
+                                      "If only one session has been created, there's no need to specify one. "
+                                      "Spark code can run against several sessions at once by giving their names "
+                                      "separated by commas.")
+    @argument("--all", dest="all_sessions", action="store_true", default=False,
+              help="Run Spark code against all the sessions at once.")
     @argument("-o", "--output", type=str, default=None, help="If present, output when using SQL or Hive "
                                                              "query will be stored in variable of this name.")
+    @argument("-m", "--maxrows", type=int, default=None,
+              help="Maximum number of rows of the SQL or Hive query result to fetch. Default is the max_results_sql "
+                   "setting. Results with more rows than the chunk_rows_sql setting are fetched in pages.")
+    @argument("--no-cache", dest="no_cache", action="store_true", default=False,
+              help="Run the SQL or Hive query again even if its result is in the result cache, and cache the new "
+                   "result. The cache is only used if cache_max_bytes_sql is set.")
+    @argument("--fresh-for", dest="fresh_for", type=float, default=None,
+              help="Return the result of the same SQL or Hive query against the same endpoint if it was stored on "
+                   "disk less than this many seconds ago, even by a previous kernel. Otherwise run the query and "
+                   "store its result on disk.")
+    @argument("--sample-method", dest="sample_method", type=str, default=None,
+              choices=Constants.sample_methods_supported,
+              help="How the session picks the rows of the SQL or Hive query result to send back: '{}' for the first "
+                   "rows, '{}' for a random sample of --sample-fraction of the rows, and '{}' for a sample of "
+                   "--sample-fraction of the rows of every value of the --stratify-by column. Default is '{}', or "
+                   "a sampling method that uses the other sampling options given."
+                   .format(Constants.sample_method_take, Constants.sample_method_sample,
+                           Constants.sample_method_stratified, Constants.sample_method_take))
+    @argument("--sample-fraction", dest="sample_fraction", type=float, default=None,
+              help="Fraction of the rows to sample, greater than 0 and at most 1.")
+    @argument("--stratify-by", dest="stratify_by", type=str, default=None,
+              help="Column whose values are sampled separately by the '{}' sampling method."
+                   .format(Constants.sample_method_stratified))
+    @argument("--seed", type=int, default=None, help="Seed of the sample, so that it is the same every time.")
+    @argument("--stream", action="store_true", default=False,
+              help="Show the rows of the SQL or Hive query a page at a time, as they arrive. If -o is given, a "
+                   "generator of the pages is stored in that variable instead and nothing runs until it is used.")
+    @argument("--chunk-rows", dest="chunk_rows", type=int, default=None,
+              help="Number of rows of every page shown with --stream. Default is the chunk_rows_sql setting.")
+    @argument("--async", dest="run_async", action="store_true", default=False,
+              help="Submit Spark code without waiting for it to finish. The returned future is stored in the "
+                   "variable given with -o.")
+    @argument("--follow", action="store_true", default=False,
+              help="Show the new lines of the logs of the session as they arrive, until the session is idle or for "
+                   "at most follow_logs_timeout_seconds.")
     @argument("command", type=str, default=[""], nargs="*", help="Commands to execute.")
     @needs_local_scope
     @line_cell_magic
@@ -95,15 +137,36 @@ class RemoteSparkMagics(Magics):
                e.g. `%%spark -s testsession -c sql -o my_var` will execute the SQL code against the testsession
                         previously created and store the pandas dataframe created in the my_var variable in the
                         Python environment.
+               e.g. `%%spark -s testsession -c sql -m 100000` will fetch up to 100000 rows of the result. Big
+                        results are cached in the session and fetched a page at a time.
+               e.g. `%%spark -s testsession -c sql --sample-fraction 0.001 --seed 1` will return up to maxrows rows
+                        of a random sample of 0.1% of the result, picked in the session.
+                        `--sample-method stratified --sample-fraction 0.01 --stratify-by country` samples 1% of the
+                        rows of every country.
+               e.g. `%%spark -s testsession -c sql --fresh-for 86400` will reuse the result of the same query
+                        stored on disk in the last day, even before a kernel restart, and store it otherwise.
+               e.g. `%%spark -s testsession -c sql --stream` will show the result a page at a time as it arrives.
+                        `%%spark -s testsession -c sql --stream -o pages` stores a generator of DataFrames in pages.
+                        `%%spark -s testsession -c sql --stream --chunk-rows 500` shows pages of 500 rows.
+               e.g. `%%spark -s session1,session2` or `%%spark --all` will execute the cell code against several
+                        sessions at the same time and show the output of every session.
+               e.g. `%%spark -s testsession --async -o my_future` will submit the cell code against the testsession
+                        and return right away. `my_future.result()` waits for the output, `my_future.done()` tells
+                        if it finished and `my_future.cancel()` cancels it.
            logs
                Returns the logs for a given session.
                e.g. `%%spark logs -s testsession` will return the logs for the testsession previously created
+               e.g. `%%spark logs -s testsession --follow` will show the new lines of the logs of the testsession
+                        while it runs statements submitted with --async
            delete
                Delete a Livy session. Argument is the name of the session to be deleted.
                e.g. `%%spark delete defaultlivy`
            cleanup
                Delete all Livy sessions created by the notebook. No arguments required.
                e.g. `%%spark cleanup`
+           cache
+               Manage the caches of SQL and Hive query results, in memory and on disk.
+               e.g. `%%spark cache clear` will drop all the cached results
         """
         usage = "Please look at usage of %spark by executing `%spark?`."
         user_input = line
@@ -168,9 +231,17 @@ class RemoteSparkMagics(Magics):
                 else:
                     raise ValueError("Subcommand 'cleanup' requires no further values or a connection string to clean up "
                                      "sessions.\n{}".format(usage))
+            # cache
+            elif subcommand == "cache":
+                if len(args.command) == 2 and args.command[1].lower() == "clear":
+                    self.spark_controller.clear_cache()
+                else:
+                    raise ValueError("Subcommand 'cache' requires the value 'clear'.\n{}".format(usage))
             # logs
             elif subcommand == "logs":
-                if len(args.command) == 1:
+                if len(args.command) == 1 and args.follow:
+                    self.spark_controller.follow_logs(self.ipython_display.writeln, args.session)
+                elif len(args.command) == 1:
                     (success, out) = self.spark_controller.get_logs(args.session)
                     if success:
                         self.ipython_display.write(out)
@@ -180,7 +251,41 @@ class RemoteSparkMagics(Magics):
                     raise ValueError("Subcommand 'logs' requires no further values.\n{}".format(usage))
             # run
             elif len(subcommand) == 0:
-                if args.context == Constants.context_name_spark:
+                sampling = self._get_sampling(args)
+                if sampling is not None and args.context not in [Constants.context_name_sql,
+                                                                 Constants.context_name_hive]:
+                    raise ValueError("Only SQL and Hive query results can be sampled.")
+
+                if args.all_sessions or (args.session is not None and "," in args.session):
+                    if args.context != Constants.context_name_spark or args.run_async or args.stream:
+                        raise ValueError("Only synchronous Spark code can run against several sessions at once.")
+                    if args.output is not None:
+                        raise ValueError("The output of several sessions cannot be stored in a variable.")
+                    if args.all_sessions:
+                        names = self.spark_controller.get_client_keys()
+                    else:
+                        names = [name.strip() for name in args.session.split(",") if name.strip() != ""]
+                    self._print_results_by_session(self.spark_controller.run_cell_all(cell, names))
+                elif args.stream:
+                    if args.no_cache or args.fresh_for is not None:
+                        raise ValueError("Streamed query results are not cached, so --no-cache and --fresh-for "
+                                         "cannot be used with --stream.")
+                    if args.context == Constants.context_name_sql:
+                        return self._stream_context_that_returns_df(self.spark_controller.iter_sql, cell,
+                                                                    args.session, args.output, args.maxrows,
+                                                                    sampling, args.chunk_rows)
+                    elif args.context == Constants.context_name_hive:
+                        return self._stream_context_that_returns_df(self.spark_controller.iter_hive, cell,
+                                                                    args.session, args.output, args.maxrows,
+                                                                    sampling, args.chunk_rows)
+                    else:
+                        raise ValueError("Only SQL and Hive query results can be streamed.")
+                elif args.context == Constants.context_name_spark and args.run_async:
+                    future = self.spark_controller.submit_cell(cell, args.session)
+                    if args.output is not None:
+                        self.shell.user_ns[args.output] = future
+                    return future
+                elif args.context == Constants.context_name_spark:
                     (success, out) = self.spark_controller.run_cell(cell, args.session)
                     if success:
                         self.ipython_display.write(out)
@@ -188,10 +293,12 @@ class RemoteSparkMagics(Magics):
                         self.ipython_display.send_error(out)
                 elif args.context == Constants.context_name_sql:
                     return self._execute_against_context_that_returns_df(self.spark_controller.run_cell_sql, cell,
-                                                                         args.session, args.output)
+                                                                         args.session, args.output, args.maxrows,
+                                                                         not args.no_cache, args.fresh_for, sampling)
                 elif args.context == Constants.context_name_hive:
                     return self._execute_against_context_that_returns_df(self.spark_controller.run_cell_hive, cell,
-                                                                         args.session, args.output)
+                                                                         args.session, args.output, args.maxrows,
+                                                                         not args.no_cache, args.fresh_for, sampling)
                 else:
                     raise ValueError("Context '{}' not found".format(args.context))
             # error
@@ -200,9 +307,23 @@ class RemoteSparkMagics(Magics):
         except ValueError as err:
             self.ipython_display.send_error("{}".format(err))
 
-    def _execute_against_context_that_returns_df(self, method, cell, session, output_var):
+    @staticmethod
+    def _get_sampling(args):
+        if args.sample_method is None and args.sample_fraction is None and args.seed is None and \
+                args.stratify_by is None:
+            return None
+        return SqlSampling(args.sample_method, args.sample_fraction, args.seed, args.stratify_by)
+
+    def _execute_against_context_that_returns_df(self, method, cell, session, output_var, max_rows, use_cache,
+                                                 fresh_for, sampling):
         try:
-            df = method(cell, session)
+            df = method(cell, session, max_rows, use_cache, fresh_for, sampling)
+            if conf.push_down_aggregations():
+                # Charts aggregate the whole result of the query in Spark, not only the rows in df. Aggregations
+                # have few rows, so they are fetched in one statement rather than in chunks.
+                set_aggregator(df, SqlAggregator(cell, lambda query, max_rows: method(query, session, max_rows, True,
+                                                                                      fresh_for, None, 0),
+                                                 ipython_display=self.ipython_display))
             if output_var is not None:
                 self.shell.user_ns[output_var] = df
             return df
@@ -210,6 +331,29 @@ class RemoteSparkMagics(Magics):
             self.ipython_display.send_error(e.out)
             return None
 
+    def _stream_context_that_returns_df(self, method, cell, session, output_var, max_rows, sampling, chunk_rows):
+        if max_rows is None:
+            max_rows = conf.max_results_sql()
+        chunks = method(cell, session, chunk_rows, max_rows, sampling)
+        if output_var is not None:
+            self.shell.user_ns[output_var] = chunks
+            return chunks
+
+        try:
+            for df in chunks:
+                self.ipython_display.display(df)
+        except DataFrameParseException as e:
+            self.ipython_display.send_error(e.out)
+        return None
+
+    def _print_results_by_session(self, results):
+        for (name, (success, out)) in results:
+            self.ipython_display.writeln("Session '{}':".format(name))
+            if success:
+                self.ipython_display.writeln(out)
+            else:
+                self.ipython_display.send_error("{}\n".format(out))
+
     def _print_local_info(self):
         sessions_info = ["        {}".format(i) for i in self.spark_controller.get_manager_sessions_str()]
         print("""Info for running Spark:
@@ -239,5 +383,11 @@ class RemoteSparkMagics(Magics):
             raise ValueError("Cannot get session kind for {}.".format(language))
 
         
+# The magics registered by load_ipython_extension, for code that runs in the same process as the shell.
+loaded_magics = None
+
+
 def load_ipython_extension(ip):
-    ip.register_magics(RemoteSparkMagics)
+    global loaded_magics
+    loaded_magics = RemoteSparkMagics(ip)
+    ip.register_magics(loaded_magics)
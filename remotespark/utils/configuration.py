@@ -53,6 +53,13 @@ def override(config, value):
     _overrides[config] = value
 
 
+def is_overridden(config):
+    """Given a string representing a configuration, returns whether its value was set in the configuration file
+    or overridden, rather than being the default value."""
+    initialize()
+    return config in _overrides
+
+
 def _override(f):
     """A decorator which first initializes the overrided configurations,
     then checks the global overrided defaults for the given configuration,
@@ -143,6 +150,15 @@ def execute_timeout_seconds():
     return 3600
 
 
+# Seconds that `%spark logs --follow` shows new lines of the log of a busy session before it stops.
+@_override
+def follow_logs_timeout_seconds():
+    return 3600
+
+
+# Deprecated: status_sleep_seconds and statement_sleep_seconds are the seconds between polls of the status of a
+# session and of a statement with the 'constant' polling schedule only. The default 'exponential' schedule ignores
+# them and uses polling_initial_seconds, polling_multiplier and polling_max_seconds instead.
 @_override
 def status_sleep_seconds():
     return 2
@@ -153,11 +169,67 @@ def statement_sleep_seconds():
     return 2
 
 
+# Number of lines of the log of a session fetched by every request to Livy.
+@_override
+def log_lines_per_request():
+    return 1000
+
+
+# Number of lines of the log of a session kept in memory. Older lines are dropped.
+@_override
+def max_log_lines():
+    return 10000
+
+
+# Number of started sessions kept in reserve for every endpoint and set of session properties, so that new
+# sessions are ready right away. 0 turns the pool off.
+@_override
+def session_pool_size():
+    return 0
+
+
+# Seconds a session waits in the pool before it is deleted, and without any session taken from a pool before it
+# stops being refilled.
+@_override
+def session_pool_idle_ttl_seconds():
+    return 900
+
+
+# How often the status of sessions and statements is polled: 'exponential' or 'constant'.
+@_override
+def polling_schedule():
+    return "exponential"
+
+
+# Seconds before the first poll of the 'exponential' schedule.
+@_override
+def polling_initial_seconds():
+    return 0.05
+
+
+# Factor by which every wait of the 'exponential' schedule is longer than the previous one.
+@_override
+def polling_multiplier():
+    return 1.5
+
+
+# Longest wait in seconds between two polls of the 'exponential' schedule.
+@_override
+def polling_max_seconds():
+    return 10
+
+
 @_override
 def create_sql_context_timeout_seconds():
     return 60
 
 
+# Number of sessions that code run against several sessions at once runs in at the same time.
+@_override
+def max_parallel_sessions():
+    return 8
+
+
 @_override
 def fatal_error_suggestion():
     return """The code failed because of a fatal error:
@@ -174,16 +246,109 @@ def ignore_ssl_errors():
     return False
 
 
+# Whether the connections to a Livy endpoint are kept open and reused by the next requests.
+@_override
+def http_keep_alive():
+    return True
+
+
+# Number of open connections kept for every Livy endpoint.
+@_override
+def http_pool_maxsize():
+    return 10
+
+
 @_override
 def use_auto_viz():
     return True
 
 
+# Whether the wrapper kernels start their session in the background as soon as they start.
+@_override
+def prewarm_session():
+    return False
+
+
 @_override
 def max_results_sql():
     return 2500
 
 
+# Bytes of memory that the results of SQL and Hive queries cached in the kernel take at most. 0 turns the cache off.
+@_override
+def cache_max_bytes_sql():
+    return 0
+
+
+# Seconds a result stays in the memory cache of SQL and Hive query results.
+@_override
+def cache_ttl_seconds_sql():
+    return 3600
+
+
+# Bytes of disk that the results stored with --fresh-for take at most, in the cache directory of the magics
+# home. 0 turns the disk cache off.
+@_override
+def disk_cache_max_bytes_sql():
+    return 1073741824
+
+
+# Results of more rows than chunk_rows_sql are fetched in chunks of JSON, whatever sql_transfer_format is. Set it to 0
+# to fetch every result at once in sql_transfer_format.
+@_override
+def chunk_rows_sql():
+    return 10000
+
+
+# String columns of SQL and Hive query results with at most this ratio of distinct values to rows are stored as
+# pandas categories. 0 keeps every string column as objects.
+@_override
+def max_category_ratio_sql():
+    return 0.5
+
+
+# How the rows of SQL and Hive query results are sent by the session: 'json' or 'csv_gzip'.
+@_override
+def sql_transfer_format():
+    return "json"
+
+
+# Whether charts of SQL and Hive query results aggregate the whole result in Spark rather than the fetched rows.
+@_override
+def push_down_aggregations():
+    return False
+
+
+# Number of values of the x column kept by aggregations pushed down to Spark.
+@_override
+def max_groups_aggregation():
+    return 10000
+
+
 @_override
 def max_slices_pie_graph():
     return 100
+
+
+# Number of points line and area charts are downsampled to. 0 draws every point.
+@_override
+def max_points_line_graph():
+    return 2000
+
+
+# Number of points from which line charts are drawn with WebGL. 0 never uses WebGL.
+@_override
+def webgl_min_points_line_graph():
+    return 10000
+
+
+# Number of rows of every page of table charts.
+@_override
+def rows_per_table_page():
+    return 25
+
+
+# Number of values of every column used to guess the types of the columns of a chart.
+@_override
+def type_inference_sample_rows():
+    return 1000
@@ -34,6 +34,26 @@ class Constants(object):
                                busy_session_status, error_session_status, dead_session_status]
     final_status = [dead_session_status, error_session_status]
 
+    cancelled_statement_state = "cancelled"
+    running_statement_states = ["waiting", "running", "cancelling"]
+
+    polling_schedule_constant = "constant"
+    polling_schedule_exponential = "exponential"
+    polling_schedules_supported = [polling_schedule_constant, polling_schedule_exponential]
+
+    sql_transfer_format_json = "json"
+    sql_transfer_format_csv_gzip = "csv_gzip"
+    sql_transfer_formats_supported = [sql_transfer_format_json, sql_transfer_format_csv_gzip]
+    # Starts the line with the schema of a chunked result, so that it can be told apart from what the interpreter echoes.
+    chunked_schema_prefix = long_random_variable_name + "_schema "
+    # Starts every string in the csv_gzip transfer format, so that empty strings are not read as nulls.
+    csv_string_prefix = "'"
+
+    sample_method_take = "take"
+    sample_method_sample = "sample"
+    sample_method_stratified = "stratified"
+    sample_methods_supported = [sample_method_take, sample_method_sample, sample_method_stratified]
+
     delete_session_action = "delete"
     start_session_action = "start"
     do_nothing_action = "nothing"
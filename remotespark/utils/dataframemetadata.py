@@ -0,0 +1,79 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+"""Metadata attached to the pandas DataFrames returned by the magics. It is kept in a store keyed by weak references
+rather than in attributes of the DataFrames: pandas warns when a new attribute is set on a DataFrame, and does not
+carry such attributes over the copies its operations make. The metadata of a DataFrame is dropped as soon as the
+DataFrame is garbage collected. Copies of a DataFrame do not inherit its metadata.
+"""
+
+from threading import Lock
+import weakref
+
+
+_schema_typed_key = "schema_typed"
+_aggregator_key = "aggregator"
+_column_profile_key = "column_profile"
+
+_metadata = dict()
+_lock = Lock()
+
+
+def set_metadata(df, key, value):
+    df_id = id(df)
+
+    def _forget(_):
+        with _lock:
+            _metadata.pop(df_id, None)
+
+    with _lock:
+        entry = _metadata.get(df_id)
+        if entry is None or entry[0]() is not df:
+            entry = (weakref.ref(df, _forget), dict())
+            _metadata[df_id] = entry
+        entry[1][key] = value
+
+
+def get_metadata(df, key, default=None):
+    with _lock:
+        entry = _metadata.get(id(df))
+    if entry is None or entry[0]() is not df:
+        return default
+    return entry[1].get(key, default)
+
+
+def copy_metadata(source_df, target_df):
+    with _lock:
+        entry = _metadata.get(id(source_df))
+    if entry is None or entry[0]() is not source_df:
+        return
+    for (key, value) in list(entry[1].items()):
+        set_metadata(target_df, key, value)
+
+
+def mark_schema_typed(df):
+    """Records that the dtypes of df come from the schema of the Spark DataFrame it was fetched from."""
+    set_metadata(df, _schema_typed_key, True)
+
+
+def is_schema_typed(df):
+    return get_metadata(df, _schema_typed_key, False)
+
+
+def set_aggregator(df, aggregator):
+    """Records the object that computes the aggregated series of the charts of df, when df is only part of the
+    result of a query."""
+    set_metadata(df, _aggregator_key, aggregator)
+
+
+def get_aggregator(df):
+    return get_metadata(df, _aggregator_key)
+
+
+def set_column_profile(df, profile):
+    """Records the types inferred for the columns of df, so that they are only inferred once."""
+    set_metadata(df, _column_profile_key, profile)
+
+
+def get_column_profile(df):
+    return get_metadata(df, _column_profile_key)
@@ -22,6 +22,9 @@ class Log(object):
     def debug(self, message):
         self.logger.debug(self._transform_log_message(message))
 
+    def warning(self, message):
+        self.logger.warning(self._transform_log_message(message))
+
     def error(self, message):
         self.logger.error(self._transform_log_message(message))
 
@@ -0,0 +1,33 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+
+from remotespark.utils.log import Log
+
+
+class LoggingDisplay(object):
+    """Display for work that runs in the background, away from any cell. Whatever would be shown to the user is
+    written to the log instead."""
+
+    def __init__(self):
+        self.logger = Log("LoggingDisplay")
+
+    def display(self, to_display):
+        self.logger.debug(to_display)
+
+    def html(self, to_display):
+        self.logger.debug(to_display)
+
+    def stderr_flush(self):
+        pass
+
+    def stdout_flush(self):
+        pass
+
+    def write(self, msg):
+        self.logger.debug(msg)
+
+    def writeln(self, msg):
+        self.write(msg)
+
+    def send_error(self, error):
+        self.logger.error(error)
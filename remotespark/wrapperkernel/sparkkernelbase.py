@@ -1,11 +1,17 @@
 # Copyright (c) 2015  aggftw@gmail.com
 # Distributed under the terms of the Modified BSD License.
+import copy
+from threading import Thread
+
 import requests
 from ipykernel.ipkernel import IPythonKernel
 from remotespark.utils.ipythondisplay import IpythonDisplay
 
+import remotespark.remotesparkmagics as remotesparkmagics
 import remotespark.utils.configuration as conf
+from remotespark.remotesparkmagics import RemoteSparkMagics
 from remotespark.utils.log import Log
+from remotespark.utils.loggingdisplay import LoggingDisplay
 from remotespark.utils.utils import get_connection_string
 from .usercommandparser import UserCommandParser
 from .codetransformers import *
@@ -32,6 +38,8 @@ class SparkKernelBase(IPythonKernel):
         self._session_started = False
         self._fatal_error = None
         self._ipython_display = IpythonDisplay()
+        self._prewarm_thread = None
+        self._prewarm_error = None
 
         self.user_command_parser = UserCommandParser()
 
@@ -48,6 +56,8 @@ class SparkKernelBase(IPythonKernel):
             (username, password, url) = configuration
             self.connection_string = get_connection_string(url, username, password)
             self._load_magics_extension()
+            if conf.prewarm_session():
+                self._prewarm_session()
             if conf.use_auto_viz():
                 self._register_auto_viz()
 
@@ -58,6 +68,13 @@ class SparkKernelBase(IPythonKernel):
         # Parse command
         subcommand, force, output_var, command = self.user_command_parser.parse_user_command(code)
 
+        # Local code can run while the session is created in the background.
+        if subcommand != UserCommandParser.local_command:
+            prewarm_error = self._join_prewarm()
+            if prewarm_error is not None:
+                self._show_user_error("Failed to create a Livy session in the background. Trying again.\n"
+                                      "Exception details:\n\t\"{}\"".format(prewarm_error))
+
         # Get transformer
         transformer = self._get_code_transformer(subcommand)
 
@@ -103,6 +120,7 @@ class SparkKernelBase(IPythonKernel):
 
     def do_shutdown(self, restart):
         # Cleanup
+        self._join_prewarm()
         self._delete_session()
 
         return self._do_shutdown_ipykernel(restart)
@@ -154,6 +172,56 @@ ip.display_formatter.ipython_display_formatter.for_type_by_name('pandas.core.fra
                                log_if_error="Failed to create a Livy session.")
             self._logger.debug("Added session.")
 
+    def _prewarm_session(self):
+        """Starts creating the Livy session in a background thread, so that the first Spark cell only waits for
+        the part of the session startup that is left. Errors are shown by the first cell that needs the session,
+        which then creates the session the usual way."""
+        spark_controller = self._get_spark_controller()
+        properties = copy.deepcopy(conf.session_configs())
+        properties["kind"] = RemoteSparkMagics._get_livy_kind(self.session_language)
+
+        def prewarm():
+            try:
+                spark_controller.add_session(self.client_name, self.connection_string, True, properties,
+                                             LoggingDisplay())
+                self._logger.debug("Added session in the background.")
+            except Exception as e:
+                self._logger.error("Failed to create a Livy session in the background: {}".format(e))
+                self._prewarm_error = e
+                self._remove_prewarm_session(spark_controller)
+
+        self._session_started = True
+        self._prewarm_thread = Thread(target=prewarm)
+        self._prewarm_thread.daemon = True
+        self._prewarm_thread.start()
+
+    def _join_prewarm(self):
+        """Waits for the session created in the background, if any. Returns the error creating it raised, or
+        None."""
+        if self._prewarm_thread is None:
+            return None
+
+        self._prewarm_thread.join()
+        self._prewarm_thread = None
+
+        error = self._prewarm_error
+        self._prewarm_error = None
+        if error is not None:
+            self._session_started = False
+        return error
+
+    def _remove_prewarm_session(self, spark_controller):
+        """Removes the session that failed to start, so that the next cell can add it again."""
+        try:
+            if self.client_name in spark_controller.get_client_keys():
+                spark_controller.delete_session_by_name(self.client_name)
+        except Exception as e:
+            self._logger.error("Failed to delete the Livy session created in the background: {}".format(e))
+
+    @staticmethod
+    def _get_spark_controller():
+        return remotesparkmagics.loaded_magics.spark_controller
+
     def _delete_session(self):
         if self._session_started:
             code = "%spark cleanup"
@@ -3,6 +3,7 @@ from nose.tools import with_setup
 
 from remotespark.datawidgets.autovizwidget import AutoVizWidget
 from remotespark.datawidgets.encoding import Encoding
+from remotespark.datawidgets.pandasaggregator import PandasAggregator
 import pandas as pd
 
 
@@ -55,7 +56,8 @@ def test_on_render_viz():
     # on_render_viz is called in the constructor, so no need to call it here.
     output.clear_output.assert_called_once()
 
-    renderer.render.assert_called_once_with(df, encoding, output)
+    renderer.render.assert_called_once_with(df, encoding, output, widget.aggregator)
+    assert isinstance(widget.aggregator, PandasAggregator)
 
     encoding_widget.show_x.assert_called_once_with(True)
     encoding_widget.show_y.assert_called_once_with(True)
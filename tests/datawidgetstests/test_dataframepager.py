@@ -0,0 +1,95 @@
+from nose.tools import assert_equals, raises
+import pandas as pd
+
+from remotespark.datawidgets.dataframepager import DataFramePager
+
+
+def _make_df():
+    return pd.DataFrame({u'buildingID': [0, 1, 2, 0, 1, 2, 0],
+                         u'temp_diff': [12, 0, 11, None, 19, 32, 7]})
+
+
+def test_pages():
+    pager = DataFramePager(_make_df(), 3)
+
+    assert_equals(pager.page_count, 3)
+    assert_equals(pager.row_count, 7)
+    assert_equals(pager.get_page(0)[u'temp_diff'].tolist()[:3], [12, 0, 11])
+    assert_equals(len(pager.get_page(2)), 1)
+
+
+def test_empty_df_has_one_page():
+    pager = DataFramePager(pd.DataFrame({u'a': []}), 3)
+
+    assert_equals(pager.page_count, 1)
+    assert_equals(len(pager.get_page(0)), 0)
+
+
+@raises(ValueError)
+def test_page_out_of_range():
+    DataFramePager(_make_df(), 3).get_page(3)
+
+
+@raises(ValueError)
+def test_rows_per_page_must_be_positive():
+    DataFramePager(_make_df(), 0)
+
+
+def test_sort():
+    pager = DataFramePager(_make_df(), 3)
+
+    pager.sort(u'temp_diff', ascending=False)
+
+    assert_equals(pager.get_page(0)[u'temp_diff'].tolist(), [32, 19, 12])
+    # Missing values go last
+    assert pd.isnull(pager.get_page(2)[u'temp_diff'].tolist()[0])
+
+    pager.sort(None)
+
+    assert_equals(pager.get_page(0)[u'temp_diff'].tolist()[:3], [12, 0, 11])
+
+
+@raises(ValueError)
+def test_sort_unknown_column():
+    DataFramePager(_make_df(), 3).sort(u'nope')
+
+
+def test_filter():
+    pager = DataFramePager(_make_df(), 2)
+
+    pager.filter(u'buildingID', "0")
+
+    assert_equals(pager.row_count, 3)
+    assert_equals(pager.page_count, 2)
+    assert_equals(pager.get_page(0).index.tolist(), [0, 3])
+
+    pager.filter(None, None)
+
+    assert_equals(pager.row_count, 7)
+
+
+def test_filter_on_float_column_with_integer_text():
+    pager = DataFramePager(_make_df(), 2)
+
+    pager.filter(u'temp_diff', "12")
+
+    assert_equals(pager.get_page(0).index.tolist(), [0])
+
+
+def test_filter_without_match():
+    pager = DataFramePager(_make_df(), 2)
+
+    pager.filter(u'buildingID', "7")
+
+    assert_equals(pager.row_count, 0)
+    assert_equals(len(pager.get_page(0)), 0)
+
+
+def test_filter_and_sort():
+    pager = DataFramePager(_make_df(), 2)
+
+    pager.filter(u'buildingID', 0)
+    pager.sort(u'temp_diff')
+
+    assert_equals(pager.get_page(0)[u'temp_diff'].tolist(), [7, 12])
+    assert_equals(pager.page_count, 2)
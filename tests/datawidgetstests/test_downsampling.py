@@ -0,0 +1,67 @@
+from nose.tools import assert_equals
+import numpy as np
+import pandas as pd
+
+from remotespark.datawidgets.downsampling import downsample, lttb_indices
+
+
+def test_lttb_keeps_first_and_last_points():
+    x = np.arange(1000, dtype=float)
+    indices = lttb_indices(x, np.sin(x / 50), 100)
+
+    assert_equals(100, len(indices))
+    assert_equals(0, indices[0])
+    assert_equals(999, indices[-1])
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_keeps_peaks():
+    y = np.zeros(1000)
+    y[500] = 100
+    y[250] = -50
+
+    indices = lttb_indices(np.arange(1000, dtype=float), y, 10)
+
+    assert 500 in indices
+    assert 250 in indices
+
+
+def test_lttb_with_enough_points():
+    assert_equals([0, 1, 2], list(lttb_indices(np.arange(3.0), np.arange(3.0), 10)))
+
+
+def test_downsample_small_series_is_unchanged():
+    assert_equals(([1, 2], [3, 4]), downsample([1, 2], [3, 4], 10))
+
+
+def test_downsample_disabled():
+    x_values = list(range(100))
+
+    assert_equals((x_values, x_values), downsample(x_values, x_values, 0))
+
+
+def test_downsample_dates_and_nulls():
+    x_values = list(pd.date_range("2016-01-01", periods=1000, freq="min"))
+    y_values = [None if i % 10 == 0 else i for i in range(1000)]
+
+    (xs, ys) = downsample(x_values, y_values, 50)
+
+    assert_equals(50, len(xs))
+    assert_equals(x_values[0], xs[0])
+    assert_equals(x_values[-1], xs[-1])
+    assert all(x in x_values for x in xs)
+
+
+def test_downsample_categories():
+    x_values = [u"category{}".format(i) for i in range(100)]
+
+    (xs, ys) = downsample(x_values, list(range(100)), 10)
+
+    assert_equals(10, len(xs))
+
+
+def test_downsample_non_numeric_y_is_unchanged():
+    x_values = list(range(100))
+    y_values = [u"value{}".format(i) for i in range(100)]
+
+    assert_equals((x_values, y_values), downsample(x_values, y_values, 10))
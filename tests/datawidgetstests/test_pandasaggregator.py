@@ -0,0 +1,59 @@
+from mock import patch
+from nose.tools import assert_equals, raises
+import pandas as pd
+
+from remotespark.datawidgets.encoding import Encoding
+from remotespark.datawidgets.invalidencodingerror import InvalidEncodingError
+from remotespark.datawidgets.pandasaggregator import PandasAggregator
+
+
+def _df():
+    records = [{u'buildingID': 0, u'date': u'6/1/13', u'temp_diff': 12, u"str": "str"},
+               {u'buildingID': 1, u'date': u'6/1/13', u'temp_diff': 0, u"str": "str"},
+               {u'buildingID': 2, u'date': u'6/1/14', u'temp_diff': 11, u"str": "str"},
+               {u'buildingID': 0, u'date': u'6/1/15', u'temp_diff': 5, u"str": "str"}]
+    return pd.DataFrame(records)
+
+
+def test_aggregate():
+    aggregator = PandasAggregator(_df())
+
+    assert_equals(([u'6/1/13', u'6/1/14', u'6/1/15'], [6, 11, 5]),
+                  aggregator.aggregate("date", "temp_diff", Encoding.y_agg_avg))
+    assert_equals([0, 11, 5], aggregator.aggregate("date", "temp_diff", Encoding.y_agg_min)[1])
+    assert_equals([12, 11, 5], aggregator.aggregate("date", "temp_diff", Encoding.y_agg_max)[1])
+    assert_equals([12, 11, 5], aggregator.aggregate("date", "temp_diff", Encoding.y_agg_sum)[1])
+    assert_equals([2, 1, 1], aggregator.aggregate("date", "temp_diff", Encoding.y_agg_count)[1])
+
+
+def test_count():
+    assert_equals(([u'6/1/13', u'6/1/14', u'6/1/15'], [2, 1, 1]), PandasAggregator(_df()).count("date"))
+
+
+def test_rows_are_grouped_once_per_x():
+    aggregator = PandasAggregator(_df())
+
+    with patch.object(pd.DataFrame, "groupby", autospec=True, side_effect=pd.DataFrame.groupby) as groupby:
+        for y_aggregation in [Encoding.y_agg_avg, Encoding.y_agg_min, Encoding.y_agg_max, Encoding.y_agg_sum]:
+            aggregator.aggregate("date", "temp_diff", y_aggregation)
+        aggregator.aggregate("date", "buildingID", Encoding.y_agg_avg)
+        aggregator.count("date")
+        aggregator.count("buildingID")
+
+    assert_equals(2, groupby.call_count)
+
+
+def test_aggregations_that_do_not_apply_to_the_column():
+    aggregator = PandasAggregator(_df())
+
+    assert_equals([u"str", u"str", u"str"], aggregator.aggregate("date", "str", Encoding.y_agg_max)[1])
+    try:
+        aggregator.aggregate("date", "str", Encoding.y_agg_avg)
+        assert False
+    except InvalidEncodingError:
+        pass
+
+
+@raises(ValueError)
+def test_aggregate_without_aggregation():
+    PandasAggregator(_df()).aggregate("date", "temp_diff", Encoding.y_agg_none)
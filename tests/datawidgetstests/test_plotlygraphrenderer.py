@@ -1,5 +1,6 @@
 from mock import MagicMock
 
+import remotespark.utils.configuration as conf
 from remotespark.datawidgets.plotlygraphs.graphrenderer import GraphRenderer
 from remotespark.datawidgets.encoding import Encoding
 
@@ -17,6 +18,24 @@ def test_support_all_graph_types():
         getattr(graph, "display_logarithmic_y_axis")
 
 
+def test_line_graph_gets_webgl_threshold():
+    renderer = GraphRenderer(testing=True, webgl_min_points=500)
+
+    graph = renderer._get_graph(Encoding.chart_type_line, renderer.webgl_min_points)
+
+    assert graph.webgl_min_points == 500
+
+
+def test_webgl_threshold_defaults_to_configuration():
+    conf.override_all({conf.webgl_min_points_line_graph.__name__: 0})
+    try:
+        renderer = GraphRenderer(testing=True)
+
+        assert renderer.webgl_min_points == 0
+    finally:
+        conf.override_all({})
+
+
 def test_display_controls():
     renderer = GraphRenderer(testing=True)
 
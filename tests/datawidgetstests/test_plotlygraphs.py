@@ -1,7 +1,9 @@
 import pandas as pd
 from mock import MagicMock
 
+import remotespark.utils.configuration as conf
 from remotespark.datawidgets.plotlygraphs.graphbase import GraphBase
+from remotespark.datawidgets.plotlygraphs.linegraph import LineGraph
 from remotespark.datawidgets.plotlygraphs.piegraph import PieGraph
 from remotespark.datawidgets.plotlygraphs.datagraph import DataGraph
 from remotespark.datawidgets.encoding import Encoding
@@ -67,6 +69,67 @@ def test_graphbase_get_x_y_values():
         pass
 
 
+def test_graphbase_get_x_y_values_with_aggregator():
+    df = pd.DataFrame([{u'date': u'6/1/13', u'temp_diff': 12}])
+    aggregator = MagicMock()
+    aggregator.aggregate.return_value = ([u'6/1/13', u'6/1/14'], [20, 11])
+
+    encoding = Encoding(chart_type=Encoding.chart_type_line, x="date", y="temp_diff", y_aggregation=Encoding.y_agg_sum)
+    xs, ys = GraphBase._get_x_y_values(df, encoding, aggregator)
+
+    assert xs == [u'6/1/13', u'6/1/14']
+    assert ys == [20, 11]
+    aggregator.aggregate.assert_called_once_with("date", "temp_diff", Encoding.y_agg_sum)
+
+    aggregator.aggregate.side_effect = ValueError("No Y aggregation function specified.")
+    encoding.y_aggregation = Encoding.y_agg_none
+    xs, ys = GraphBase._get_x_y_values(df, encoding, aggregator)
+
+    assert xs == [u'6/1/13']
+    assert ys == [12]
+
+
+def test_line_graph_downsamples():
+    conf.override_all({conf.max_points_line_graph.__name__: 100})
+    try:
+        df = pd.DataFrame({"x": list(range(1000)), "y": [i % 7 for i in range(1000)]})
+        encoding = Encoding(chart_type=Encoding.chart_type_line, x="x", y="y", y_aggregation=Encoding.y_agg_none)
+        graph = LineGraph()
+
+        data = graph._get_data(df, encoding)
+
+        assert len(data[0]["x"]) == 100
+        assert graph.points_before_downsampling == 1000
+    finally:
+        conf.override_all({})
+
+
+def test_line_graph_uses_webgl_for_large_series():
+    conf.override_all({conf.max_points_line_graph.__name__: 100})
+    try:
+        df = pd.DataFrame({"x": list(range(1000)), "y": [i % 7 for i in range(1000)]})
+        encoding = Encoding(chart_type=Encoding.chart_type_line, x="x", y="y", y_aggregation=Encoding.y_agg_none)
+        graph = LineGraph(webgl_min_points=1000)
+
+        data = graph._get_data(df, encoding)
+
+        assert data[0]["type"] == "scattergl"
+        assert len(data[0]["x"]) == 1000
+        assert graph.points_before_downsampling is None
+    finally:
+        conf.override_all({})
+
+
+def test_line_graph_uses_svg_below_webgl_threshold():
+    df = pd.DataFrame({"x": list(range(10)), "y": list(range(10))})
+    encoding = Encoding(chart_type=Encoding.chart_type_line, x="x", y="y", y_aggregation=Encoding.y_agg_none)
+    graph = LineGraph(webgl_min_points=11)
+
+    data = graph._get_data(df, encoding)
+
+    assert data[0]["type"] == "scatter"
+
+
 def test_pie_graph_display_methods():
     assert PieGraph.display_x()
     assert not PieGraph.display_y()
@@ -90,6 +153,18 @@ def test_pie_graph_get_values_labels():
     assert labels == ["6/1/13", "6/1/14", "6/1/15", "6/1/16", "6/1/17"]
 
 
+def test_pie_graph_get_values_labels_with_aggregator():
+    df = pd.DataFrame([{u'date': u'6/1/13', u'temp_diff': 12}])
+    aggregator = MagicMock()
+    aggregator.count.return_value = (["6/1/13", "6/1/14"], [2000, 1000])
+    encoding = Encoding(chart_type=Encoding.chart_type_pie, x="date")
+
+    values, labels = PieGraph._get_x_values_labels(df, encoding, aggregator)
+
+    assert values == [2000, 1000]
+    assert labels == ["6/1/13", "6/1/14"]
+
+
 def test_data_graph_render():
     records = [{u'buildingID': 0, u'date': u'6/1/13', u'temp_diff': 12},
                {u'buildingID': 1, u'date': u'6/1/13', u'temp_diff': 0},
@@ -104,7 +179,8 @@ def test_data_graph_render():
     data = DataGraph(display)
     data.render(df, encoding, MagicMock())
 
-    assert display.html.call_count == 2
+    assert display.html.call_count == 1
+    assert display.display.call_count == 1
 
 
 def test_data_graph_display_methods():
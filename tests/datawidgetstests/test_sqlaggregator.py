@@ -0,0 +1,81 @@
+from mock import MagicMock
+from nose.tools import assert_equals, raises
+import pandas as pd
+
+from remotespark.datawidgets.encoding import Encoding
+from remotespark.datawidgets.invalidencodingerror import InvalidEncodingError
+from remotespark.datawidgets.sqlaggregator import SqlAggregator
+from remotespark.livyclientlib.dataframeparseexception import DataFrameParseException
+
+
+def _aggregator(df=None, max_groups=10):
+    if df is None:
+        df = pd.DataFrame({"date": ["6/1/13", "6/1/14"], "SUM(temp_diff)": [12, 11]},
+                          columns=["date", "SUM(temp_diff)"])
+    return SqlAggregator("SELECT * FROM t;\n", MagicMock(return_value=df), max_groups, MagicMock())
+
+
+def test_aggregate():
+    aggregator = _aggregator()
+
+    (x_values, y_values) = aggregator.aggregate("date", "temp_diff", Encoding.y_agg_sum)
+
+    assert_equals(["6/1/13", "6/1/14"], x_values)
+    assert_equals([12, 11], y_values)
+    aggregator.run_query.assert_called_once_with(
+        "SELECT `date`, SUM(`temp_diff`) FROM (\nSELECT * FROM t\n) AS aggregated_query WHERE `date` IS NOT NULL "
+        "GROUP BY `date` ORDER BY `date`", 11)
+    assert_equals(0, aggregator.ipython_display.send_error.call_count)
+
+
+def test_count():
+    aggregator = _aggregator()
+
+    (labels, values) = aggregator.count("date")
+
+    assert_equals(["6/1/13", "6/1/14"], labels)
+    assert "COUNT(1)" in aggregator.run_query.call_args[0][0]
+
+
+def test_series_are_cached_per_encoding():
+    aggregator = _aggregator()
+
+    aggregator.aggregate("date", "temp_diff", Encoding.y_agg_sum)
+    aggregator.aggregate("date", "temp_diff", Encoding.y_agg_avg)
+    aggregator.aggregate("date", "temp_diff", Encoding.y_agg_sum)
+
+    assert_equals(2, aggregator.run_query.call_count)
+
+
+def test_columns_are_quoted():
+    aggregator = _aggregator()
+
+    aggregator.aggregate("my `col`", "y", Encoding.y_agg_max)
+
+    assert "SELECT `my ``col```, MAX(`y`)" in aggregator.run_query.call_args[0][0]
+
+
+@raises(ValueError)
+def test_aggregate_without_aggregation():
+    _aggregator().aggregate("date", "temp_diff", Encoding.y_agg_none)
+
+
+@raises(InvalidEncodingError)
+def test_query_error_is_invalid_encoding():
+    aggregator = _aggregator()
+    aggregator.run_query.side_effect = DataFrameParseException("cannot resolve 'temp_diff'")
+
+    aggregator.aggregate("date", "temp_diff", Encoding.y_agg_avg)
+
+
+def test_series_are_truncated_to_max_groups():
+    df = pd.DataFrame({"date": ["6/1/13", "6/1/14", "6/1/15"], "COUNT(1)": [1, 2, 3]}, columns=["date", "COUNT(1)"])
+    aggregator = _aggregator(df, max_groups=2)
+
+    (labels, values) = aggregator.count("date")
+
+    assert_equals(["6/1/13", "6/1/14"], labels)
+    assert_equals([1, 2], values)
+    assert_equals(3, aggregator.run_query.call_args[0][1])
+    assert_equals(1, aggregator.ipython_display.send_error.call_count)
+    assert "more than 2 values" in aggregator.ipython_display.send_error.call_args[0][0]
@@ -0,0 +1,83 @@
+from mock import MagicMock
+from nose.tools import with_setup, assert_equals
+import pandas as pd
+
+from remotespark.datawidgets.tablewidget import TableWidget
+
+
+df = None
+ipywidget_factory = None
+
+
+def _setup():
+    global df, ipywidget_factory
+
+    df = pd.DataFrame({u'buildingID': [0, 1, 2, 0, 1], u'temp_diff': [12, 0, 11, 5, 19]})
+    ipywidget_factory = MagicMock()
+    # Every widget is a different mock
+    for getter in [ipywidget_factory.get_html, ipywidget_factory.get_button, ipywidget_factory.get_dropdown,
+                   ipywidget_factory.get_checkbox, ipywidget_factory.get_text, ipywidget_factory.get_hbox]:
+        getter.side_effect = lambda *args, **kwargs: MagicMock()
+
+
+def _teardown():
+    pass
+
+
+@with_setup(_setup, _teardown)
+def test_shows_first_page():
+    widget = TableWidget(df, 2, ipywidget_factory, testing=True)
+
+    assert_equals(widget.page, 0)
+    assert "12" in widget.table.value
+    assert "11" not in widget.table.value
+    assert_equals(widget.page_label.value, "Page 1 of 3 (5 rows)")
+    assert widget.previous_button.disabled
+    assert not widget.next_button.disabled
+
+
+@with_setup(_setup, _teardown)
+def test_next_and_previous_pages():
+    widget = TableWidget(df, 2, ipywidget_factory, testing=True)
+
+    widget._next_callback()
+    widget._next_callback()
+    widget._next_callback()
+
+    assert_equals(widget.page, 2)
+    assert widget.next_button.disabled
+
+    widget._previous_callback()
+
+    assert_equals(widget.page, 1)
+    assert "11" in widget.table.value
+
+
+@with_setup(_setup, _teardown)
+def test_sort_goes_back_to_first_page():
+    widget = TableWidget(df, 2, ipywidget_factory, testing=True)
+    widget._next_callback()
+    widget.sort_view.value = u'temp_diff'
+    widget.descending_view.value = True
+
+    widget._sort_changed_callback()
+
+    assert_equals(widget.page, 0)
+    assert_equals(widget.pager.get_page(0)[u'temp_diff'].tolist(), [19, 12])
+
+
+@with_setup(_setup, _teardown)
+def test_filter():
+    widget = TableWidget(df, 2, ipywidget_factory, testing=True)
+    widget.filter_column_view.value = u'buildingID'
+    widget.filter_value_view.value = "1"
+
+    widget._filter_changed_callback()
+
+    assert_equals(widget.page_label.value, "Page 1 of 1 (2 rows)")
+
+    widget.filter_value_view.value = ""
+
+    widget._filter_changed_callback()
+
+    assert_equals(widget.pager.row_count, 5)
@@ -1,8 +1,11 @@
+from mock import patch, MagicMock
 from nose.tools import with_setup
 import pandas as pd
 
 import remotespark.datawidgets.utils as utils
+import remotespark.utils.configuration as conf
 from remotespark.datawidgets.encoding import Encoding
+from remotespark.utils.dataframemetadata import mark_schema_typed
 
 
 df = None
@@ -110,3 +113,66 @@ def test_select_y():
     selected_x = 'col1'
     selected_y = utils.select_y(data, selected_x, ['N', 'T', 'Q', 'O'])
     assert selected_y == 'col2'
+
+
+@with_setup(_setup, _teardown)
+def test_profile_columns_is_cached_with_the_dataframe():
+    utils.coerce_pandas_df_to_numeric_datetime(df)
+    profile = utils.profile_columns(df)
+
+    assert profile == {u'buildingID': "Q", u'date': "T", u'temp_diff': "Q", "mystr": "N", "mystr2": "Q"}
+
+    with patch("remotespark.datawidgets.utils.infer_vegalite_type") as infer:
+        assert utils.profile_columns(df) is profile
+        assert utils.select_x(df) == u'date'
+        assert infer.call_count == 0
+
+
+@with_setup(_setup, _teardown)
+def test_profile_columns_changes_with_the_dtypes():
+    profile = utils.profile_columns(df)
+    assert profile[u'date'] == "N"
+
+    utils.coerce_pandas_df_to_numeric_datetime(df)
+
+    assert utils.profile_columns(df)[u'date'] == "T"
+
+
+def test_profile_columns_samples_rows():
+    conf.override_all({conf.type_inference_sample_rows.__name__: 10})
+    try:
+        data = pd.DataFrame({"col1": list(range(1000))})
+        with patch("remotespark.datawidgets.utils.infer_vegalite_type", MagicMock(return_value="Q")) as infer:
+            utils.profile_columns(data)
+
+        sample = infer.call_args[0][0]
+        assert len(sample) == 10
+        assert sample.iloc[0] == 0
+        assert sample.iloc[-1] == 999
+    finally:
+        conf.override_all({})
+
+
+def test_coerce_skips_columns_whose_sample_does_not_convert():
+    conf.override_all({conf.type_inference_sample_rows.__name__: 10})
+    try:
+        data = pd.DataFrame({"col1": ["a"] * 1000})
+        with patch("remotespark.datawidgets.utils.pd.to_datetime", MagicMock(side_effect=ValueError)) as to_datetime:
+            utils.coerce_pandas_df_to_numeric_datetime(data)
+
+        assert to_datetime.call_count == 1
+        assert len(to_datetime.call_args[0][0]) == 10
+        assert data["col1"].dtype == object
+    finally:
+        conf.override_all({})
+
+
+@with_setup(_setup, _teardown)
+def test_display_dataframe_keeps_schema_types():
+    mark_schema_typed(df)
+
+    with patch("remotespark.datawidgets.utils.AutoVizWidget"):
+        utils.display_dataframe(df)
+
+    assert df["mystr2"].dtype == object
+    assert df["date"].dtype == object
@@ -0,0 +1,138 @@
+# Copyright (c) 2015  aggftw@gmail.com
+# Distributed under the terms of the Modified BSD License.
+"""Just enough of the PySpark API to run the code that the PySpark client sends to Livy, so that the tests and the
+benchmarks can check the real generated code without a cluster."""
+
+import json
+import random
+import sys
+from io import StringIO
+
+
+class FakeSchema(object):
+    def __init__(self, fields):
+        self.fields = fields
+
+    def json(self):
+        return json.dumps({"type": "struct", "fields": [{"name": name, "type": spark_type, "nullable": True,
+                                                         "metadata": {}} for (name, spark_type) in self.fields]})
+
+
+class FakeRDD(object):
+    """RDD whose items are made by make_items every time they are read, so that big results are never all in
+    memory at once."""
+    def __init__(self, make_items):
+        self._make_items = make_items
+        self.cached = False
+
+    def cache(self):
+        self.cached = True
+        return self
+
+    def unpersist(self):
+        self.cached = False
+        return self
+
+    def take(self, n):
+        items = []
+        for item in self._make_items():
+            if len(items) >= n:
+                break
+            items.append(item)
+        return items
+
+    def toLocalIterator(self):
+        return self._make_items()
+
+
+class FakeColumn(object):
+    def __init__(self, position, convert=None):
+        self.position = position
+        self.convert = convert
+
+    def cast(self, spark_type):
+        assert spark_type == "string"
+        return FakeColumn(self.position, lambda value: None if value is None else u"{}".format(value))
+
+    def value(self, row):
+        value = row[self.position]
+        return value if self.convert is None else self.convert(value)
+
+
+class FakeDataFrame(object):
+    def __init__(self, fields, rows):
+        self.fields = fields
+        self.schema = FakeSchema(fields)
+        self.rows = rows
+        names = [name for (name, _) in fields]
+        self.json_rows = FakeRDD(lambda: (json.dumps(dict(zip(names, row)), default=str) for row in self.rows))
+
+    def take(self, n):
+        return self.rows[:n]
+
+    def collect(self):
+        return self.rows
+
+    def select(self, column):
+        position = self._position(column)
+        return FakeDataFrame([self.fields[position]], [(row[position],) for row in self.rows])
+
+    def distinct(self):
+        return FakeDataFrame(self.fields, sorted(set(self.rows), key=repr))
+
+    def sample(self, with_replacement, fraction, seed=None):
+        generator = random.Random(seed)
+        return FakeDataFrame(self.fields, [row for row in self.rows if generator.random() < fraction])
+
+    def sampleBy(self, column, fractions, seed=None):
+        assert None not in fractions
+        assert all(isinstance(key, (float, int, str, type(u""))) for key in fractions)
+        position = self._position(column)
+        generator = random.Random(seed)
+        return FakeDataFrame(self.fields, [row for row in self.rows
+                                           if generator.random() < fractions.get(row[position], 0)])
+
+    def __getitem__(self, column):
+        return FakeColumn(self._position(column))
+
+    def withColumn(self, name, column):
+        return FakeDataFrame(self.fields + [(name, "string")], [row + (column.value(row),) for row in self.rows])
+
+    def drop(self, column):
+        position = self._position(column)
+        return FakeDataFrame(self.fields[:position] + self.fields[position + 1:],
+                             [row[:position] + row[position + 1:] for row in self.rows])
+
+    def toJSON(self):
+        return self.json_rows
+
+    def _position(self, column):
+        return [name for (name, _) in self.fields].index(column)
+
+
+class FakeContext(object):
+    def __init__(self, df):
+        self.df = df
+
+    def sql(self, command):
+        return self.df
+
+
+def run_python(code, namespace):
+    """Runs the code sent to Livy locally and returns what it printed."""
+    stdout = sys.stdout
+    sys.stdout = out = StringIO()
+    try:
+        exec(code, namespace)
+    finally:
+        sys.stdout = stdout
+    return out.getvalue()
+
+
+def fake_execute(df, namespace=None):
+    """Returns a replacement for LivyClient.execute that runs the code against a session where sqlContext.sql
+    returns df. The variables the code leaves behind are kept in namespace."""
+    if namespace is None:
+        namespace = dict()
+    namespace["sqlContext"] = FakeContext(df)
+    return lambda code: (True, run_python(code, namespace).rstrip("\n"))
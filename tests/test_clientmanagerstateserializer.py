@@ -1,4 +1,4 @@
-from nose.tools import raises
+from nose.tools import raises, assert_equals
 from mock import MagicMock, PropertyMock
 import json
 
@@ -51,16 +51,43 @@ def test_deserialize_not_emtpy():
     (name, client) = deserialized[0]
     assert name == "py"
     client_factory.create_session.assert_any_call("url=https://mysite.com/livy;username=user;password=pass",
-                                                  "1", True, {"kind":"pyspark"})
+                                                  "1", True, {"kind":"pyspark"}, hive_created=True)
     client_factory.build_client.assert_any_call(session)
 
     (name, client) = deserialized[1]
     assert name == "sc"
     client_factory.create_session.assert_any_call("url=https://mysite.com/livy;username=user;password=pass",
-                                                  "2", False, {"kind":"spark"})
+                                                  "2", False, {"kind":"spark"}, hive_created=False)
     client_factory.build_client.assert_any_call(session)
 
 
+def test_deserialize_keeps_hive_context_state():
+    client_factory = MagicMock()
+    session = MagicMock()
+    session.is_final_status.return_value = False
+    client_factory.create_session.return_value = session
+    reader_writer = MagicMock()
+    reader_writer.read_lines.return_value = """{
+  "clients": [
+    {
+      "name": "py",
+      "id": "1",
+      "sqlcontext": true,
+      "hivecontext": false,
+      "kind": "pyspark",
+      "connectionstring": "url=https://mysite.com/livy;username=user;password=pass",
+      "version": "0.0.0"
+    }
+  ]
+}
+"""
+    serializer = ClientManagerStateSerializer(client_factory, reader_writer)
+
+    serializer.deserialize_state()
+
+    assert_equals(client_factory.create_session.call_args[1]["hive_created"], False)
+
+
 def test_deserialize_not_emtpy_but_dead():
     client_factory = MagicMock()
     session = MagicMock()
@@ -84,6 +84,13 @@ def test_configuration_override_all():
     assert_equals(conf.status_sleep_seconds(), z)
 
 
+@with_setup(_setup)
+def test_configuration_is_overridden():
+    conf.override_all({conf.status_sleep_seconds.__name__: 3})
+    assert conf.is_overridden(conf.status_sleep_seconds.__name__)
+    assert not conf.is_overridden(conf.statement_sleep_seconds.__name__)
+
+
 @with_setup(_setup)
 def test_configuration_decorator():
     def test_f():
@@ -0,0 +1,57 @@
+import gc
+
+import pandas as pd
+from nose.tools import assert_equals
+
+import remotespark.utils.dataframemetadata as metadata
+
+
+def test_metadata_is_kept_per_dataframe():
+    df = pd.DataFrame([{"a": 1}])
+    other = pd.DataFrame([{"a": 1}])
+
+    metadata.set_metadata(df, "key", "value")
+
+    assert_equals("value", metadata.get_metadata(df, "key"))
+    assert_equals(None, metadata.get_metadata(other, "key"))
+    assert_equals("default", metadata.get_metadata(df, "other key", "default"))
+
+
+def test_copies_are_not_schema_typed():
+    df = pd.DataFrame([{"a": 1}])
+
+    metadata.mark_schema_typed(df)
+
+    assert metadata.is_schema_typed(df)
+    assert not metadata.is_schema_typed(df.copy())
+
+
+def test_metadata_is_dropped_with_the_dataframe():
+    df = pd.DataFrame([{"a": 1}])
+    metadata.mark_schema_typed(df)
+    df_id = id(df)
+
+    del df
+    gc.collect()
+
+    assert df_id not in metadata._metadata
+
+
+def test_aggregator():
+    df = pd.DataFrame([{"a": 1}])
+    aggregator = object()
+
+    assert metadata.get_aggregator(df) is None
+    metadata.set_aggregator(df, aggregator)
+
+    assert metadata.get_aggregator(df) is aggregator
+
+
+def test_column_profile():
+    df = pd.DataFrame([{"a": 1}])
+    profile = {"a": "Q"}
+
+    assert metadata.get_column_profile(df) is None
+    metadata.set_column_profile(df, profile)
+
+    assert metadata.get_column_profile(df) is profile
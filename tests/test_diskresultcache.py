@@ -0,0 +1,207 @@
+from mock import patch
+from nose.tools import assert_equals, with_setup
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+from remotespark.livyclientlib.diskresultcache import DiskResultCache
+from remotespark.utils.dataframemetadata import mark_schema_typed, is_schema_typed
+
+path = None
+
+
+def _setup():
+    global path
+    path = tempfile.mkdtemp()
+
+
+def _teardown():
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _key(command="SELECT * FROM t"):
+    return DiskResultCache.make_key("http://url.com", "sql", command, 2500)
+
+
+def _df(rows):
+    return pd.DataFrame({"a": list(range(rows))})
+
+
+@with_setup(_setup, _teardown)
+def test_round_trip_keeps_types_and_metadata():
+    cache = DiskResultCache(path, 10 ** 7)
+    df = pd.DataFrame([[1, 1.5, "x", True, pd.Timestamp("2016-01-01")],
+                       [2, None, None, False, pd.Timestamp("2016-01-02")]],
+                      columns=["i", "f", "s", "b", "d"])
+    df["c"] = pd.Categorical(["u", "v"], categories=["v", "u"])
+    df["tz"] = pd.to_datetime(["2016-01-01T00:00:00+01:00", "2016-01-02T00:00:00+01:00"])
+    mark_schema_typed(df)
+
+    cache.put(_key(), df)
+    result = cache.get(_key(), 60)
+
+    assert result.equals(df)
+    assert_equals(list(df.dtypes), list(result.dtypes))
+    assert is_schema_typed(result)
+
+
+@with_setup(_setup, _teardown)
+def test_duplicate_column_names():
+    cache = DiskResultCache(path, 10 ** 7)
+    df = pd.DataFrame([[1, "a"]], columns=["x", "x"])
+
+    cache.put(_key(), df)
+
+    assert_equals(["x", "x"], list(cache.get(_key(), 60).columns))
+
+
+@with_setup(_setup, _teardown)
+def test_loaded_result_can_be_changed_without_changing_the_cache():
+    cache = DiskResultCache(path, 10 ** 7)
+    cache.put(_key(), _df(3))
+
+    result = cache.get(_key(), 60)
+    result.loc[0, "a"] = 10
+
+    assert_equals([0, 1, 2], list(cache.get(_key(), 60)["a"]))
+
+
+@with_setup(_setup, _teardown)
+def test_get_honors_max_age():
+    cache = DiskResultCache(path, 10 ** 7)
+    with patch("remotespark.livyclientlib.diskresultcache.time", return_value=1000):
+        cache.put(_key(), _df(3))
+    with patch("remotespark.livyclientlib.diskresultcache.time", return_value=1100):
+        assert cache.get(_key(), 200) is not None
+        assert cache.get(_key(), 50) is None
+
+
+@with_setup(_setup, _teardown)
+def test_keys_are_normalized():
+    cache = DiskResultCache(path, 10 ** 7)
+    cache.put(_key("SELECT *\n  FROM t;"), _df(3))
+
+    assert cache.get(_key(), 60) is not None
+    assert cache.get(_key("SELECT * FROM u"), 60) is None
+
+
+@with_setup(_setup, _teardown)
+def test_survives_new_cache_instance():
+    DiskResultCache(path, 10 ** 7).put(_key(), _df(3))
+
+    assert DiskResultCache(path, 10 ** 7).get(_key(), 60).equals(_df(3))
+
+
+@with_setup(_setup, _teardown)
+def test_disabled_cache_stores_nothing():
+    cache = DiskResultCache(path, 0)
+
+    cache.put(_key(), _df(3))
+
+    assert not cache.enabled
+    assert_equals([], os.listdir(path))
+
+
+@with_setup(_setup, _teardown)
+def test_results_with_custom_index_are_not_stored():
+    cache = DiskResultCache(path, 10 ** 7)
+
+    cache.put(_key(), _df(3).set_index("a"))
+
+    assert cache.get(_key(), 60) is None
+
+
+@with_setup(_setup, _teardown)
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = DiskResultCache(path, 10 ** 7)
+    cache.put(_key("a"), _df(10000))
+    # Leave room for meta files of slightly different sizes.
+    max_bytes = cache.size_bytes() * 2 + 100
+    cache.max_bytes = max_bytes
+    cache.put(_key("b"), _df(10000))
+    os.utime(cache._entry_path(_key("a")) + "/meta.json", (1, 1))
+    os.utime(cache._entry_path(_key("b")) + "/meta.json", (2, 2))
+    cache.get(_key("a"), 60)
+
+    cache.put(_key("c"), _df(10000))
+
+    assert cache.get(_key("a"), 60) is not None
+    assert cache.get(_key("b"), 60) is None
+    assert cache.get(_key("c"), 60) is not None
+    assert cache.size_bytes() <= max_bytes
+
+
+@with_setup(_setup, _teardown)
+def test_clear():
+    cache = DiskResultCache(path, 10 ** 7)
+    cache.put(_key(), _df(3))
+
+    cache.clear()
+
+    assert cache.get(_key(), 60) is None
+    assert_equals(0, cache.size_bytes())
+
+
+@with_setup(_setup, _teardown)
+def test_clear_removes_leftover_temporary_directories():
+    cache = DiskResultCache(path, 10 ** 7)
+    os.makedirs(os.path.join(path, "entry.1234.tmp"))
+
+    cache.clear()
+
+    assert_equals([], os.listdir(path))
+
+
+@with_setup(_setup, _teardown)
+def test_concurrent_puts_use_their_own_temporary_directories():
+    cache = DiskResultCache(path, 10 ** 7)
+    temp_paths = []
+    save_dataframe = DiskResultCache._save_dataframe
+
+    def save(temp_path, df):
+        temp_paths.append(temp_path)
+        return save_dataframe(temp_path, df)
+
+    with patch.object(DiskResultCache, "_save_dataframe", side_effect=save):
+        cache.put(_key(), _df(3))
+        cache.put(_key(), _df(3))
+
+    assert temp_paths[0] != temp_paths[1]
+    assert_equals(3, len(cache.get(_key(), 60)))
+
+
+@with_setup(_setup, _teardown)
+def test_corrupted_entry_is_a_miss():
+    cache = DiskResultCache(path, 10 ** 7)
+    cache.put(_key(), _df(3))
+    with open(os.path.join(cache._entry_path(_key()), "meta.json"), "w") as f:
+        f.write("{")
+
+    assert cache.get(_key(), 60) is None
+
+
+def _is_memory_mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+@with_setup(_setup, _teardown)
+def test_columns_are_memory_mapped():
+    cache = DiskResultCache(path, 10 ** 7)
+    # Columns of the same type would be copied together into one block if the DataFrame were consolidated.
+    cache.put(_key(), pd.DataFrame({"a": [1, 2, 3], "b": [4, 5, 6], "c": [0.5, 1.5, 2.5], "d": ["x", "y", "z"]},
+                                   columns=["a", "b", "c", "d"]))
+
+    result = cache.get(_key(), 60)
+
+    for column in result.columns:
+        # Only numpy columns of fixed size values are memory mapped. Strings are object columns, or string arrays
+        # without a numpy base in newer pandas.
+        dtype = result[column].dtype
+        if isinstance(dtype, np.dtype) and dtype != np.object_:
+            assert _is_memory_mapped(result[column].values), column
@@ -0,0 +1,24 @@
+from nose.tools import raises, assert_equals
+
+from remotespark.livyclientlib.exponentialpollingschedule import ExponentialPollingSchedule
+
+
+def test_seconds_to_sleep_grows_up_to_max():
+    schedule = ExponentialPollingSchedule(0.5, 2, 3)
+
+    assert_equals([0.5, 1, 2, 3, 3], [schedule.seconds_to_sleep() for _ in range(5)])
+
+
+def test_reset_starts_over():
+    schedule = ExponentialPollingSchedule(0.5, 2, 3)
+    schedule.seconds_to_sleep()
+    schedule.seconds_to_sleep()
+
+    schedule.reset()
+
+    assert_equals(0.5, schedule.seconds_to_sleep())
+
+
+@raises(AssertionError)
+def test_max_below_initial_throws():
+    ExponentialPollingSchedule(2, 2, 1)
@@ -1,4 +1,7 @@
 ﻿from mock import MagicMock, PropertyMock
+from nose.tools import assert_equals
+
+import remotespark.utils.configuration as conf
 
 from remotespark.livyclientlib.livyclient import LivyClient
 from remotespark.livyclientlib.livysessionstate import LivySessionState
@@ -12,11 +15,12 @@ def test_doesnt_create_sql_context_automatically():
     assert not mock_spark_session.create_sql_context.called
 
 
-def test_start_creates_sql_context():
+def test_start_creates_sql_context_only():
     mock_spark_session = MagicMock()
     client = LivyClient(mock_spark_session)
     client.start()
     mock_spark_session.create_sql_context.assert_called_with()
+    assert not mock_spark_session.create_hive_context.called
 
 
 def test_execute_code():
@@ -27,11 +31,44 @@ def test_execute_code():
 
     client.execute(command)
 
-    mock_spark_session.create_sql_context.assert_called_with()
-    mock_spark_session.wait_for_idle.assert_called_with(3600)
+    mock_spark_session.create_sql_context.assert_called_once_with()
+    assert not mock_spark_session.create_hive_context.called
+    mock_spark_session.wait_for_idle.assert_called_with(3600, client._show_wait_progress)
     mock_spark_session.execute.assert_called_with(command)
 
 
+def test_execute_code_that_uses_hive_context_creates_it():
+    mock_spark_session = MagicMock()
+    client = LivyClient(mock_spark_session)
+
+    client.execute("df = hiveContext.table('t')\nsqlContext.registerDataFrameAsTable(df, 't2')")
+
+    mock_spark_session.create_hive_context.assert_called_once_with()
+    assert not mock_spark_session.create_sql_context.called
+
+
+def test_submit_creates_hive_context_only_when_used():
+    mock_spark_session = MagicMock()
+    client = LivyClient(mock_spark_session)
+
+    client.submit("sqlContext.sql('select 1').collect()")
+    assert not mock_spark_session.create_hive_context.called
+
+    client.submit("hiveContext.sql('select 1').collect()")
+    mock_spark_session.create_hive_context.assert_called_once_with()
+
+
+def test_submit_does_not_wait_for_idle():
+    mock_spark_session = MagicMock()
+    client = LivyClient(mock_spark_session)
+
+    future = client.submit("command")
+
+    mock_spark_session.submit.assert_called_once_with("command")
+    assert future is mock_spark_session.submit.return_value
+    assert not mock_spark_session.wait_for_idle.called
+
+
 def test_execute_sql():
     mock_spark_session = MagicMock()
     client = LivyClient(mock_spark_session)
@@ -41,7 +78,8 @@ def test_execute_sql():
     client.execute_sql(command)
 
     mock_spark_session.create_sql_context.assert_called_with()
-    mock_spark_session.wait_for_idle.assert_called_with(3600)
+    assert not mock_spark_session.create_hive_context.called
+    mock_spark_session.wait_for_idle.assert_called_with(3600, client._show_wait_progress)
     mock_spark_session.execute.assert_called_with("sqlContext.sql(\"{}\").collect()".format(command))
 
 
@@ -53,11 +91,38 @@ def test_execute_hive():
 
     client.execute_hive(command)
 
-    mock_spark_session.create_sql_context.assert_called_with()
-    mock_spark_session.wait_for_idle.assert_called_with(3600)
+    mock_spark_session.create_hive_context.assert_called_with()
+    mock_spark_session.wait_for_idle.assert_called_with(3600, client._show_wait_progress)
     mock_spark_session.execute.assert_called_with("hiveContext.sql(\"{}\").collect()".format(command))
 
 
+def test_execute_shows_wait_progress_once_per_status():
+    mock_spark_session = MagicMock()
+    mock_spark_session.id = "0"
+
+    def wait_for_idle(seconds_to_wait, status_callback):
+        status_callback("busy", 0.5)
+        status_callback("busy", 1.5)
+        status_callback("starting", 3)
+
+    mock_spark_session.wait_for_idle.side_effect = wait_for_idle
+    client = LivyClient(mock_spark_session)
+
+    client.execute("command")
+
+    assert mock_spark_session.ipython_display.writeln.call_count == 2
+
+
+def test_execute_without_progress():
+    mock_spark_session = MagicMock()
+    client = LivyClient(mock_spark_session)
+
+    client.execute("command", show_progress=False)
+
+    mock_spark_session.wait_for_idle.assert_called_with(3600, None)
+    mock_spark_session.execute.assert_called_with("command")
+
+
 def test_serialize():
     url = "url"
     username = "username"
@@ -80,8 +145,9 @@ def test_serialize():
     assert serialized["id"] == "-1"
     assert serialized["kind"] == kind
     assert serialized["sqlcontext"] == sql_created
+    assert serialized["hivecontext"] == sql_created
     assert serialized["version"] == "0.0.0"
-    assert len(serialized.keys()) == 5
+    assert len(serialized.keys()) == 6
 
 
 def test_close_session():
@@ -132,6 +198,28 @@ def test_get_logs_returns_session_logs():
     assert logs_r == logs
 
 
+def test_follow_logs():
+    mock_spark_session = MagicMock()
+    mock_spark_session.follow_logs.return_value = True
+    client = LivyClient(mock_spark_session)
+    line_callback = MagicMock()
+
+    client.follow_logs(line_callback)
+
+    mock_spark_session.follow_logs.assert_called_once_with(line_callback, conf.follow_logs_timeout_seconds())
+    assert_equals(0, mock_spark_session.ipython_display.writeln.call_count)
+
+
+def test_follow_logs_says_when_it_stops_before_session_is_idle():
+    mock_spark_session = MagicMock()
+    mock_spark_session.follow_logs.return_value = False
+    client = LivyClient(mock_spark_session)
+
+    client.follow_logs(MagicMock())
+
+    assert "Stopped following the logs" in mock_spark_session.ipython_display.writeln.call_args[0][0]
+
+
 def test_get_logs_returns_false_with_value_error():
     err = "err"
     mock_spark_session = MagicMock()
@@ -142,3 +230,12 @@ def test_get_logs_returns_false_with_value_error():
 
     assert not res
     assert logs_r == err
+
+
+def test_endpoint():
+    mock_spark_session = MagicMock()
+    connection_string = get_connection_string("http://url.com", "user", "pass")
+    mock_spark_session.get_state.return_value = LivySessionState("0", connection_string, "pyspark", False)
+    client = LivyClient(mock_spark_session)
+
+    assert client.endpoint == "http://url.com"
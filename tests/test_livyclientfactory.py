@@ -68,3 +68,16 @@ def test_build_spark():
     factory = LivyClientFactory()
     client = factory.build_client(session)
     assert isinstance(client, PandasScalaLivyClient)
+
+
+def test_http_clients_share_http_session_per_connection_string():
+    connection_string = get_connection_string("url", "user", "pass")
+    other_connection_string = get_connection_string("other_url", "user", "pass")
+
+    client_a = LivyClientFactory.create_http_client(connection_string)
+    client_b = LivyClientFactory.create_http_client(connection_string)
+    client_c = LivyClientFactory.create_http_client(other_connection_string)
+
+    assert client_a is not client_b
+    assert client_a.http_session is client_b.http_session
+    assert client_a.http_session is not client_c.http_session
@@ -1,10 +1,11 @@
 ﻿import json
 
-from mock import MagicMock, call
-from nose.tools import raises, assert_equals
+from mock import MagicMock, call, patch
+from nose.tools import raises, assert_equals, assert_raises
 
 from remotespark.utils.ipythondisplay import IpythonDisplay
 from remotespark.livyclientlib.livyclienttimeouterror import LivyClientTimeoutError
+from remotespark.livyclientlib.livystatementcancellederror import LivyStatementCancelledError
 from remotespark.livyclientlib.livyunexpectedstatuserror import LivyUnexpectedStatusError
 from remotespark.livyclientlib.livysession import LivySession
 import remotespark.utils.configuration as conf
@@ -38,6 +39,10 @@ class TestLivySession:
         self.running_statement_json = '{"total_statements":1,"statements":[{"id":0,"state":"running","output":null}]}'
         self.ready_statement_json = '{"total_statements":1,"statements":[{"id":0,"state":"available","output":{"statu' \
                                     's":"ok","execution_count":0,"data":{"text/plain":"Pi is roughly 3.14336"}}}]}'
+        self.running_single_statement_json = '{"id":0,"state":"running","output":null}'
+        self.ready_single_statement_json = '{"id":0,"state":"available","output":{"status":"ok","execution_count"' \
+                                           ':0,"data":{"text/plain":"Pi is roughly 3.14336"}}}'
+        self.cancelled_single_statement_json = '{"id":0,"state":"cancelled","output":null}'
         self.log_json = '{"id":6,"from":0,"total":212,"log":["hi","hi"]}'
 
         self.get_responses = []
@@ -101,6 +106,78 @@ class TestLivySession:
         self._create_session(sql_created=True)
         conf.load()
 
+    @raises(ValueError)
+    def test_constructor_throws_unknown_polling_schedule(self):
+        conf.override_all({
+            "polling_schedule": "random"
+        })
+        try:
+            self._create_session()
+        finally:
+            conf.load()
+
+    def test_constant_polling_schedule_uses_sleep_seconds(self):
+        conf.override_all({
+            "polling_schedule": "constant",
+            "status_sleep_seconds": 3,
+            "statement_sleep_seconds": 4
+        })
+        session = self._create_session()
+        conf.load()
+
+        assert_equals(3, session._create_polling_schedule(session._status_sleep_seconds).seconds_to_sleep())
+        assert_equals(4, session._create_polling_schedule(session._statement_sleep_seconds).seconds_to_sleep())
+
+    def test_exponential_polling_schedule_warns_about_sleep_seconds(self):
+        conf.override_all({
+            "polling_schedule": "exponential",
+            "status_sleep_seconds": 3
+        })
+        try:
+            with patch("remotespark.livyclientlib.livysession.Log") as log:
+                self._create_session()
+        finally:
+            conf.load()
+
+        assert_equals(1, log.return_value.warning.call_count)
+        assert "status_sleep_seconds" in log.return_value.warning.call_args[0][0]
+
+    def test_constant_polling_schedule_does_not_warn_about_sleep_seconds(self):
+        conf.override_all({
+            "polling_schedule": "constant",
+            "status_sleep_seconds": 3,
+            "statement_sleep_seconds": 4
+        })
+        try:
+            with patch("remotespark.livyclientlib.livysession.Log") as log:
+                self._create_session()
+        finally:
+            conf.load()
+
+        assert not log.return_value.warning.called
+
+    def test_wait_for_idle_resets_polling_schedule_on_status_change(self):
+        http_client = MagicMock()
+        http_client.post.return_value = DummyResponse(201, self.session_create_json)
+        self.get_responses = [DummyResponse(200, self.session_create_json),
+                              DummyResponse(200, self.busy_sessions_json),
+                              DummyResponse(200, self.busy_sessions_json),
+                              DummyResponse(200, self.ready_sessions_json)]
+        http_client.get.side_effect = self._next_response_get
+        polling_schedule = MagicMock()
+        polling_schedule.seconds_to_sleep.return_value = 0.01
+
+        conf.override_all({})
+        session = self._create_session(http_client=http_client)
+        session._create_polling_schedule = MagicMock(return_value=polling_schedule)
+        conf.load()
+        session.start()
+
+        session.wait_for_idle(30)
+
+        assert_equals(3, polling_schedule.seconds_to_sleep.call_count)
+        assert_equals(2, polling_schedule.reset.call_count)
+
     def test_constructor_starts_with_existing_session(self):
         conf.override_all({
             "status_sleep_seconds": 4,
@@ -250,7 +327,88 @@ class TestLivySession:
         logs = session.logs
 
         assert_equals("hi\nhi", logs)
-        http_client.get.assert_called_with("/sessions/0/log?from=0", [200])
+        http_client.get.assert_called_with("/sessions/0/log?from=0&size=1000", [200])
+
+    def test_logs_only_fetches_new_lines(self):
+        http_client = MagicMock()
+        http_client.post.return_value = DummyResponse(201, self.session_create_json)
+        self.get_responses = [DummyResponse(200, '{"id":0,"from":0,"total":3,"log":["a","b","c"]}'),
+                              DummyResponse(200, '{"id":0,"from":0,"total":3,"log":["d"]}'),
+                              DummyResponse(200, '{"id":0,"from":0,"total":4,"log":[]}')]
+        http_client.get.side_effect = self._next_response_get
+        conf.override_all({
+            "log_lines_per_request": 3,
+            "max_log_lines": 3
+        })
+        session = self._create_session(http_client=http_client)
+        conf.load()
+        session.start()
+
+        logs = session.logs
+
+        assert_equals("b\nc\nd", logs)
+        assert_equals([call("/sessions/0/log?from=0&size=3", [200]), call("/sessions/0/log?from=3&size=3", [200])],
+                      http_client.get.call_args_list)
+
+        logs = session.logs
+
+        assert_equals("b\nc\nd", logs)
+        http_client.get.assert_called_with("/sessions/0/log?from=4&size=3", [200])
+
+    def test_logs_start_over_when_log_is_truncated(self):
+        http_client = MagicMock()
+        http_client.post.return_value = DummyResponse(201, self.session_create_json)
+        self.get_responses = [DummyResponse(200, '{"id":0,"from":0,"total":2,"log":["a","b"]}'),
+                              DummyResponse(200, '{"id":0,"from":0,"total":1,"log":[]}'),
+                              DummyResponse(200, '{"id":0,"from":0,"total":1,"log":["c"]}')]
+        http_client.get.side_effect = self._next_response_get
+        session = self._create_session(http_client=http_client)
+        session.start()
+        assert_equals("a\nb", session.logs)
+
+        logs = session.logs
+
+        assert_equals("c", logs)
+        http_client.get.assert_called_with("/sessions/0/log?from=0&size=1000", [200])
+
+    def test_follow_logs_until_idle(self):
+        http_client = MagicMock()
+        http_client.post.return_value = DummyResponse(201, self.session_create_json)
+        self.get_responses = [DummyResponse(200, self.busy_sessions_json),
+                              DummyResponse(200, '{"id":0,"from":0,"total":1,"log":["a"]}'),
+                              DummyResponse(200, self.busy_sessions_json),
+                              DummyResponse(200, '{"id":0,"from":1,"total":1,"log":[]}'),
+                              DummyResponse(200, self.ready_sessions_json),
+                              DummyResponse(200, '{"id":0,"from":1,"total":2,"log":["b"]}')]
+        http_client.get.side_effect = self._next_response_get
+        conf.override_all({
+            "status_sleep_seconds": 0.01,
+            "polling_schedule": "constant"
+        })
+        session = self._create_session(http_client=http_client)
+        conf.load()
+        session.start()
+        line_callback = MagicMock()
+
+        assert session.follow_logs(line_callback, 60)
+
+        assert_equals([call("a"), call("b")], line_callback.call_args_list)
+        assert_equals(0, len(self.get_responses))
+
+    def test_follow_logs_stops_after_timeout(self):
+        http_client = MagicMock()
+        http_client.post.return_value = DummyResponse(201, self.session_create_json)
+        self.get_responses = [DummyResponse(200, self.busy_sessions_json),
+                              DummyResponse(200, '{"id":0,"from":0,"total":1,"log":["a"]}')]
+        http_client.get.side_effect = self._next_response_get
+        session = self._create_session(http_client=http_client)
+        session.start()
+        line_callback = MagicMock()
+
+        assert not session.follow_logs(line_callback, 0)
+
+        assert_equals([call("a")], line_callback.call_args_list)
+        assert_equals(0, len(self.get_responses))
 
     def test_wait_for_idle_returns_when_in_state(self):
         http_client = MagicMock()
@@ -273,6 +431,50 @@ class TestLivySession:
         http_client.get.assert_called_with("/sessions/0", [200])
         assert_equals(2, http_client.get.call_count)
 
+    def test_wait_for_idle_calls_status_callback_while_waiting(self):
+        http_client = MagicMock()
+        http_client.post.return_value = DummyResponse(201, self.session_create_json)
+        self.get_responses = [DummyResponse(200, self.busy_sessions_json),
+                              DummyResponse(200, self.busy_sessions_json),
+                              DummyResponse(200, self.ready_sessions_json)]
+        http_client.get.side_effect = self._next_response_get
+        status_callback = MagicMock()
+
+        conf.override_all({
+            "polling_schedule": "constant",
+            "status_sleep_seconds": 0.01,
+            "statement_sleep_seconds": 0.01
+        })
+        session = self._create_session(http_client=http_client)
+        conf.load()
+
+        session.start()
+
+        session.wait_for_idle(30, status_callback)
+
+        assert_equals(2, status_callback.call_count)
+        assert_equals("busy", status_callback.call_args[0][0])
+        assert status_callback.call_args[0][1] > 0
+
+    def test_wait_for_idle_does_not_recurse(self):
+        http_client = MagicMock()
+        http_client.post.return_value = DummyResponse(201, self.session_create_json)
+        self.get_responses = [DummyResponse(200, self.busy_sessions_json)] * 3000 + \
+                             [DummyResponse(200, self.ready_sessions_json)]
+        http_client.get.side_effect = self._next_response_get
+
+        conf.override_all({})
+        session = self._create_session(http_client=http_client)
+        conf.load()
+        session._create_polling_schedule = MagicMock()
+        session._create_polling_schedule.return_value.seconds_to_sleep.return_value = 0
+
+        session.start()
+
+        session.wait_for_idle(30)
+
+        assert_equals(3001, http_client.get.call_count)
+
     @raises(LivyUnexpectedStatusError)
     def test_wait_for_idle_throws_when_in_final_status(self):
         http_client = MagicMock()
@@ -365,8 +567,8 @@ class TestLivySession:
         self.post_responses = [DummyResponse(201, self.session_create_json),
                                DummyResponse(201, self.post_statement_json)]
         http_client.post.side_effect = self._next_response_post
-        self.get_responses = [DummyResponse(200, self.running_statement_json),
-                              DummyResponse(200, self.ready_statement_json)]
+        self.get_responses = [DummyResponse(200, self.running_single_statement_json),
+                              DummyResponse(200, self.ready_single_statement_json)]
         http_client.get.side_effect = self._next_response_get
         conf.override_all({
             "status_sleep_seconds": 0.01,
@@ -380,25 +582,134 @@ class TestLivySession:
         result = session.execute(command)
 
         http_client.post.assert_called_with("/sessions/0/statements", [201], {"code": command})
-        http_client.get.assert_called_with("/sessions/0/statements", [200])
+        http_client.get.assert_called_with("/sessions/0/statements/0", [200, 404])
         assert_equals(2, http_client.get.call_count)
         assert result[0]
         assert_equals(self.pi_result, result[1])
 
-    def test_create_sql_hive_context_happens_once(self):
+    def test_execute_falls_back_to_all_statements(self):
+        kind = Constants.session_kind_spark
+        http_client = MagicMock()
+        self.post_responses = [DummyResponse(201, self.session_create_json),
+                               DummyResponse(201, self.post_statement_json)]
+        http_client.post.side_effect = self._next_response_post
+        self.get_responses = [DummyResponse(404, '"Not found"'),
+                              DummyResponse(200, self.running_statement_json),
+                              DummyResponse(200, self.ready_statement_json)]
+        http_client.get.side_effect = self._next_response_get
+        conf.override_all({
+            "status_sleep_seconds": 0.01,
+            "statement_sleep_seconds": 0.01
+        })
+        session = self._create_session(kind=kind, http_client=http_client)
+        conf.load()
+        session.start()
+
+        result = session.execute("command")
+
+        assert_equals([call("/sessions/0/statements/0", [200, 404]),
+                       call("/sessions/0/statements", [200]),
+                       call("/sessions/0/statements", [200])], http_client.get.call_args_list)
+        assert result[0]
+        assert_equals(self.pi_result, result[1])
+
+    def test_missing_statement_does_not_disable_single_statement_endpoint(self):
+        http_client = MagicMock()
+        http_client.get.side_effect = [DummyResponse(404, '"Not found"'),
+                                       DummyResponse(200, '{"total_statements":0,"statements":[]}')]
+        session = self._create_session(http_client=http_client)
+
+        assert_raises(ValueError, session._get_statement, 0)
+        assert session._single_statement_endpoint_supported
+
+    def test_submit_returns_future_with_output(self):
+        kind = Constants.session_kind_spark
+        http_client = MagicMock()
+        self.post_responses = [DummyResponse(201, self.session_create_json),
+                               DummyResponse(201, self.post_statement_json)]
+        http_client.post.side_effect = self._next_response_post
+        self.get_responses = [DummyResponse(200, self.running_single_statement_json),
+                              DummyResponse(200, self.ready_single_statement_json)]
+        http_client.get.side_effect = self._next_response_get
+        conf.override_all({
+            "polling_schedule": "constant",
+            "status_sleep_seconds": 0.01,
+            "statement_sleep_seconds": 0.01
+        })
+        session = self._create_session(kind=kind, http_client=http_client)
+        conf.load()
+        session.start()
+
+        future = session.submit("command")
+        result = future.result(5)
+
+        http_client.post.assert_called_with("/sessions/0/statements", [201], {"code": "command"})
+        assert future.done()
+        assert result[0]
+        assert_equals(self.pi_result, result[1])
+
+    def test_cancel_statement(self):
+        http_client = MagicMock()
+        http_client.post.return_value = DummyResponse(201, self.session_create_json)
+        session = self._create_session(http_client=http_client)
+        session.start()
+
+        assert session.cancel_statement(2)
+
+        http_client.post.assert_called_with("/sessions/0/statements/2/cancel", [200, 404], {})
+
+    def test_cancel_statement_returns_false_when_livy_refuses(self):
+        http_client = MagicMock()
+        http_client.post.return_value = DummyResponse(201, self.session_create_json)
+        session = self._create_session(http_client=http_client)
+        session.start()
+        http_client.post.return_value = DummyResponse(404, "")
+
+        assert not session.cancel_statement(2)
+
+    @raises(LivyStatementCancelledError)
+    def test_execute_raises_when_statement_is_cancelled(self):
+        http_client = MagicMock()
+        self.post_responses = [DummyResponse(201, self.session_create_json),
+                               DummyResponse(201, self.post_statement_json)]
+        http_client.post.side_effect = self._next_response_post
+        self.get_responses = [DummyResponse(200, self.running_single_statement_json),
+                              DummyResponse(200, '{"id":0,"state":"cancelling","output":null}'),
+                              DummyResponse(200, self.cancelled_single_statement_json)]
+        http_client.get.side_effect = self._next_response_get
+        conf.override_all({
+            "status_sleep_seconds": 0.01,
+            "statement_sleep_seconds": 0.01
+        })
+        session = self._create_session(http_client=http_client)
+        conf.load()
+        session.start()
+
+        session.execute("command")
+
+    def test_get_statement_result(self):
+        http_client = MagicMock()
+        http_client.post.return_value = DummyResponse(201, self.session_create_json)
+        self.get_responses = [DummyResponse(200, self.running_single_statement_json),
+                              DummyResponse(200, self.ready_single_statement_json)]
+        http_client.get.side_effect = self._next_response_get
+        session = self._create_session(http_client=http_client)
+        session.start()
+
+        assert_equals(("running", None), session.get_statement_result(0))
+        assert_equals(("available", (True, self.pi_result)), session.get_statement_result(0))
+
+    def test_create_sql_context_happens_once(self):
         kind = Constants.session_kind_spark
         http_client = MagicMock()
         ipython_display = MagicMock()
 
         self.post_responses = [DummyResponse(201, self.session_create_json),
-                               DummyResponse(201, self.post_statement_json),
                                DummyResponse(201, self.post_statement_json)]
         http_client.post.side_effect = self._next_response_post
         self.get_responses = [DummyResponse(200, self.ready_sessions_json),
-                              DummyResponse(200, self.running_statement_json),
-                              DummyResponse(200, self.ready_statement_json),
-                              DummyResponse(200, self.ready_sessions_json),
-                              DummyResponse(200, self.ready_statement_json)]
+                              DummyResponse(200, self.running_single_statement_json),
+                              DummyResponse(200, self.ready_single_statement_json)]
         http_client.get.side_effect = self._next_response_get
         conf.override_all({
             "status_sleep_seconds": 0.01,
@@ -413,7 +724,9 @@ class TestLivySession:
         http_client.reset_mock()
 
         session.create_sql_context()
-        assert ipython_display.writeln.call_count == 3
+        assert ipython_display.writeln.call_count == 2
+        assert session.started_sql_context
+        assert not session.started_hive_context
 
         # Second call should not issue a post request
         session.create_sql_context()
@@ -421,22 +734,49 @@ class TestLivySession:
         assert call("/sessions/0/statements", [201], {"code": "val sqlContext = new org.apache.spark.sql.SQLContext"
                                                               "(sc)\nimport sqlContext.implicits._"}) \
                in http_client.post.call_args_list
+        assert len(http_client.post.call_args_list) == 1
+
+    def test_create_hive_context_happens_once(self):
+        kind = Constants.session_kind_spark
+        http_client = MagicMock()
+        ipython_display = MagicMock()
+
+        self.post_responses = [DummyResponse(201, self.session_create_json),
+                               DummyResponse(201, self.post_statement_json)]
+        http_client.post.side_effect = self._next_response_post
+        self.get_responses = [DummyResponse(200, self.ready_sessions_json),
+                              DummyResponse(200, self.ready_single_statement_json)]
+        http_client.get.side_effect = self._next_response_get
+        conf.override_all({
+            "status_sleep_seconds": 0.01,
+            "statement_sleep_seconds": 0.01
+        })
+        session = self._create_session(kind=kind, http_client=http_client)
+        session.ipython_display = ipython_display
+        conf.load()
+        session.start()
+
+        # Reset the mock so that post called count is accurate
+        http_client.reset_mock()
+
+        session.create_hive_context()
+        session.create_hive_context()
+
+        assert session.started_hive_context
+        assert not session.started_sql_context
         assert call("/sessions/0/statements", [201], {"code": "val hiveContext = new org.apache.spark.sql.hive.Hive"
                                                               "Context(sc)"}) in http_client.post.call_args_list
-        assert len(http_client.post.call_args_list) == 2
+        assert len(http_client.post.call_args_list) == 1
 
     def test_create_sql_context_spark(self):
         kind = Constants.session_kind_spark
         http_client = MagicMock()
         self.post_responses = [DummyResponse(201, self.session_create_json),
-                               DummyResponse(201, self.post_statement_json),
                                DummyResponse(201, self.post_statement_json)]
         http_client.post.side_effect = self._next_response_post
         self.get_responses = [DummyResponse(200, self.ready_sessions_json),
-                              DummyResponse(200, self.running_statement_json),
-                              DummyResponse(200, self.ready_statement_json),
-                              DummyResponse(200, self.ready_sessions_json),
-                              DummyResponse(200, self.ready_statement_json)]
+                              DummyResponse(200, self.running_single_statement_json),
+                              DummyResponse(200, self.ready_single_statement_json)]
         http_client.get.side_effect = self._next_response_get
         conf.override_all({
             "status_sleep_seconds": 0.01,
@@ -452,7 +792,7 @@ class TestLivySession:
                                                               "(sc)\nimport sqlContext.implicits._"}) \
                in http_client.post.call_args_list
         assert call("/sessions/0/statements", [201], {"code": "val hiveContext = new org.apache.spark.sql.hive.Hive"
-                                                              "Context(sc)"}) in http_client.post.call_args_list
+                                                              "Context(sc)"}) not in http_client.post.call_args_list
 
     def test_create_sql_hive_context_pyspark(self):
         kind = Constants.session_kind_pyspark
@@ -462,10 +802,10 @@ class TestLivySession:
                                DummyResponse(201, self.post_statement_json)]
         http_client.post.side_effect = self._next_response_post
         self.get_responses = [DummyResponse(200, self.ready_sessions_json),
-                              DummyResponse(200, self.running_statement_json),
-                              DummyResponse(200, self.ready_statement_json),
+                              DummyResponse(200, self.running_single_statement_json),
+                              DummyResponse(200, self.ready_single_statement_json),
                               DummyResponse(200, self.ready_sessions_json),
-                              DummyResponse(200, self.ready_statement_json)]
+                              DummyResponse(200, self.ready_single_statement_json)]
         http_client.get.side_effect = self._next_response_get
         conf.override_all({
             "status_sleep_seconds": 0.01,
@@ -476,6 +816,7 @@ class TestLivySession:
         session.start()
 
         session.create_sql_context()
+        session.create_hive_context()
 
         assert call("/sessions/0/statements", [201], {"code": "from pyspark.sql import SQLContext\nfrom pyspark."
                                                               "sql.types import *\nsqlContext = SQLContext("
@@ -484,6 +825,16 @@ class TestLivySession:
                                                               "hiveContext = HiveContext(sc)"}) \
                in http_client.post.call_args_list
 
+    def test_restored_session_keeps_created_contexts(self):
+        http_client = MagicMock()
+        session = LivySession(MagicMock(), http_client, "0", True, {"kind": Constants.session_kind_spark}, False)
+
+        session.create_sql_context()
+
+        assert session.started_sql_context
+        assert not session.started_hive_context
+        assert not http_client.post.called
+
     @raises(ValueError)
     def test_create_sql_hive_context_unknown_throws(self):
         kind = "unknown"
@@ -492,8 +843,8 @@ class TestLivySession:
                                DummyResponse(201, self.post_statement_json)]
         http_client.post.side_effect = self._next_response_post
         self.get_responses = [DummyResponse(200, self.ready_sessions_json),
-                              DummyResponse(200, self.running_statement_json),
-                              DummyResponse(200, self.ready_statement_json)]
+                              DummyResponse(200, self.running_single_statement_json),
+                              DummyResponse(200, self.ready_single_statement_json)]
         http_client.get.side_effect = self._next_response_get
         conf.override_all({
             "status_sleep_seconds": 0.01,
@@ -526,8 +877,9 @@ class TestLivySession:
         assert serialized["id"] == "-1"
         assert serialized["kind"] == kind
         assert serialized["sqlcontext"] == False
+        assert serialized["hivecontext"] == False
         assert serialized["version"] == "0.0.0"
-        assert len(serialized.keys()) == 5
+        assert len(serialized.keys()) == 6
 
     def test_get_sql_context_creation_command_all_langs(self):
         for kind in Constants.session_kinds_supported:
@@ -1,8 +1,16 @@
+import base64
+import json
+import zlib
 from mock import MagicMock
-from nose.tools import with_setup
+from nose.tools import with_setup, raises
+
+import remotespark.utils.configuration as conf
+from remotespark.utils.constants import Constants
+from remotespark.utils.dataframemetadata import is_schema_typed
 
 from remotespark.livyclientlib.pandaslivyclientbase import PandasLivyClientBase
 from remotespark.livyclientlib.dataframeparseexception import DataFrameParseException
+from remotespark.livyclientlib.sqlsampling import SqlSampling
 
 import pandas as pd
 from pandas.util.testing import assert_frame_equal
@@ -19,100 +27,360 @@ def _setup():
     client = PandasLivyClientBase(mock_spark_session, 10)
 
 def _teardown():
-    pass
+    conf.load()
+
+
+schema_json = '{"type":"struct","fields":[{"name":"b","type":"long"}]}'
+chunked_schema = Constants.chunked_schema_prefix + schema_json
+
+
+def _compress(schema_fields, rows_text):
+    schema = json.dumps({"type": "struct", "fields": [{"name": name, "type": spark_type, "nullable": True,
+                                                       "metadata": {}} for (name, spark_type) in schema_fields]})
+    zipper = zlib.compressobj(6, zlib.DEFLATED, 31)
+    data = zipper.compress((schema + "\n" + rows_text).encode("utf-8")) + zipper.flush()
+    return base64.b64encode(data).decode("ascii")
 
 @with_setup(_setup, _teardown)
 def test_execute_sql():
-    records = (True, "records")
-    no_records = False
-    result_columns = pd.DataFrame([{'a': 1}])
+    records = (True, schema_json + "\nrecords")
     result_data = pd.DataFrame([{'b': 2}])
 
     client.get_records = MagicMock(return_value=records)
-    client.no_records = MagicMock(return_value=no_records)
-    client.get_columns_dataframe = MagicMock(return_value=result_columns)
     client.get_data_dataframe = MagicMock(return_value=result_data)
+    client.apply_schema = MagicMock(side_effect=lambda df, fields: df)
 
-    result = client.execute_sql(records)
+    result = client.execute_sql("command")
+    client.get_data_dataframe.assert_called_once_with("records")
+    assert client.apply_schema.call_args[0][1] == [{"name": "b", "type": "long"}]
     assert_frame_equal(result, result_data)
 
 @with_setup(_setup, _teardown)
 def test_execute_sql_no_results():
-    records = (True, "records")
-    no_records = True
-    result_columns = pd.DataFrame([{'z':26}])
-    result_data = pd.DataFrame([{'y':25}])
+    records = (True, schema_json)
 
     client.get_records = MagicMock(return_value=records)
-    client.no_records = MagicMock(return_value=no_records)
-    client.get_columns_dataframe = MagicMock(return_value=result_columns)
-    client.get_data_dataframe = MagicMock(return_value=result_data)
-    client.make_context_columns = MagicMock()
+    client.get_data_dataframe = MagicMock()
+    client.apply_schema = MagicMock(side_effect=lambda df, fields: df)
 
-    result = client.execute_sql(records)
-    assert_frame_equal(result, result_columns)
+    result = client.execute_sql("command")
+    assert not client.get_data_dataframe.called
+    mock_spark_session.execute.assert_not_called()
+    assert_frame_equal(result, pd.DataFrame.from_records([], columns=["b"]))
 
 @with_setup(_setup, _teardown)
 def test_execute_sql_some_exception():
-    records = (True, "records")
-    no_records = False
-    result_columns = pd.DataFrame([{'Ricky':22}])
+    records = (True, schema_json + "\nrecords")
 
     client.get_records = MagicMock(return_value=records)
-    client.no_records = MagicMock(return_value=no_records)
-    client.get_columns_dataframe = MagicMock(return_value=result_columns)
     client.get_data_dataframe = MagicMock(side_effect=DataFrameParseException)
 
     try:
-        result = client.execute_sql(records)
+        result = client.execute_sql("command")
         assert False
     except DataFrameParseException as e:
         pass
 
 @with_setup(_setup, _teardown)
 def test_execute_hive():
-    records = (True, "records")
-    no_records = False
-    result_columns = pd.DataFrame([{'g': -1}])
+    records = (True, schema_json + "\nrecords")
     result_data = pd.DataFrame([{'k': -2}])
 
     client.get_records = MagicMock(return_value=records)
-    client.no_records = MagicMock(return_value=no_records)
-    client.get_columns_dataframe = MagicMock(return_value=result_columns)
     client.get_data_dataframe = MagicMock(return_value=result_data)
+    client.apply_schema = MagicMock(side_effect=lambda df, fields: df)
 
-    result = client.execute_hive(records)
+    result = client.execute_hive("command")
+    client.get_records.assert_called_once_with("hiveContext", "command", "10", SqlSampling())
     assert_frame_equal(result, result_data)
 
 @with_setup(_setup, _teardown)
 def test_execute_hive_no_results():
-    records = (True, "records")
-    no_records = True
-    result_columns = pd.DataFrame([{'abc': 123}])
-    result_data = pd.DataFrame([{'xyz': 890}])
+    records = (True, schema_json)
 
     client.get_records = MagicMock(return_value=records)
-    client.no_records = MagicMock(return_value=no_records)
-    client.get_columns_dataframe = MagicMock(return_value=result_columns)
-    client.get_data_dataframe = MagicMock(return_value=result_data)
-    client.make_context_columns = MagicMock()
+    client.get_data_dataframe = MagicMock()
 
-    result = client.execute_hive(records)
-    assert_frame_equal(result, result_columns)
+    result = client.execute_hive("command")
+    assert not client.get_data_dataframe.called
+    assert_frame_equal(result, pd.DataFrame.from_records([], columns=["b"]).astype("int64"))
 
 @with_setup(_setup, _teardown)
 def test_execute_hive_some_exception():
-    records = (True, "records")
-    no_records = False
-    result_columns = pd.DataFrame([{'a': 0}])
+    records = (True, schema_json + "\nrecords")
 
     client.get_records = MagicMock(return_value=records)
-    client.no_records = MagicMock(return_value=no_records)
-    client.get_columns_dataframe = MagicMock(return_value=result_columns)
     client.get_data_dataframe = MagicMock(side_effect=DataFrameParseException)
 
     try:
-        result = client.execute_hive(records)
+        result = client.execute_hive("command")
         assert False
     except DataFrameParseException as e:
         pass
+
+@with_setup(_setup, _teardown)
+def test_get_data_dataframe_matches_row_by_row_decoding():
+    records_text = '{"a":1,"b":"x","c":{"d":[1,2]}}\n{"a":2,"b":"y, z"}\n{"b":"w","e":0.1}'
+
+    result = client.get_data_dataframe(records_text)
+
+    assert_frame_equal(result, client._get_data_dataframe_by_row(records_text))
+    assert list(result["b"]) == ["x", "y, z", "w"]
+
+@with_setup(_setup, _teardown)
+def test_get_data_dataframe_falls_back_to_row_by_row_decoding():
+    client._get_data_dataframe_by_row = MagicMock(return_value=pd.DataFrame([{'a': 1}]))
+
+    client.get_data_dataframe('1,2\n3')
+
+    client._get_data_dataframe_by_row.assert_called_once_with('1,2\n3')
+
+@with_setup(_setup, _teardown)
+def test_get_data_dataframe_throws_when_not_json():
+    try:
+        client.get_data_dataframe('something bad happened')
+        assert False
+    except DataFrameParseException:
+        pass
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_compressed():
+    result_data = pd.DataFrame([{'b': 2}])
+    client.transfer_format = Constants.sql_transfer_format_csv_gzip
+    client.get_compressed_records = MagicMock(return_value=(True, "payload"))
+    client.get_compressed_dataframe = MagicMock(return_value=result_data)
+
+    result = client.execute_sql("command")
+
+    client.get_compressed_records.assert_called_once_with("sqlContext", "command", "10", SqlSampling())
+    client.get_compressed_dataframe.assert_called_once_with("payload")
+    assert_frame_equal(result, result_data)
+
+@with_setup(_setup, _teardown)
+@raises(DataFrameParseException)
+def test_execute_sql_compressed_some_exception():
+    client.transfer_format = Constants.sql_transfer_format_csv_gzip
+    client.get_compressed_records = MagicMock(return_value=(False, "some exception"))
+
+    client.execute_sql("command")
+
+@with_setup(_setup, _teardown)
+def test_get_compressed_dataframe_assigns_types():
+    payload = _compress([("i", "integer"), ("s", "string"), ("d", "decimal(10,2)"), ("t", "date")],
+                        '"1","\'007","1.50","2016-01-02"\n"2",,,')
+
+    result = client.get_compressed_dataframe(payload)
+
+    assert list(result.columns) == ["i", "s", "d", "t"]
+    assert str(result["i"].dtype) == "int64"
+    assert result["s"][0] == "007" and pd.isnull(result["s"][1])
+    assert str(result["d"].dtype) == "float64"
+    assert str(result["t"].dtype) == "datetime64[ns]"
+
+@with_setup(_setup, _teardown)
+def test_get_compressed_dataframe_keeps_strings_that_look_like_nulls():
+    payload = _compress([("s", "string"), ("f", "double")],
+                        '"\'NA","nan"\n"\'null","NaN"\n"\'","1.5"\n"\'None",\n,"inf"')
+
+    result = client.get_compressed_dataframe(payload)
+
+    assert list(result["s"][:4]) == ["NA", "null", "", "None"]
+    assert pd.isnull(result["s"][4])
+    assert pd.isnull(result["f"][0]) and pd.isnull(result["f"][1]) and pd.isnull(result["f"][3])
+    assert result["f"][2] == 1.5 and result["f"][4] == float("inf")
+
+@with_setup(_setup, _teardown)
+def test_get_compressed_dataframe_reads_single_null_row():
+    result = client.get_compressed_dataframe(_compress([("s", "string")], ""))
+
+    assert len(result) == 1 and pd.isnull(result["s"][0])
+
+@with_setup(_setup, _teardown)
+def test_get_compressed_dataframe_keeps_duplicate_column_names():
+    result = client.get_compressed_dataframe(_compress([("a", "long"), ("a", "long")], '"1","2"'))
+
+    assert list(result.columns) == ["a", "a"]
+    assert list(result.iloc[0]) == [1, 2]
+
+@with_setup(_setup, _teardown)
+@raises(DataFrameParseException)
+def test_get_compressed_dataframe_throws_when_not_compressed():
+    client.get_compressed_dataframe("something bad happened")
+
+@raises(ValueError)
+def test_unsupported_transfer_format_throws():
+    conf.override(conf.sql_transfer_format.__name__, "xml")
+    try:
+        PandasLivyClientBase(MagicMock(), 10)
+    finally:
+        conf.load()
+
+@with_setup(_setup, _teardown)
+def test_apply_schema_assigns_types():
+    df = pd.DataFrame([{"i": 1, "n": 1, "f": 2, "b": True, "t": "2016-01-02 10:00:00.0", "s": "x", "u": "1"},
+                       {"i": 2, "f": 2.5, "b": False, "t": "2016-01-03 10:00:00.0", "s": "x", "u": "2"},
+                       {"i": 3, "f": 3, "b": True, "t": None, "s": "x", "u": "3"}])
+    fields = [{"name": "i", "type": "integer"}, {"name": "n", "type": "long"}, {"name": "f", "type": "double"},
+              {"name": "b", "type": "boolean"}, {"name": "t", "type": "timestamp"}, {"name": "s", "type": "string"},
+              {"name": "u", "type": "string"}, {"name": "missing", "type": "string"}]
+
+    result = client.apply_schema(df, fields)
+
+    assert list(result.columns) == ["i", "n", "f", "b", "t", "s", "u", "missing"]
+    assert [str(t) for t in result.dtypes] == ["int64", "float64", "float64", "bool", "datetime64[ns]", "category",
+                                               "object", "object"]
+    assert is_schema_typed(result)
+
+@with_setup(_setup, _teardown)
+def test_apply_schema_does_not_make_categories_when_disabled():
+    client.max_category_ratio = 0
+    df = pd.DataFrame([{"s": "x"}, {"s": "x"}])
+
+    result = client.apply_schema(df, [{"name": "s", "type": "string"}])
+
+    assert str(result["s"].dtype) == "object"
+
+@with_setup(_setup, _teardown)
+@raises(DataFrameParseException)
+def test_execute_sql_throws_when_schema_is_not_json():
+    client.get_records = MagicMock(return_value=(True, "something bad happened"))
+
+    client.execute_sql("command")
+
+def _chunked_responses(*outputs):
+    responses = list(outputs)
+    return lambda code: responses.pop(0)
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_in_chunks():
+    client.chunk_rows = 2
+    client.make_open_chunked_result = MagicMock(return_value="open")
+    client.make_fetch_chunk = MagicMock(side_effect=lambda name, rows: "fetch {}".format(rows))
+    client.make_close_chunked_result = MagicMock(return_value="close")
+    mock_spark_session.execute = MagicMock(side_effect=_chunked_responses(
+        (True, "echo\n" + chunked_schema + "\necho"), (True, '{"b":1}\n{"b":2}'), (True, '{"b":3}'), (True, "")))
+
+    result = client.execute_sql("command", 5)
+
+    assert [c[0][0] for c in mock_spark_session.execute.call_args_list] == ["open", "fetch 2", "fetch 2", "close"]
+    name = client.make_open_chunked_result.call_args[0][0]
+    client.make_open_chunked_result.assert_called_once_with(name, "sqlContext", "command", SqlSampling())
+    client.make_close_chunked_result.assert_called_once_with(name)
+    assert_frame_equal(result, pd.DataFrame({"b": [1, 2, 3]}))
+    assert is_schema_typed(result)
+
+@with_setup(_setup, _teardown)
+@raises(DataFrameParseException)
+def test_execute_sql_in_chunks_throws_without_schema():
+    client.chunk_rows = 2
+    client.make_open_chunked_result = MagicMock(return_value="open")
+    mock_spark_session.execute = MagicMock(return_value=(True, schema_json))
+
+    client.execute_sql("command", 5)
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_in_chunks_stops_at_max_rows():
+    client.chunk_rows = 2
+    client.make_open_chunked_result = MagicMock(return_value="open")
+    client.make_fetch_chunk = MagicMock(side_effect=lambda name, rows: "fetch {}".format(rows))
+    client.make_close_chunked_result = MagicMock(return_value="close")
+    mock_spark_session.execute = MagicMock(side_effect=_chunked_responses(
+        (True, chunked_schema), (True, '{"b":1}\n{"b":2}'), (True, '{"b":3}'), (True, "")))
+
+    result = client.execute_sql("command", 3)
+
+    assert [c[0][0] for c in mock_spark_session.execute.call_args_list] == ["open", "fetch 2", "fetch 1", "close"]
+    assert len(result) == 3
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_in_chunks_no_results():
+    client.chunk_rows = 2
+    client.make_open_chunked_result = MagicMock(return_value="open")
+    client.make_fetch_chunk = MagicMock(return_value="fetch")
+    client.make_close_chunked_result = MagicMock(return_value="close")
+    mock_spark_session.execute = MagicMock(side_effect=_chunked_responses(
+        (True, chunked_schema), (True, ""), (True, "")))
+
+    result = client.execute_sql("command", 5)
+
+    assert mock_spark_session.execute.call_count == 3
+    assert_frame_equal(result, pd.DataFrame.from_records([], columns=["b"]).astype("int64"))
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_in_chunks_releases_rows_on_error():
+    client.chunk_rows = 2
+    client.make_open_chunked_result = MagicMock(return_value="open")
+    client.make_fetch_chunk = MagicMock(return_value="fetch")
+    client.make_close_chunked_result = MagicMock(return_value="close")
+    mock_spark_session.execute = MagicMock(side_effect=_chunked_responses(
+        (True, chunked_schema), (False, "some exception"), (True, "")))
+
+    try:
+        client.execute_sql("command", 5)
+        assert False
+    except DataFrameParseException as e:
+        assert e.out == "some exception"
+
+    mock_spark_session.execute.assert_called_with("close")
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_does_not_chunk_when_chunk_rows_is_0():
+    client.chunk_rows = 10
+    client.get_records = MagicMock(return_value=(True, schema_json))
+    client.make_open_chunked_result = MagicMock()
+
+    client.execute_sql("command", 11, None, 0)
+
+    client.get_records.assert_called_once_with("sqlContext", "command", "11", SqlSampling())
+    assert not client.make_open_chunked_result.called
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_does_not_chunk_small_results():
+    client.chunk_rows = 10
+    client.get_records = MagicMock(return_value=(True, schema_json))
+    client.make_open_chunked_result = MagicMock()
+
+    client.execute_sql("command", 10)
+
+    client.get_records.assert_called_once_with("sqlContext", "command", "10", SqlSampling())
+    assert not client.make_open_chunked_result.called
+
+@with_setup(_setup, _teardown)
+def test_iter_sql_fetches_whole_result_and_types_every_chunk():
+    client.make_open_chunked_result = MagicMock(return_value="open")
+    client.make_fetch_chunk = MagicMock(side_effect=lambda name, rows: "fetch {}".format(rows))
+    client.make_close_chunked_result = MagicMock(return_value="close")
+    mock_spark_session.execute = MagicMock(side_effect=_chunked_responses(
+        (True, chunked_schema), (True, '{"b":1}\n{"b":2}'), (True, '{"b":3}\n{"b":4}'), (True, ""), (True, "")))
+
+    chunks = client.iter_sql("command", 2)
+
+    assert not mock_spark_session.execute.called
+    first = next(chunks)
+    assert_frame_equal(first, pd.DataFrame({"b": [1, 2]}))
+    assert is_schema_typed(first)
+    assert mock_spark_session.execute.call_count == 2
+    assert [list(df["b"]) for df in chunks] == [[3, 4]]
+    assert [c[0][0] for c in mock_spark_session.execute.call_args_list] == ["open", "fetch 2", "fetch 2", "fetch 2",
+                                                                           "close"]
+
+@with_setup(_setup, _teardown)
+def test_iter_hive_releases_rows_when_closed_early():
+    client.make_open_chunked_result = MagicMock(return_value="open")
+    client.make_fetch_chunk = MagicMock(return_value="fetch")
+    client.make_close_chunked_result = MagicMock(return_value="close")
+    mock_spark_session.execute = MagicMock(side_effect=_chunked_responses(
+        (True, chunked_schema), (True, '{"b":1}'), (True, "")))
+
+    chunks = client.iter_hive("command", 1)
+    next(chunks)
+    chunks.close()
+
+    client.make_open_chunked_result.assert_called_once_with(client.make_close_chunked_result.call_args[0][0],
+                                                            "hiveContext", "command", SqlSampling())
+    mock_spark_session.execute.assert_called_with("close")
+
+@raises(ValueError)
+@with_setup(_setup, _teardown)
+def test_iter_sql_requires_positive_chunks():
+    client.iter_sql("command", 0)
@@ -1,16 +1,29 @@
+from datetime import datetime
 from mock import MagicMock
 from nose.tools import with_setup, assert_equal
 from pandas.util.testing import assert_frame_equal
 import pandas as pd
 
 from remotespark.utils.constants import Constants
+from remotespark.utils.dataframemetadata import is_schema_typed
 from remotespark.livyclientlib.pandaspysparklivyclient import PandasPysparkLivyClient
 from remotespark.livyclientlib.dataframeparseexception import DataFrameParseException
+from remotespark.livyclientlib.sqlsampling import SqlSampling
+from tests.fakespark import FakeDataFrame, fake_execute
 
 mock_spark_session = None
 client = None
 execute_m = None
 execute_responses = []
+schema_json = '{"type":"struct","fields":[{"name":"buildingID","type":"long","nullable":true,"metadata":{}},' \
+              '{"name":"date","type":"string","nullable":true,"metadata":{}},' \
+              '{"name":"temp_diff","type":"long","nullable":true,"metadata":{}}]}'
+
+
+def _records_command(command):
+    return '''{0}_df = sqlContext.sql("""{1}""")
+print({0}_df.schema.json())
+for {0} in {0}_df.toJSON().take(10): print({0})'''.format(Constants.long_random_variable_name, command)
 
 
 def _next_response_execute(*args):
@@ -39,45 +52,39 @@ def _teardown():
 def test_execute_sql_pandas_pyspark_livy():
     # result from livy
     result_json = (True,
-                   """{"buildingID":0,"date":"6/1/13","temp_diff":12}
+                   schema_json + """
+{"buildingID":0,"date":"6/1/13","temp_diff":12}
 {"buildingID":1,"date":"6/1/13","temp_diff":0}""")
     execute_m.return_value = result_json
 
     # desired pandas df
     records = [{u'buildingID': 0, u'date': u'6/1/13', u'temp_diff': 12},
                {u'buildingID': 1, u'date': u'6/1/13', u'temp_diff': 0}]
-    desired_df = pd.DataFrame(records)
+    desired_df = pd.DataFrame(records, columns=['buildingID', 'date', 'temp_diff'])
+    desired_df['date'] = desired_df['date'].astype('category')
 
     command = "command"
     df = client.execute_sql(command)
 
-    execute_m.assert_called_with('for {} in sqlContext.sql("""{}""").toJSON().take({}): print({})'\
-                                 .format(Constants.long_random_variable_name, command, 10,
-                                         Constants.long_random_variable_name))
+    execute_m.assert_called_with(_records_command(command))
     assert_frame_equal(desired_df, df)
+    assert is_schema_typed(df)
 
 
 @with_setup(_setup, _teardown)
 def test_execute_sql_pandas_pyspark_livy_no_results():
-    global execute_responses
-
-    # Set up spark session to return empty JSON and then columns
+    # Set up spark session to return only the schema
     command = "command"
-    result_json = ""
-    result_columns = "buildingID\ndate\ntemp_diff"
-    execute_responses = [(True, result_json), (True, result_columns)]
-    execute_m.side_effect = _next_response_execute
+    execute_m.return_value = (True, schema_json)
 
     # pandas to return
     columns = ['buildingID', 'date', 'temp_diff']
-    desired_df = pd.DataFrame.from_records([], columns=columns)
+    desired_df = pd.DataFrame.from_records([], columns=columns).astype({'buildingID': 'int64', 'temp_diff': 'int64'})
 
     df = client.execute_sql(command)
 
     # Verify basic calls were done
-    execute_m.assert_called_with('for {} in sqlContext.sql("""{}""").columns: print({})'\
-                                 .format(Constants.long_random_variable_name, command,
-                                         Constants.long_random_variable_name))
+    execute_m.assert_called_once_with(_records_command(command))
     assert_frame_equal(desired_df, df)
 
 
@@ -97,24 +104,15 @@ def test_execute_sql_pandas_pyspark_livy_bad_return():
 
 
 @with_setup(_setup, _teardown)
-def test_execute_sql_pandas_pyspark_livy_no_results_exception_in_columns():
-    global execute_responses
-
-    # Set up spark session to return empty JSON and then columns
+def test_execute_sql_pandas_pyspark_livy_bad_rows():
     command = "command"
-    result_json = ""
-    some_exception = "some exception"
-    execute_responses = [(True, result_json), (False, some_exception)]
-    execute_m.side_effect = _next_response_execute
+    execute_m.return_value = (True, schema_json + "\nsomething bad happened")
 
     try:
         client.execute_sql(command)
         assert False
-    except DataFrameParseException as e:
-        execute_m.assert_called_with('for {} in sqlContext.sql("""{}""").columns: print({})'\
-                                     .format(Constants.long_random_variable_name, command,
-                                             Constants.long_random_variable_name))
-        assert e.out == some_exception
+    except DataFrameParseException:
+        pass
 
 
 @with_setup(_setup, _teardown)
@@ -128,11 +126,135 @@ def test_execute_sql_pandas_pyspark_livy_some_exception():
         client.execute_sql(command)
         assert False
     except DataFrameParseException as e:
-        execute_m.assert_called_with('for {} in sqlContext.sql("""{}""").toJSON().take({}): print({})'\
-                                     .format(Constants.long_random_variable_name, command, 10,
-                                             Constants.long_random_variable_name))
+        execute_m.assert_called_with(_records_command(command))
         assert e.out == some_exception
 
 
+@with_setup(_setup, _teardown)
+def test_execute_sql_pandas_pyspark_livy_compressed():
+    fields = [("id", "long"), ("name", "string"), ("value", "double"), ("flag", "boolean"), ("when", "timestamp")]
+    rows = [(1, u'say "hi", then\nleave', 0.1 + 0.2, True, datetime(2016, 1, 2, 3, 4, 5)),
+            (2, None, None, False, datetime(2016, 1, 3))]
+    fake_df = FakeDataFrame(fields, rows)
+    client.transfer_format = Constants.sql_transfer_format_csv_gzip
+    execute_m.side_effect = fake_execute(fake_df)
+
+    df = client.execute_sql("command")
+
+    assert_equal(1, execute_m.call_count)
+    assert_frame_equal(pd.DataFrame({"id": [1, 2], "name": pd.Categorical([u'say "hi", then\nleave', None]),
+                                     "value": [0.1 + 0.2, None], "flag": [True, False],
+                                     "when": pd.to_datetime(["2016-01-02 03:04:05", "2016-01-03"])},
+                                    columns=["id", "name", "value", "flag", "when"]), df)
+
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_pandas_pyspark_livy_compressed_keeps_strings_that_look_like_nulls():
+    rows = [(u"NA",), (u"null",), (u"",), (u"NaN",), (None,)]
+    fake_df = FakeDataFrame([("name", "string")], rows)
+    client.transfer_format = Constants.sql_transfer_format_csv_gzip
+    client.max_category_ratio = 0
+    execute_m.side_effect = fake_execute(fake_df)
+
+    df = client.execute_sql("command")
+
+    assert_equal([u"NA", u"null", u"", u"NaN"], list(df["name"][:4]))
+    assert pd.isnull(df["name"][4])
+
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_pandas_pyspark_livy_compressed_no_results():
+    fake_df = FakeDataFrame([("id", "long"), ("name", "string")], [])
+    client.transfer_format = Constants.sql_transfer_format_csv_gzip
+    execute_m.side_effect = fake_execute(fake_df)
+
+    df = client.execute_sql("command")
+
+    assert_equal(1, execute_m.call_count)
+    assert_frame_equal(pd.DataFrame.from_records([], columns=["id", "name"]).astype({"id": "int64"}), df)
+
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_pandas_pyspark_livy_in_chunks():
+    fields = [("id", "long"), ("name", "string")]
+    df = FakeDataFrame(fields, [(i, u"name{}".format(i)) for i in range(5)])
+    namespace = dict()
+    client.chunk_rows = 2
+    execute_m.side_effect = fake_execute(df, namespace)
+
+    result = client.execute_sql("command", 4)
+
+    # Open, two pages and close
+    assert_equal(4, execute_m.call_count)
+    assert_frame_equal(pd.DataFrame({"id": [0, 1, 2, 3], "name": [u"name0", u"name1", u"name2", u"name3"]},
+                                    columns=["id", "name"]), result)
+    assert not df.json_rows.cached
+    assert not any(key.startswith(Constants.long_random_variable_name + "_") for key in namespace)
+
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_pandas_pyspark_livy_chunks_take_precedence_over_transfer_format():
+    df = FakeDataFrame([("id", "long")], [(i,) for i in range(5)])
+    client.chunk_rows = 2
+    client.transfer_format = Constants.sql_transfer_format_csv_gzip
+    client.logger = MagicMock()
+    namespace = dict()
+    execute_m.side_effect = fake_execute(df, namespace)
+
+    result = client.execute_sql("command", 4)
+
+    assert_equal([0, 1, 2, 3], list(result["id"]))
+    assert "zlib" not in execute_m.call_args_list[0][0][0]
+    assert "csv_gzip" in client.logger.debug.call_args[0][0]
+
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_pandas_pyspark_livy_sample():
+    fake_df = FakeDataFrame([("id", "long")], [(i,) for i in range(100)])
+    execute_m.side_effect = fake_execute(fake_df)
+
+    df = client.execute_sql("command", 1000, SqlSampling("sample", 0.2, 7))
+
+    assert ".sample(False, 0.2, 7)" in execute_m.call_args[0][0]
+    assert_equal([row[0] for row in fake_df.sample(False, 0.2, 7).rows], list(df["id"]))
+    assert 0 < len(df) < 100
+
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_pandas_pyspark_livy_stratified():
+    rows = [(i, u"big") for i in range(90)] + [(i, u"small") for i in range(90, 100)]
+    fake_df = FakeDataFrame([("id", "long"), ("group", "string")], rows)
+    client.transfer_format = Constants.sql_transfer_format_csv_gzip
+    execute_m.side_effect = fake_execute(fake_df)
+
+    df = client.execute_sql("command", 1000, SqlSampling("stratified", 0.5, 3, "group"))
+
+    assert_equal(1, execute_m.call_count)
+    expected = fake_df.sampleBy("group", {u"big": 0.5, u"small": 0.5}, 3).rows
+    assert_equal([row[0] for row in expected], list(df["id"]))
+
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_pandas_pyspark_livy_stratified_leaves_out_null_stratum():
+    rows = [(i, datetime(2015, 1, 1 + i % 2)) for i in range(90)] + [(i, None) for i in range(90, 100)]
+    fake_df = FakeDataFrame([("id", "long"), ("day", "timestamp")], rows)
+    client.transfer_format = Constants.sql_transfer_format_csv_gzip
+    execute_m.side_effect = fake_execute(fake_df)
+
+    df = client.execute_sql("command", 1000, SqlSampling("stratified", 0.5, 3, "day"))
+
+    assert_equal(1, execute_m.call_count)
+    assert_equal(["id", "day"], list(df.columns))
+    assert len(df) > 0
+    assert all(i < 90 for i in df["id"])
+
+
+@with_setup(_setup, _teardown)
+def test_iter_sql_pandas_pyspark_livy_sample():
+    fake_df = FakeDataFrame([("id", "long")], [(i,) for i in range(100)])
+    namespace = dict()
+    execute_m.side_effect = fake_execute(fake_df, namespace)
 
+    chunks = list(client.iter_sql("command", 10, None, SqlSampling("sample", 0.5, 1)))
 
+    assert_equal([row[0] for row in fake_df.sample(False, 0.5, 1).rows], [i for df in chunks for i in df["id"]])
@@ -3,13 +3,26 @@ from nose.tools import with_setup
 from pandas.util.testing import assert_frame_equal
 import pandas as pd
 
+from remotespark.utils.constants import Constants
 from remotespark.livyclientlib.pandasscalalivyclient import PandasScalaLivyClient
 from remotespark.livyclientlib.dataframeparseexception import DataFrameParseException
+from remotespark.livyclientlib.sqlsampling import SqlSampling
 
 mock_spark_session = None
 client = None
 execute_m = None
 execute_responses = []
+schema_json = '{"type":"struct","fields":[{"name":"buildingID","type":"long","nullable":true,"metadata":{}},' \
+              '{"name":"date","type":"string","nullable":true,"metadata":{}},' \
+              '{"name":"temp_diff","type":"long","nullable":true,"metadata":{}}]}'
+
+
+def _records_command(command):
+    return '''{{
+val {0}_df = sqlContext.sql("""{1}""")
+println({0}_df.schema.json)
+{0}_df.toJSON.take(10).foreach(println)
+}}'''.format(Constants.long_random_variable_name, command)
 
 
 def _next_response_execute(*args):
@@ -37,41 +50,37 @@ def _teardown():
 @with_setup(_setup, _teardown)
 def test_execute_sql_pandas_scala_livy():
     # result from livy
-    result_json = """{"buildingID":0,"date":"6/1/13","temp_diff":12}
-{"buildingID":1,"date":"6/1/13","temp_diff":0}"""
+    result_json = schema_json + """
+{"buildingID":0,"date":"6/1/13","temp_diff":12}
+{"buildingID":1,"date":"6/2/13","temp_diff":0}"""
     execute_m.return_value = (True, result_json)
 
     # desired pandas df
     records = [{u'buildingID': 0, u'date': u'6/1/13', u'temp_diff': 12},
-               {u'buildingID': 1, u'date': u'6/1/13', u'temp_diff': 0}]
-    desired_df = pd.DataFrame(records)
+               {u'buildingID': 1, u'date': u'6/2/13', u'temp_diff': 0}]
+    desired_df = pd.DataFrame(records, columns=['buildingID', 'date', 'temp_diff'])
 
     command = "command"
     df = client.execute_sql(command)
 
-    execute_m.assert_called_with('sqlContext.sql("""{}""").toJSON.take({}).foreach(println)'.format(command, 10))
+    execute_m.assert_called_with(_records_command(command))
     assert_frame_equal(desired_df, df)
 
 
 @with_setup(_setup, _teardown)
 def test_execute_sql_pandas_scala_livy_no_results():
-    global execute_responses
-
-    # Set up spark session to return empty JSON and then columns
+    # Set up spark session to return only the schema
     command = "command"
-    result_json = ""
-    result_columns = "buildingID\ndate\ntemp_diff"
-    execute_responses = [(True, result_json), (True, result_columns)]
-    execute_m.side_effect = _next_response_execute
+    execute_m.return_value = (True, schema_json)
 
     # pandas to return
     columns = ["buildingID", "date", "temp_diff"]
-    desired_df = pd.DataFrame.from_records(list(), columns=columns)
+    desired_df = pd.DataFrame.from_records(list(), columns=columns).astype({'buildingID': 'int64', 'temp_diff': 'int64'})
 
     df = client.execute_sql(command)
 
     # Verify basic calls were done
-    execute_m.assert_called_with('sqlContext.sql("""{}""").columns.foreach(println)'.format(command))
+    execute_m.assert_called_once_with(_records_command(command))
     assert_frame_equal(desired_df, df)
 
 @with_setup(_setup, _teardown)
@@ -88,35 +97,89 @@ def test_execute_sql_pandas_pyspark_livy_bad_return():
     except DataFrameParseException:
         pass
 
-@with_setup(_setup, _teardown)
-def test_execute_sql_pandas_scala_livy_no_results_exception_in_columns():
-    global execute_responses
 
+@with_setup(_setup, _teardown)
+def test_execute_sql_pandas_scala_livy_some_exception():
     # Set up spark session to return empty JSON and then columns
     command = "command"
-    result_json = ""
-    some_exception = "some exception"
-    execute_responses = [(True, result_json), (False, some_exception)]
-    execute_m.side_effect = _next_response_execute
+    some_exception = "some awful exception"
+    execute_m.return_value = (False, some_exception)
 
     try:
         result = client.execute_sql(command)
         assert False
     except DataFrameParseException as e:
-        execute_m.assert_called_with('sqlContext.sql("""{}""").columns.foreach(println)'.format(command))
+        execute_m.assert_called_with(_records_command(command))
         assert e.out == some_exception
 
 
 @with_setup(_setup, _teardown)
-def test_execute_sql_pandas_scala_livy_some_exception():
-    # Set up spark session to return empty JSON and then columns
-    command = "command"
-    some_exception = "some awful exception"
-    execute_m.return_value = (False, some_exception)
+def test_execute_sql_pandas_scala_livy_compressed_builds_one_statement():
+    client.transfer_format = Constants.sql_transfer_format_csv_gzip
+    execute_m.return_value = (False, "some exception")
 
     try:
-        result = client.execute_sql(command)
+        client.execute_sql("command")
         assert False
     except DataFrameParseException as e:
-        execute_m.assert_called_with('sqlContext.sql("""{}""").toJSON.take({}).foreach(println)'.format(command, 10))
-        assert e.out == some_exception
+        assert e.out == "some exception"
+
+    assert execute_m.call_count == 1
+    code = execute_m.call_args[0][0]
+    assert 'sqlContext.sql("""command""")' in code
+    assert ".take(10)" in code
+    assert code.startswith("{") and code.endswith("}")
+
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_pandas_scala_livy_in_chunks():
+    client.chunk_rows = 1
+    # The REPL echoes the values it defines after what the code prints.
+    echo = "{0}_1_df: org.apache.spark.sql.DataFrame = [buildingID: bigint, date: string]\n" \
+           "{0}_1_rows: org.apache.spark.rdd.RDD[String] = MapPartitionsRDD[3] at toJSON\n" \
+           "{0}_1_iterator: Iterator[String] = non-empty iterator".format(Constants.long_random_variable_name)
+    open_output = Constants.chunked_schema_prefix + schema_json + "\n" + echo
+    execute_m.side_effect = [(True, open_output),
+                             (True, '{"buildingID":0,"date":"6/1/13","temp_diff":12}'),
+                             (True, '{"buildingID":1,"date":"6/2/13","temp_diff":0}'),
+                             (True, "")]
+
+    df = client.execute_sql("command", 2)
+
+    codes = [c[0][0] for c in execute_m.call_args_list]
+    assert 'sqlContext.sql("""command""")' in codes[0]
+    assert ".toLocalIterator" in codes[0]
+    assert codes[1].startswith("{") and codes[1].endswith("}")
+    assert ".unpersist()" in codes[3]
+    assert list(df["buildingID"]) == [0, 1]
+
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_pandas_scala_livy_sample():
+    execute_m.return_value = (True, schema_json)
+
+    client.execute_sql("command", None, SqlSampling("sample", 0.1, 42))
+
+    assert 'sqlContext.sql("""command""").sample(false, 0.1, 42L)' in execute_m.call_args[0][0]
+
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_pandas_scala_livy_sample_without_seed():
+    execute_m.return_value = (True, schema_json)
+
+    client.execute_sql("command", None, SqlSampling("sample", 1))
+
+    assert '.sample(false, 1.0, scala.util.Random.nextLong)' in execute_m.call_args[0][0]
+
+
+@with_setup(_setup, _teardown)
+def test_execute_sql_pandas_scala_livy_stratified():
+    execute_m.return_value = (True, schema_json)
+
+    client.execute_sql("command", None, SqlSampling("stratified", 0.5, 3, "date"))
+
+    code = execute_m.call_args[0][0]
+    assert '.stat.sampleBy("date",' in code
+    assert '.select("date").where({}_query("date").isNotNull).distinct.collect.map(r => r.get(0) -> 0.5).toMap, ' \
+           '3L)'.format(Constants.long_random_variable_name) in code
+    assert code.startswith("{") and code.endswith("}")
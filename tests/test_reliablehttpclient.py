@@ -4,9 +4,12 @@
 from mock import patch, PropertyMock, MagicMock
 from nose.tools import raises, assert_equals, with_setup
 import requests
+import threading
+from time import sleep
 
 from remotespark.livyclientlib.linearretrypolicy import LinearRetryPolicy
 from remotespark.livyclientlib.reliablehttpclient import ReliableHttpClient
+import remotespark.utils.configuration as conf
 from remotespark.utils.utils import get_connection_string
 
 retry_policy = None
@@ -50,7 +53,7 @@ def test_compose_url():
 
 @with_setup(_setup, _teardown)
 def test_get():
-    with patch('requests.get') as patched_get:
+    with patch('requests.Session.get') as patched_get:
         type(patched_get.return_value).status_code = 200
 
         client = ReliableHttpClient("http://url.com", {}, "username", "password", retry_policy)
@@ -63,7 +66,7 @@ def test_get():
 @raises(ValueError)
 @with_setup(_setup, _teardown)
 def test_get_throws():
-    with patch('requests.get') as patched_get:
+    with patch('requests.Session.get') as patched_get:
         type(patched_get.return_value).status_code = 500
 
         client = ReliableHttpClient("http://url.com", {}, "username", "password", retry_policy)
@@ -78,7 +81,7 @@ def test_get_will_retry():
     retry_policy.should_retry.return_value = True
     retry_policy.seconds_to_sleep.return_value = 0.01
 
-    with patch('requests.get') as patched_get:
+    with patch('requests.Session.get') as patched_get:
         # When we call assert_equals in this unit test, the side_effect is executed.
         # So, the last status_code should be repeated.
         sequential_values = [500, 200, 200]
@@ -96,7 +99,7 @@ def test_get_will_retry():
 
 @with_setup(_setup, _teardown)
 def test_post():
-    with patch('requests.post') as patched_post:
+    with patch('requests.Session.post') as patched_post:
         type(patched_post.return_value).status_code = 200
 
         client = ReliableHttpClient("http://url.com", {}, "username", "password", retry_policy)
@@ -109,7 +112,7 @@ def test_post():
 @raises(ValueError)
 @with_setup(_setup, _teardown)
 def test_post_throws():
-    with patch('requests.post') as patched_post:
+    with patch('requests.Session.post') as patched_post:
         type(patched_post.return_value).status_code = 500
 
         client = ReliableHttpClient("http://url.com", {}, "username", "password", retry_policy)
@@ -124,7 +127,7 @@ def test_post_will_retry():
     retry_policy.should_retry.return_value = True
     retry_policy.seconds_to_sleep.return_value = 0.01
 
-    with patch('requests.post') as patched_post:
+    with patch('requests.Session.post') as patched_post:
         # When we call assert_equals in this unit test, the side_effect is executed.
         # So, the last status_code should be repeated.
         sequential_values = [500, 200, 200]
@@ -142,7 +145,7 @@ def test_post_will_retry():
 
 @with_setup(_setup, _teardown)
 def test_delete():
-    with patch('requests.delete') as patched_delete:
+    with patch('requests.Session.delete') as patched_delete:
         type(patched_delete.return_value).status_code = 200
 
         client = ReliableHttpClient("http://url.com", {}, "username", "password", retry_policy)
@@ -155,7 +158,7 @@ def test_delete():
 @raises(ValueError)
 @with_setup(_setup, _teardown)
 def test_delete_throws():
-    with patch('requests.delete') as patched_delete:
+    with patch('requests.Session.delete') as patched_delete:
         type(patched_delete.return_value).status_code = 500
 
         client = ReliableHttpClient("http://url.com", {}, "username", "password", retry_policy)
@@ -170,7 +173,7 @@ def test_delete_will_retry():
     retry_policy.should_retry.return_value = True
     retry_policy.seconds_to_sleep.return_value = 0.01
 
-    with patch('requests.delete') as patched_delete:
+    with patch('requests.Session.delete') as patched_delete:
         # When we call assert_equals in this unit test, the side_effect is executed.
         # So, the last status_code should be repeated.
         sequential_values = [500, 200, 200]
@@ -193,7 +196,7 @@ def test_will_retry_error_no():
     retry_policy.should_retry.return_value = False
     retry_policy.seconds_to_sleep.return_value = 0.01
 
-    with patch('requests.get') as patched_get:
+    with patch('requests.Session.get') as patched_get:
         patched_get.side_effect = requests.exceptions.ConnectionError()
         client = ReliableHttpClient("http://url.com", {}, "username", "password", retry_policy)
 
@@ -212,3 +215,65 @@ def test_compose_serialize():
     client = ReliableHttpClient(url, {}, username, password, retry_policy)
 
     assert client.connection_string == get_connection_string(url, username, password)
+
+
+@with_setup(_setup, _teardown)
+def test_uses_given_http_session():
+    http_session = MagicMock()
+    http_session.get.return_value.status_code = 200
+    client = ReliableHttpClient("http://url.com", {}, "username", "password", retry_policy, http_session)
+
+    result = client.get("r", [200])
+
+    assert_equals(200, result.status_code)
+    assert_equals(http_session, client.http_session)
+    http_session.get.assert_called_once_with("http://url.com/r", headers={}, auth=("username", "password"),
+                                             verify=True)
+
+
+@with_setup(_setup, _teardown)
+def test_clients_that_share_http_session_send_one_request_at_a_time():
+    in_flight = []
+    overlapped = []
+
+    def get(url, **kwargs):
+        in_flight.append(url)
+        if len(in_flight) > 1:
+            overlapped.append(url)
+        sleep(0.01)
+        in_flight.remove(url)
+        return MagicMock(status_code=200)
+
+    http_session = MagicMock()
+    http_session.get.side_effect = get
+    clients = [ReliableHttpClient("http://url.com", {}, "", "", retry_policy, http_session) for _ in range(2)]
+    threads = [threading.Thread(target=client.get, args=("r{}".format(i), [200]))
+               for (i, client) in enumerate(clients * 3)]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert_equals(6, http_session.get.call_count)
+    assert_equals([], overlapped)
+
+
+@with_setup(_setup, _teardown)
+def test_create_http_session_pools_connections():
+    conf.override_all({conf.http_pool_maxsize.__name__: 3})
+    http_session = ReliableHttpClient.create_http_session()
+    conf.load()
+
+    adapter = http_session.get_adapter("https://url.com")
+    assert_equals(3, adapter._pool_maxsize)
+    assert_equals("keep-alive", http_session.headers["Connection"])
+
+
+@with_setup(_setup, _teardown)
+def test_create_http_session_without_keep_alive():
+    conf.override_all({conf.http_keep_alive.__name__: False})
+    http_session = ReliableHttpClient.create_http_session()
+    conf.load()
+
+    assert_equals("close", http_session.headers["Connection"])
@@ -1,8 +1,11 @@
-from mock import MagicMock
-from nose.tools import raises, with_setup
+from mock import MagicMock, call
+from nose.tools import raises, with_setup, assert_equals
+import pandas as pd
 
 from remotespark.remotesparkmagics import RemoteSparkMagics
 from remotespark.livyclientlib.dataframeparseexception import DataFrameParseException
+from remotespark.livyclientlib.sqlsampling import SqlSampling
+from remotespark.utils.dataframemetadata import get_aggregator
 import remotespark.utils.configuration as conf
 from remotespark.utils.constants import Constants
 
@@ -179,6 +182,62 @@ def test_run_cell_command_parses():
     ipython_display.write.assert_called_once_with(result_value)
 
 
+@with_setup(_setup, _teardown)
+def test_run_cell_several_sessions_command_parses():
+    spark_controller.run_cell_all = MagicMock(return_value=[("a", (True, "out a")), ("b", (False, "err b"))])
+    cell = "cell code"
+
+    result = magic.spark("-s a,b", cell)
+
+    spark_controller.run_cell_all.assert_called_once_with(cell, ["a", "b"])
+    assert result is None
+    ipython_display.writeln.assert_any_call("Session 'a':")
+    ipython_display.writeln.assert_any_call("out a")
+    ipython_display.writeln.assert_any_call("Session 'b':")
+    ipython_display.send_error.assert_called_once_with("err b\n")
+
+
+@with_setup(_setup, _teardown)
+def test_run_cell_all_sessions_command_parses():
+    spark_controller.get_client_keys = MagicMock(return_value=["a", "b"])
+    spark_controller.run_cell_all = MagicMock(return_value=[])
+    cell = "cell code"
+
+    magic.spark("--all", cell)
+
+    spark_controller.run_cell_all.assert_called_once_with(cell, ["a", "b"])
+
+
+@with_setup(_setup, _teardown)
+def test_run_sql_several_sessions_writes_error():
+    magic.spark("-s a,b -c sql", "SELECT 1")
+
+    assert_equals(0, spark_controller.run_cell_all.call_count)
+    assert_equals(1, ipython_display.send_error.call_count)
+
+
+@with_setup(_setup, _teardown)
+def test_run_cell_several_sessions_with_output_writes_error():
+    magic.spark("-s a,b -o out", "cell code")
+
+    assert_equals(0, spark_controller.run_cell_all.call_count)
+    assert_equals(1, ipython_display.send_error.call_count)
+
+
+@with_setup(_setup, _teardown)
+def test_run_cell_async_command_stores_future():
+    future = MagicMock()
+    spark_controller.submit_cell = MagicMock(return_value=future)
+    cell = "cell code"
+
+    result = magic.spark("-s sessions_name --async -o fut", cell)
+
+    spark_controller.submit_cell.assert_called_once_with(cell, "sessions_name")
+    assert result is future
+    shell.user_ns.__setitem__.assert_called_once_with("fut", future)
+    assert_equals(0, spark_controller.run_cell.call_count)
+
+
 @with_setup(_setup, _teardown)
 def test_run_cell_command_writes_to_err():
     run_cell_method = MagicMock()
@@ -213,7 +272,7 @@ def test_run_sql_command_parses():
 
     result = magic.spark(line, cell)
 
-    run_cell_method.assert_called_once_with(cell, name)
+    run_cell_method.assert_called_once_with(cell, name, None, True, None, None)
     assert result is not None
 
 
@@ -232,7 +291,7 @@ def test_run_hive_command_parses():
 
     result = magic.spark(line, cell)
 
-    run_cell_method.assert_called_once_with(cell, name)
+    run_cell_method.assert_called_once_with(cell, name, None, True, None, None)
     assert result is not None
 
 
@@ -252,7 +311,7 @@ def test_run_sql_command_returns_none_when_exception():
 
     result = magic.spark(line, cell)
 
-    run_cell_method.assert_called_once_with(cell, name)
+    run_cell_method.assert_called_once_with(cell, name, None, True, None, None)
     assert result is None
     ipython_display.send_error.assert_called_once_with(error_message)
 
@@ -273,7 +332,7 @@ def test_run_hive_command_returns_none_when_exception():
 
     result = magic.spark(line, cell)
 
-    run_cell_method.assert_called_once_with(cell, name)
+    run_cell_method.assert_called_once_with(cell, name, None, True, None, None)
     assert result is None
     ipython_display.send_error.assert_called_once_with(error_message)
 
@@ -296,7 +355,7 @@ def test_run_sql_command_stores_variable_in_user_ns():
 
     result = magic.spark(line, cell)
 
-    run_cell_method.assert_called_once_with(cell, name)
+    run_cell_method.assert_called_once_with(cell, name, None, True, None, None)
     assert result is not None
     assert result is user_ns[output_name]
 
@@ -334,3 +393,192 @@ def test_logs_subcommand():
     get_logs_method.assert_called_once_with(name)
     assert result is None
     ipython_display.send_error.assert_called_once_with(result_value)
+
+
+@with_setup(_setup, _teardown)
+def test_logs_subcommand_follow():
+    line = "logs -s sessions_name --follow"
+
+    result = magic.spark(line, "")
+
+    spark_controller.follow_logs.assert_called_once_with(ipython_display.writeln, "sessions_name")
+    assert result is None
+    assert not spark_controller.get_logs.called
+
+
+@with_setup(_setup, _teardown)
+def test_run_sql_command_passes_max_rows():
+    run_cell_method = MagicMock()
+    run_cell_method.return_value = (True, "")
+    spark_controller.run_cell_sql = run_cell_method
+
+    magic.spark("-s sessions_name -c sql -m 100000", "cell code")
+
+    run_cell_method.assert_called_once_with("cell code", "sessions_name", 100000, True, None, None)
+
+
+@with_setup(_setup, _teardown)
+def test_run_sql_stream_displays_chunks_as_they_arrive():
+    chunks = [pd.DataFrame([{"a": 1}]), pd.DataFrame([{"a": 2}])]
+    spark_controller.iter_sql = MagicMock(return_value=iter(chunks))
+
+    result = magic.spark("-s sessions_name -c sql --stream", "cell code")
+
+    assert result is None
+    spark_controller.iter_sql.assert_called_once_with("cell code", "sessions_name", None, conf.max_results_sql(), None)
+    assert ipython_display.display.call_args_list == [call(chunks[0]), call(chunks[1])]
+
+
+@with_setup(_setup, _teardown)
+def test_run_hive_stream_stores_generator_in_user_ns():
+    shell.user_ns = user_ns = dict()
+    chunks = MagicMock()
+    spark_controller.iter_hive = MagicMock(return_value=chunks)
+
+    result = magic.spark("-s sessions_name -c hive --stream -m 10 -o pages", "cell code")
+
+    spark_controller.iter_hive.assert_called_once_with("cell code", "sessions_name", None, 10, None)
+    assert result is chunks
+    assert user_ns["pages"] is chunks
+    assert not chunks.__iter__.called
+
+
+@with_setup(_setup, _teardown)
+def test_run_sql_stream_passes_chunk_rows():
+    spark_controller.iter_sql = MagicMock(return_value=iter([]))
+
+    magic.spark("-s sessions_name -c sql --stream --chunk-rows 500", "cell code")
+
+    spark_controller.iter_sql.assert_called_once_with("cell code", "sessions_name", 500, conf.max_results_sql(), None)
+
+
+@with_setup(_setup, _teardown)
+def test_run_sql_stream_with_cache_options_writes_error():
+    spark_controller.iter_sql = MagicMock()
+
+    magic.spark("-c sql --stream --no-cache", "cell code")
+    magic.spark("-c sql --stream --fresh-for 60", "cell code")
+
+    assert ipython_display.send_error.call_count == 2
+    assert not spark_controller.iter_sql.called
+
+
+@with_setup(_setup, _teardown)
+def test_run_sql_stream_writes_error():
+    def chunks():
+        yield pd.DataFrame([{"a": 1}])
+        raise DataFrameParseException("error")
+    spark_controller.iter_sql = MagicMock(return_value=chunks())
+
+    magic.spark("-c sql --stream", "cell code")
+
+    assert ipython_display.display.call_count == 1
+    ipython_display.send_error.assert_called_once_with("error")
+
+
+@with_setup(_setup, _teardown)
+def test_stream_spark_code_writes_error():
+    magic.spark("--stream", "cell code")
+
+    assert ipython_display.send_error.call_count == 1
+    assert not spark_controller.run_cell.called
+
+
+@with_setup(_setup, _teardown)
+def test_run_hive_command_no_cache():
+    run_cell_method = MagicMock()
+    run_cell_method.return_value = (True, "")
+    spark_controller.run_cell_hive = run_cell_method
+
+    magic.spark("-s sessions_name -c hive --no-cache", "cell code")
+
+    run_cell_method.assert_called_once_with("cell code", "sessions_name", None, False, None, None)
+
+
+@with_setup(_setup, _teardown)
+def test_run_sql_command_fresh_for():
+    run_cell_method = MagicMock()
+    run_cell_method.return_value = (True, "")
+    spark_controller.run_cell_sql = run_cell_method
+
+    magic.spark("-s sessions_name -c sql --fresh-for 3600", "cell code")
+
+    run_cell_method.assert_called_once_with("cell code", "sessions_name", None, True, 3600, None)
+
+
+@with_setup(_setup, _teardown)
+def test_run_sql_command_pushes_down_aggregations():
+    conf.override(conf.push_down_aggregations.__name__, True)
+    df = pd.DataFrame([{"date": "6/1/13", "temp_diff": 12}])
+    run_cell_method = MagicMock(return_value=df)
+    spark_controller.run_cell_sql = run_cell_method
+
+    result = magic.spark("-s sessions_name -c sql --fresh-for 60 --sample-fraction 0.5", "cell code")
+    aggregator = get_aggregator(result)
+    aggregator.count("date")
+
+    assert_equals("cell code", aggregator.command)
+    assert_equals(call(aggregator.make_query("date", "COUNT(1)"), "sessions_name", 10001, True, 60, None, 0),
+                  run_cell_method.call_args)
+
+
+@with_setup(_setup, _teardown)
+def test_run_sql_command_does_not_push_down_aggregations_by_default():
+    spark_controller.run_cell_sql = MagicMock(return_value=pd.DataFrame([{"a": 1}]))
+
+    result = magic.spark("-s sessions_name -c sql", "cell code")
+
+    assert get_aggregator(result) is None
+
+
+@with_setup(_setup, _teardown)
+def test_run_sql_command_sampled():
+    run_cell_method = MagicMock()
+    spark_controller.run_cell_sql = run_cell_method
+
+    magic.spark("-s sessions_name -c sql --sample-fraction 0.01 --seed 7", "cell code")
+
+    run_cell_method.assert_called_once_with("cell code", "sessions_name", None, True, None,
+                                            SqlSampling("sample", 0.01, 7))
+
+
+@with_setup(_setup, _teardown)
+def test_run_hive_command_stratified():
+    spark_controller.iter_hive = MagicMock(return_value=iter([]))
+
+    magic.spark("-s sessions_name -c hive --stream --sample-method stratified --sample-fraction 0.5 "
+                "--stratify-by country", "cell code")
+
+    spark_controller.iter_hive.assert_called_once_with("cell code", "sessions_name", None, conf.max_results_sql(),
+                                                       SqlSampling("stratified", 0.5, None, "country"))
+
+
+@with_setup(_setup, _teardown)
+def test_run_sql_command_bad_sampling_writes_error():
+    magic.spark("-s sessions_name -c sql --sample-method sample", "cell code")
+
+    assert ipython_display.send_error.call_count == 1
+    assert not spark_controller.run_cell_sql.called
+
+
+@with_setup(_setup, _teardown)
+def test_run_spark_command_sampled_writes_error():
+    magic.spark("-s sessions_name --sample-fraction 0.5", "cell code")
+
+    assert ipython_display.send_error.call_count == 1
+    assert not spark_controller.run_cell.called
+
+
+@with_setup(_setup, _teardown)
+def test_cache_clear_command_parses():
+    magic.spark("cache clear")
+
+    spark_controller.clear_cache.assert_called_once_with()
+
+
+@with_setup(_setup, _teardown)
+def test_cache_command_without_clear_writes_error():
+    magic.spark("cache")
+
+    assert not spark_controller.clear_cache.called
+    assert ipython_display.send_error.call_count == 1
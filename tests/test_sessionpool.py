@@ -0,0 +1,154 @@
+from time import sleep
+
+from mock import MagicMock
+from nose.tools import with_setup, assert_equals
+
+from remotespark.livyclientlib.sessionpool import SessionPool
+from remotespark.utils.constants import Constants
+from remotespark.utils.loggingdisplay import LoggingDisplay
+
+
+client_factory = None
+ipython_display = None
+clients = None
+connection_string = "url=http://location:port;username=name;password=word"
+properties = {"kind": "pyspark"}
+
+
+def _setup():
+    global client_factory, ipython_display, clients
+
+    clients = []
+    client_factory = MagicMock()
+    ipython_display = MagicMock()
+
+    def build_client(session):
+        client = MagicMock()
+        client.refresh_status.return_value = Constants.idle_session_status
+        clients.append(client)
+        return client
+
+    client_factory.build_client.side_effect = build_client
+
+
+def _teardown():
+    pass
+
+
+def _wait_for(condition):
+    for _ in range(500):
+        if condition():
+            return
+        sleep(0.01)
+    assert False, "Condition not met in time."
+
+
+@with_setup(_setup, _teardown)
+def test_disabled_pool_does_not_start_sessions():
+    pool = SessionPool(client_factory, ipython_display, 0, 60)
+
+    assert pool.take(connection_string, properties) is None
+    assert not client_factory.create_session.called
+
+
+@with_setup(_setup, _teardown)
+def test_take_refills_pool():
+    pool = SessionPool(client_factory, ipython_display, 2, 60)
+
+    assert pool.take(connection_string, properties) is None
+
+    _wait_for(lambda: pool.idle_count(connection_string, properties) == 2)
+    assert_equals(2, client_factory.create_session.call_count)
+    args = client_factory.create_session.call_args[0]
+    assert isinstance(args[0], LoggingDisplay)
+    assert_equals((connection_string, properties, "-1", False), args[1:])
+    for client in clients:
+        client.start.assert_called_once_with()
+
+    client = pool.take(connection_string, properties)
+
+    assert client is clients[0]
+    client.set_ipython_display.assert_called_once_with(ipython_display)
+    _wait_for(lambda: client_factory.create_session.call_count == 3)
+    _wait_for(lambda: pool.idle_count(connection_string, properties) == 2)
+    pool.close()
+
+
+@with_setup(_setup, _teardown)
+def test_pools_are_per_properties():
+    pool = SessionPool(client_factory, ipython_display, 1, 60)
+    pool.take(connection_string, properties)
+    _wait_for(lambda: pool.idle_count(connection_string, properties) == 1)
+
+    assert pool.take(connection_string, {"kind": "spark"}) is None
+    assert pool.idle_count(connection_string, properties) == 1
+    pool.close()
+
+
+@with_setup(_setup, _teardown)
+def test_take_deletes_sessions_that_are_not_idle():
+    pool = SessionPool(client_factory, ipython_display, 2, 60)
+    pool.take(connection_string, properties)
+    _wait_for(lambda: pool.idle_count(connection_string, properties) == 2)
+    (dead, idle) = [client for (client, _) in pool._idle_clients[pool._make_key(connection_string, properties)]]
+    dead.refresh_status.return_value = Constants.dead_session_status
+
+    client = pool.take(connection_string, properties)
+
+    assert client is idle
+    dead.close_session.assert_called_once_with()
+    assert_equals(0, idle.close_session.call_count)
+    pool.close()
+
+
+@with_setup(_setup, _teardown)
+def test_take_returns_none_when_no_pooled_session_is_idle():
+    pool = SessionPool(client_factory, ipython_display, 1, 60)
+    pool.take(connection_string, properties)
+    _wait_for(lambda: pool.idle_count(connection_string, properties) == 1)
+    clients[0].refresh_status.side_effect = ValueError("Session not found")
+
+    assert pool.take(connection_string, properties) is None
+
+    clients[0].close_session.assert_called_once_with()
+    pool.close()
+
+
+@with_setup(_setup, _teardown)
+def test_failed_session_is_not_pooled():
+    client_factory.build_client.side_effect = ValueError("No resources")
+    pool = SessionPool(client_factory, ipython_display, 1, 60)
+
+    pool.take(connection_string, properties)
+
+    _wait_for(lambda: pool._starting.get(pool._make_key(connection_string, properties)) == 0)
+    assert_equals(0, pool.idle_count(connection_string, properties))
+    pool.close()
+
+
+@with_setup(_setup, _teardown)
+def test_reap_deletes_idle_sessions_and_stops_refilling():
+    pool = SessionPool(client_factory, ipython_display, 1, 60)
+    pool.take(connection_string, properties)
+    _wait_for(lambda: pool.idle_count(connection_string, properties) == 1)
+    pool.idle_ttl_seconds = 0
+
+    pool._reap()
+
+    assert_equals(0, pool.idle_count(connection_string, properties))
+    clients[0].close_session.assert_called_once_with()
+    pool._refill(pool._make_key(connection_string, properties))
+    assert_equals(1, client_factory.create_session.call_count)
+    pool.close()
+
+
+@with_setup(_setup, _teardown)
+def test_close_deletes_pooled_sessions():
+    pool = SessionPool(client_factory, ipython_display, 1, 60)
+    pool.take(connection_string, properties)
+    _wait_for(lambda: pool.idle_count(connection_string, properties) == 1)
+
+    pool.close()
+
+    assert_equals(0, pool.idle_count(connection_string, properties))
+    clients[0].close_session.assert_called_once_with()
@@ -1,8 +1,17 @@
 from mock import MagicMock
 from nose.tools import with_setup
 import json
+import shutil
+import tempfile
+import threading
+import pandas as pd
 
+import remotespark.utils.configuration as conf
+
+from remotespark.livyclientlib.diskresultcache import DiskResultCache
 from remotespark.livyclientlib.sparkcontroller import SparkController
+from remotespark.livyclientlib.sqlsampling import SqlSampling
+from remotespark.livyclientlib.sqlresultcache import SqlResultCache
 
 client_manager = None
 client_factory = None
@@ -57,6 +66,41 @@ def test_add_session():
     session.start.assert_called_once_with()
 
 
+@with_setup(_setup, _teardown)
+def test_add_session_shows_startup_on_given_display():
+    name = "name"
+    properties = {"kind": "spark"}
+    connection_string = "url=http://location:port;username=name;password=word"
+    startup_display = MagicMock()
+    client = MagicMock()
+    session = MagicMock()
+    client_factory.create_session = MagicMock(return_value=session)
+    client_factory.build_client = MagicMock(return_value=client)
+
+    controller.add_session(name, connection_string, False, properties, startup_display)
+
+    client_factory.create_session.assert_called_once_with(startup_display, connection_string, properties, "-1",
+                                                          False)
+    client.set_ipython_display.assert_called_once_with(ipython_display)
+
+
+@with_setup(_setup, _teardown)
+def test_add_session_takes_client_from_pool():
+    name = "name"
+    properties = {"kind": "spark"}
+    connection_string = "url=http://location:port;username=name;password=word"
+    client = MagicMock()
+    controller.session_pool = MagicMock()
+    controller.session_pool.take.return_value = client
+
+    controller.add_session(name, connection_string, False, properties)
+
+    controller.session_pool.take.assert_called_once_with(connection_string, properties)
+    client_manager.add_client.assert_called_once_with(name, client)
+    assert not client_factory.create_session.called
+    assert not client.start.called
+
+
 @with_setup(_setup, _teardown)
 def test_add_session_skip():
     name = "name"
@@ -87,8 +131,12 @@ def test_delete_session():
 
 @with_setup(_setup, _teardown)
 def test_cleanup():
+    controller.session_pool = MagicMock()
+
     controller.cleanup()
+
     client_manager.clean_up_all.assert_called_once_with()
+    controller.session_pool.close.assert_called_once_with()
 
 
 @with_setup(_setup, _teardown)
@@ -108,16 +156,223 @@ def test_run_cell():
     default_client.execute.assert_called_with(cell)
 
     controller.run_cell_sql(cell, name)
-    chosen_client.execute_sql.assert_called_with(cell)
+    chosen_client.execute_sql.assert_called_with(cell, None, None, None)
 
     controller.run_cell_sql(cell, None)
-    default_client.execute_sql.assert_called_with(cell)
+    default_client.execute_sql.assert_called_with(cell, None, None, None)
 
     controller.run_cell_hive(cell, name)
-    chosen_client.execute_hive.assert_called_with(cell)
+    chosen_client.execute_hive.assert_called_with(cell, None, None, None)
 
     controller.run_cell_hive(cell, None)
-    default_client.execute_hive.assert_called_with(cell)
+    default_client.execute_hive.assert_called_with(cell, None, None, None)
+
+    controller.run_cell_sql(cell, name, 100000)
+    chosen_client.execute_sql.assert_called_with(cell, 100000, None, None)
+
+    controller.run_cell_sql(cell, "name", 100000, chunk_rows=0)
+    chosen_client.execute_sql.assert_called_with(cell, 100000, None, 0)
+
+
+@with_setup(_setup, _teardown)
+def test_iter_sql():
+    client = MagicMock()
+    client.iter_sql.return_value = chunks = iter([])
+    client_manager.get_client = MagicMock(return_value=client)
+
+    result = controller.iter_sql("cell code", "session_name", 100, 1000)
+
+    assert result is chunks
+    client.iter_sql.assert_called_once_with("cell code", 100, 1000, None)
+
+
+def _cached_client():
+    client = MagicMock()
+    client.endpoint = "http://url.com"
+    client.session_id = "0"
+    client.execute_sql.side_effect = lambda cell, max_rows, sampling, chunk_rows: pd.DataFrame([{"a": 1}])
+    client_manager.get_client = MagicMock(return_value=client)
+    controller.sql_result_cache = SqlResultCache(10 ** 6, 60)
+    return client
+
+
+@with_setup(_setup, _teardown)
+def test_run_cell_sql_uses_cache():
+    client = _cached_client()
+
+    first = controller.run_cell_sql("SELECT *\nFROM t", "session_name")
+    second = controller.run_cell_sql("SELECT * FROM t;", "session_name")
+
+    client.execute_sql.assert_called_once_with("SELECT *\nFROM t", None, None, None)
+    assert first.equals(second)
+    assert first is not second
+
+
+@with_setup(_setup, _teardown)
+def test_run_cell_sql_no_cache_refreshes_cache():
+    client = _cached_client()
+
+    controller.run_cell_sql("SELECT * FROM t", "session_name")
+    controller.run_cell_sql("SELECT * FROM t", "session_name", use_cache=False)
+    controller.run_cell_sql("SELECT * FROM t", "session_name")
+
+    assert client.execute_sql.call_count == 2
+
+
+@with_setup(_setup, _teardown)
+def test_run_cell_sql_caches_per_max_rows_and_context():
+    client = _cached_client()
+    client.execute_hive.side_effect = lambda cell, max_rows, sampling, chunk_rows: pd.DataFrame([{"a": 1}])
+
+    controller.run_cell_sql("SELECT * FROM t", "session_name")
+    controller.run_cell_sql("SELECT * FROM t", "session_name", 10)
+    controller.run_cell_hive("SELECT * FROM t", "session_name")
+
+    assert client.execute_sql.call_count == 2
+    assert client.execute_hive.call_count == 1
+
+
+@with_setup(_setup, _teardown)
+def test_run_cell_sql_caches_per_sampling():
+    client = _cached_client()
+
+    controller.run_cell_sql("SELECT * FROM t", "session_name", sampling=SqlSampling("sample", 0.1, 1))
+    controller.run_cell_sql("SELECT * FROM t", "session_name", sampling=SqlSampling("sample", 0.1, 1))
+    controller.run_cell_sql("SELECT * FROM t", "session_name", sampling=SqlSampling("sample", 0.1, 2))
+
+    assert client.execute_sql.call_count == 2
+    client.execute_sql.assert_called_with("SELECT * FROM t", None, SqlSampling("sample", 0.1, 2), None)
+
+
+@with_setup(_setup, _teardown)
+def test_clear_cache():
+    client = _cached_client()
+
+    controller.run_cell_sql("SELECT * FROM t", "session_name")
+    controller.clear_cache()
+    controller.run_cell_sql("SELECT * FROM t", "session_name")
+
+    assert client.execute_sql.call_count == 2
+
+
+def _disk_cached_client(path):
+    client = _cached_client()
+    controller.sql_result_cache = SqlResultCache(0, 60)
+    controller.disk_result_cache = DiskResultCache(path, 10 ** 6)
+    return client
+
+
+@with_setup(_setup, _teardown)
+def test_run_cell_sql_uses_disk_cache_with_fresh_for():
+    path = tempfile.mkdtemp()
+    try:
+        client = _disk_cached_client(path)
+
+        first = controller.run_cell_sql("SELECT * FROM t", "session_name", fresh_for=60)
+        client.session_id = "1"
+        second = controller.run_cell_sql("SELECT * FROM t", "session_name", fresh_for=60)
+
+        assert client.execute_sql.call_count == 1
+        assert first.equals(second)
+    finally:
+        shutil.rmtree(path)
+
+
+@with_setup(_setup, _teardown)
+def test_run_cell_sql_ignores_disk_cache_without_fresh_for():
+    path = tempfile.mkdtemp()
+    try:
+        client = _disk_cached_client(path)
+
+        controller.run_cell_sql("SELECT * FROM t", "session_name", fresh_for=60)
+        controller.run_cell_sql("SELECT * FROM t", "session_name")
+        controller.run_cell_sql("SELECT * FROM t", "session_name", use_cache=False, fresh_for=60)
+
+        assert client.execute_sql.call_count == 3
+    finally:
+        shutil.rmtree(path)
+
+
+@with_setup(_setup, _teardown)
+def test_clear_cache_clears_disk_cache():
+    path = tempfile.mkdtemp()
+    try:
+        client = _disk_cached_client(path)
+
+        controller.run_cell_sql("SELECT * FROM t", "session_name", fresh_for=60)
+        controller.clear_cache()
+        controller.run_cell_sql("SELECT * FROM t", "session_name", fresh_for=60)
+
+        assert client.execute_sql.call_count == 2
+    finally:
+        shutil.rmtree(path)
+
+
+@with_setup(_setup, _teardown)
+def test_delete_session_by_name_discards_its_cached_results():
+    client = _cached_client()
+    client_manager.get_sessions_list.return_value = ["session_name"]
+
+    controller.run_cell_sql("SELECT * FROM t", "session_name")
+    controller.delete_session_by_name("session_name")
+
+    assert len(controller.sql_result_cache) == 0
+
+
+@with_setup(_setup, _teardown)
+def test_run_cell_all():
+    clients = {"a": MagicMock(), "b": MagicMock(), "c": MagicMock()}
+    clients["a"].execute.return_value = (True, "out a")
+    clients["b"].execute.side_effect = ValueError("failed b")
+    clients["c"].execute.return_value = (False, "error c")
+    controller.get_client_by_name_or_default = MagicMock(side_effect=lambda name: clients[name])
+    cell = "cell code"
+
+    results = controller.run_cell_all(cell, ["a", "b", "c"])
+
+    assert results == [("a", (True, "out a")), ("b", (False, "failed b")), ("c", (False, "error c"))]
+    for client in clients.values():
+        client.execute.assert_called_once_with(cell, show_progress=False)
+
+
+@with_setup(_setup, _teardown)
+def test_run_cell_all_runs_in_parallel():
+    arrived = threading.Condition()
+    running = []
+
+    def execute(cell, show_progress):
+        # Only returns True if all three sessions are running at the same time.
+        with arrived:
+            running.append(cell)
+            arrived.notify_all()
+            while len(running) < 3:
+                if not arrived.wait(5):
+                    return False, cell
+        return True, cell
+
+    clients = [MagicMock(), MagicMock(), MagicMock()]
+    for client in clients:
+        client.execute.side_effect = execute
+    controller.get_client_by_name_or_default = MagicMock(side_effect=clients)
+
+    results = controller.run_cell_all("cell", ["a", "b", "c"])
+
+    assert [r[1] for r in results] == [(True, "cell")] * 3
+
+
+@with_setup(_setup, _teardown)
+def test_run_cell_all_uses_at_least_one_thread():
+    conf.override_all({conf.max_parallel_sessions.__name__: 0})
+    try:
+        client = MagicMock()
+        client.execute.return_value = (True, "out")
+        controller.get_client_by_name_or_default = MagicMock(return_value=client)
+
+        results = controller.run_cell_all("cell", ["a"])
+
+        assert results == [("a", (True, "out"))]
+    finally:
+        conf.override_all({})
 
 
 @with_setup(_setup, _teardown)
@@ -189,3 +444,15 @@ def test_get_logs():
     controller.get_logs()
 
     chosen_client.get_logs.assert_called_with()
+
+
+@with_setup(_setup, _teardown)
+def test_follow_logs():
+    chosen_client = MagicMock()
+    controller.get_client_by_name_or_default = MagicMock(return_value=chosen_client)
+    line_callback = MagicMock()
+
+    controller.follow_logs(line_callback, "name")
+
+    controller.get_client_by_name_or_default.assert_called_with("name")
+    chosen_client.follow_logs.assert_called_with(line_callback)
@@ -1,7 +1,10 @@
+from threading import Event
+
 from mock import MagicMock, call
 from nose.tools import with_setup
 
 import remotespark.utils.configuration as conf
+from remotespark.utils.loggingdisplay import LoggingDisplay
 from remotespark.utils.utils import get_connection_string
 from remotespark.wrapperkernel.sparkkernelbase import SparkKernelBase
 from remotespark.wrapperkernel.usercommandparser import UserCommandParser
@@ -440,6 +443,68 @@ def test_shutdown_cleans_up():
     dsi_m.assert_called_once_with(True)
 
 
+@with_setup(_setup, _teardown)
+def test_prewarm_session_is_used_by_first_cell():
+    spark_controller = MagicMock()
+    started = Event()
+    spark_controller.add_session.side_effect = lambda *args: started.wait(5)
+    kernel._get_spark_controller = MagicMock(return_value=spark_controller)
+
+    kernel._prewarm_session()
+
+    assert kernel._session_started
+    started.set()
+
+    kernel.do_execute("my code", False)
+
+    assert kernel._prewarm_thread is None
+    (name, connection_string, skip, properties, display) = spark_controller.add_session.call_args[0]
+    assert isinstance(display, LoggingDisplay)
+    assert name == "TestKernel"
+    assert connection_string == conn_str
+    assert skip
+    assert properties["kind"] == "pyspark"
+    assert call("%%spark\nmy code", False, True, None, False) in execute_cell_mock.mock_calls
+    for c in execute_cell_mock.mock_calls:
+        assert "%spark add" not in c[1][0]
+
+
+@with_setup(_setup, _teardown)
+def test_prewarm_session_error_shows_on_first_cell():
+    spark_controller = MagicMock()
+    spark_controller.add_session.side_effect = ValueError("No resources")
+    spark_controller.get_client_keys.return_value = ["TestKernel"]
+    kernel._get_spark_controller = MagicMock(return_value=spark_controller)
+    kernel._prewarm_session()
+
+    kernel.do_execute("my code", False)
+
+    assert kernel._fatal_error is None
+    assert ipython_display.send_error.call_count == 1
+    assert "No resources" in ipython_display.send_error.call_args[0][0]
+    spark_controller.delete_session_by_name.assert_called_once_with("TestKernel")
+    assert kernel._session_started
+    assert call("%spark add TestKernel python {} skip".format(conn_str), True, False, None, False) \
+        in execute_cell_mock.mock_calls
+    assert call("%%spark\nmy code", False, True, None, False) in execute_cell_mock.mock_calls
+
+
+@with_setup(_setup, _teardown)
+def test_local_code_does_not_wait_for_prewarm_session():
+    spark_controller = MagicMock()
+    started = Event()
+    spark_controller.add_session.side_effect = lambda *args: started.wait(5)
+    kernel._get_spark_controller = MagicMock(return_value=spark_controller)
+    parser.parse_user_command.return_value = (UserCommandParser.local_command, False, None, "my code")
+    kernel._prewarm_session()
+
+    kernel.do_execute("%local\nmy code", False)
+
+    assert kernel._prewarm_thread is not None
+    started.set()
+    assert kernel._join_prewarm() is None
+
+
 @with_setup(_setup, _teardown)
 def test_register_auto_viz():
     kernel._register_auto_viz()
@@ -0,0 +1,122 @@
+from mock import patch
+from nose.tools import assert_equals
+import pandas as pd
+
+from remotespark.livyclientlib.sqlresultcache import SqlResultCache
+from remotespark.utils.dataframemetadata import mark_schema_typed, is_schema_typed
+
+
+def _df(rows):
+    return pd.DataFrame({"a": list(range(rows))})
+
+
+def _size(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def test_normalize_sql():
+    assert_equals("SELECT a FROM t WHERE b = 'x  y'",
+                  SqlResultCache.normalize_sql("  SELECT a\n  FROM   t\tWHERE b = 'x  y' ;\n"))
+    assert_equals('SELECT "a  b", `c  d`', SqlResultCache.normalize_sql('SELECT  "a  b",  `c  d`'))
+
+
+def test_get_returns_copy_with_metadata():
+    cache = SqlResultCache(10 ** 6, 60)
+    df = _df(3)
+    mark_schema_typed(df)
+
+    cache.put("key", df)
+    df["a"] = 0
+    result = cache.get("key")
+
+    assert_equals([0, 1, 2], list(result["a"]))
+    assert is_schema_typed(result)
+    result["a"] = 5
+    assert_equals([0, 1, 2], list(cache.get("key")["a"]))
+
+
+def test_get_missing_key():
+    assert SqlResultCache(10 ** 6, 60).get("key") is None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = SqlResultCache(0, 60)
+
+    cache.put("key", _df(3))
+
+    assert not cache.enabled
+    assert cache.get("key") is None
+
+
+def test_disabled_cache_does_not_measure_results():
+    cache = SqlResultCache(0, 60)
+
+    with patch.object(pd.DataFrame, "memory_usage") as memory_usage:
+        cache.put("key", _df(3))
+
+    assert not memory_usage.called
+
+
+def test_entries_expire():
+    cache = SqlResultCache(10 ** 6, 60)
+    with patch("remotespark.livyclientlib.sqlresultcache.monotonic", return_value=100):
+        cache.put("key", _df(3))
+    with patch("remotespark.livyclientlib.sqlresultcache.monotonic", return_value=159):
+        assert cache.get("key") is not None
+    with patch("remotespark.livyclientlib.sqlresultcache.monotonic", return_value=160):
+        assert cache.get("key") is None
+
+    assert_equals(0, cache.current_bytes)
+
+
+def test_get_with_max_age():
+    cache = SqlResultCache(10 ** 6, 60)
+    with patch("remotespark.livyclientlib.sqlresultcache.monotonic", return_value=100):
+        cache.put("key", _df(3))
+    with patch("remotespark.livyclientlib.sqlresultcache.monotonic", return_value=120):
+        assert cache.get("key", 30) is not None
+        assert cache.get("key", 10) is None
+        assert cache.get("key") is not None
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = SqlResultCache(_size(_df(100)) * 2, 60)
+    cache.put("a", _df(100))
+    cache.put("b", _df(100))
+    cache.get("a")
+
+    cache.put("c", _df(100))
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert_equals(_size(_df(100)) * 2, cache.current_bytes)
+
+
+def test_results_bigger_than_cache_are_not_stored():
+    cache = SqlResultCache(_size(_df(10)), 60)
+
+    cache.put("key", _df(100))
+
+    assert_equals(0, len(cache))
+
+
+def test_put_replaces_entry():
+    cache = SqlResultCache(10 ** 6, 60)
+
+    cache.put("key", _df(10))
+    cache.put("key", _df(20))
+
+    assert_equals(20, len(cache.get("key")))
+    assert_equals(_size(_df(20)), cache.current_bytes)
+
+
+def test_discard_session():
+    cache = SqlResultCache(10 ** 6, 60)
+    cache.put(SqlResultCache.make_key("url", 1, "sql", "SELECT 1", None), _df(1))
+    cache.put(SqlResultCache.make_key("url", 2, "sql", "SELECT 1", None), _df(1))
+
+    cache.discard_session("url", "1")
+
+    assert cache.get(SqlResultCache.make_key("url", 1, "sql", "SELECT 1", None)) is None
+    assert cache.get(SqlResultCache.make_key("url", 2, "sql", "SELECT 1", None)) is not None
@@ -0,0 +1,53 @@
+from nose.tools import assert_equals, raises
+
+from remotespark.livyclientlib.sqlsampling import SqlSampling
+
+
+def test_default_is_take():
+    assert SqlSampling().is_take
+
+
+def test_method_is_inferred():
+    assert_equals("sample", SqlSampling(fraction=0.1).method)
+    assert_equals("stratified", SqlSampling(fraction=0.1, column="c").method)
+
+
+def test_equality():
+    assert_equals(SqlSampling("sample", 0.1, 1), SqlSampling("sample", 0.1, 1))
+    assert SqlSampling("sample", 0.1, 1) != SqlSampling("sample", 0.1, 2)
+    assert_equals(hash(SqlSampling("sample", 0.1, 1)), hash(SqlSampling("sample", 0.1, 1)))
+
+
+@raises(ValueError)
+def test_unknown_method():
+    SqlSampling("random")
+
+
+@raises(ValueError)
+def test_sample_requires_fraction():
+    SqlSampling("sample")
+
+
+@raises(ValueError)
+def test_fraction_must_be_at_most_one():
+    SqlSampling("sample", 1.5)
+
+
+@raises(ValueError)
+def test_fraction_must_be_positive():
+    SqlSampling("sample", 0)
+
+
+@raises(ValueError)
+def test_take_takes_no_fraction():
+    SqlSampling("take", 0.5)
+
+
+@raises(ValueError)
+def test_stratified_requires_column():
+    SqlSampling("stratified", 0.5)
+
+
+@raises(ValueError)
+def test_sample_takes_no_column():
+    SqlSampling("sample", 0.5, column="c")
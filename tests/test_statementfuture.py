@@ -0,0 +1,73 @@
+from mock import MagicMock
+from nose.tools import raises, assert_equals
+
+from remotespark.livyclientlib.livyclienttimeouterror import LivyClientTimeoutError
+from remotespark.livyclientlib.livystatementcancellederror import LivyStatementCancelledError
+from remotespark.livyclientlib.statementfuture import StatementFuture
+
+
+def test_result_returns_set_result():
+    future = StatementFuture(MagicMock(), 0)
+
+    assert not future.done()
+    future.set_result((True, "out"))
+
+    assert future.done()
+    assert_equals((True, "out"), future.result())
+
+
+@raises(ValueError)
+def test_result_raises_set_exception():
+    future = StatementFuture(MagicMock(), 0)
+    future.set_exception(ValueError("bad"))
+
+    future.result()
+
+
+@raises(LivyClientTimeoutError)
+def test_result_times_out():
+    future = StatementFuture(MagicMock(), 0)
+
+    future.result(0.01)
+
+
+def test_cancel_cancels_statement_in_session():
+    session = MagicMock()
+    future = StatementFuture(session, 3)
+
+    assert future.cancel()
+
+    session.cancel_statement.assert_called_once_with(3)
+    assert future.done()
+    assert future.cancelled()
+    assert not future.set_result((True, "late"))
+    try:
+        future.result()
+        assert False
+    except LivyStatementCancelledError:
+        pass
+
+
+def test_cancel_keeps_statement_running_when_livy_refuses():
+    session = MagicMock()
+    session.cancel_statement.return_value = False
+    future = StatementFuture(session, 3)
+
+    assert not future.cancel()
+
+    session.cancel_statement.assert_called_once_with(3)
+    assert not future.done()
+    assert not future.cancelled()
+    assert future.set_result((True, "out"))
+    assert_equals((True, "out"), future.result())
+
+
+def test_cancel_does_nothing_when_done():
+    session = MagicMock()
+    future = StatementFuture(session, 3)
+    future.set_result((True, "out"))
+
+    assert not future.cancel()
+
+    assert_equals(0, session.cancel_statement.call_count)
+    assert not future.cancelled()
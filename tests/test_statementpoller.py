@@ -0,0 +1,70 @@
+from mock import MagicMock
+from nose.tools import assert_equals
+
+from remotespark.livyclientlib.constantpollingschedule import ConstantPollingSchedule
+from remotespark.livyclientlib.livysession import LivySession
+from remotespark.livyclientlib.livystatementcancellederror import LivyStatementCancelledError
+from remotespark.livyclientlib.statementfuture import StatementFuture
+from remotespark.livyclientlib.statementpoller import StatementPoller
+
+
+def _session(states):
+    """Session whose statements go through the given states, one per poll."""
+    session = MagicMock()
+    polls = dict()
+
+    def get_statement_result(statement_id):
+        count = polls.get(statement_id, 0)
+        polls[statement_id] = count + 1
+        state = states[statement_id][min(count, len(states[statement_id]) - 1)]
+        if LivySession.is_statement_running(state):
+            return state, None
+        statement = {"id": statement_id, "state": state, "output": {"status": "ok",
+                                                                     "data": {"text/plain": str(statement_id)}}}
+        return state, LivySession._get_statement_result(statement)
+
+    session.get_statement_result.side_effect = get_statement_result
+    return session
+
+
+def test_poller_completes_all_in_flight_statements():
+    session = _session({0: ["running", "running", "available"],
+                        1: ["waiting", "available"]})
+    poller = StatementPoller(session, ConstantPollingSchedule(0.01))
+    futures = [StatementFuture(session, 0), StatementFuture(session, 1)]
+
+    for future in futures:
+        poller.add(future)
+
+    assert_equals((True, "0"), futures[0].result(5))
+    assert_equals((True, "1"), futures[1].result(5))
+
+
+def test_poller_sets_exception_when_polling_fails():
+    session = MagicMock()
+    session.get_statement_result.side_effect = ValueError("bad status")
+    poller = StatementPoller(session, ConstantPollingSchedule(0.01))
+    future = StatementFuture(session, 0)
+
+    poller.add(future)
+
+    try:
+        future.result(5)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_poller_marks_cancelled_statements_as_cancelled():
+    session = _session({0: ["running", "cancelling", "cancelled"]})
+    poller = StatementPoller(session, ConstantPollingSchedule(0.01))
+    future = StatementFuture(session, 0)
+
+    poller.add(future)
+
+    try:
+        future.result(5)
+        assert False
+    except LivyStatementCancelledError:
+        pass
+    assert future.cancelled()